@@ -3,8 +3,6 @@ from typing import Union
 from fastapi import Depends
 from fastapi import HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt
-from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
@@ -39,6 +37,9 @@ async def authenticate_user(
 async def get_current_user_from_token(
     token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
 ):
+    from jose import jwt
+    from jose import JWTError
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -2,13 +2,24 @@ from typing import List, Union
 from uuid import UUID
 
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
 
+import settings
 from db.dals import DogDAL, TaskDAL
 from db.models import User
 from db.models import PortalRole
 from db.models import Dog
 from api.schemas import ShowDog
 from api.schemas import DogCreate
+from api.schemas import IngestPositionsResponse
+from api.services.area_stats import area_stats
+from api.services.job_queue import job_queue
+from api.services.leaderboard import completion_ranks
+from api.services.name_index import dog_name_index
+from api.services.positions import decode_position_records
+from api.services.positions import prepare_position_batch
+from api.services.positions import write_positions
+from api.services.spatial_index import dog_spatial_index
 
 async def _create_new_dog(body: DogCreate, session, current_user: User) -> ShowDog:
     async with session.begin():
@@ -26,20 +37,30 @@ async def _create_new_dog(body: DogCreate, session, current_user: User) -> ShowD
             is_active=dog.is_active,
         )
 
+@job_queue.job("close_dog_tasks")
+async def _close_dog_tasks(session, dog_id: str, closed_by: str) -> List[UUID]:
+    task_dal = TaskDAL(session)
+    closed_task_ids = await task_dal.close_tasks_by_created_for(UUID(dog_id), UUID(closed_by))
+    if closed_task_ids:
+        # counted as completed by the user who deleted the dog
+        completion_ranks.invalidate()
+    return closed_task_ids
+
+
 async def _delete_dog(dog_id: UUID, session, current_user: User) -> UUID:
     async with session.begin():
         dog_dal = DogDAL(session)
-        task_dal = TaskDAL(session)
-
-        tasks = await task_dal.get_tasks_by_created_for(dog_id)
-        for task in tasks:
-            await task_dal.close_task(task.task_id, current_user)
-
         deleted_dog_id = await dog_dal.delete_dog(
             dog_id=dog_id,
         )
-
-        return deleted_dog_id
+    if deleted_dog_id is None:
+        return None
+    # open tasks of the dog are closed in the background, inline if the queue is unavailable
+    payload = {"dog_id": str(dog_id), "closed_by": str(current_user.user_id)}
+    if not await job_queue.enqueue("close_dog_tasks", payload):
+        async with session.begin():
+            await _close_dog_tasks(session, **payload)
+    return deleted_dog_id
 
 
 async def _update_dog(updated_dog_params: dict, dog_id: UUID, session) -> UUID:
@@ -67,20 +88,68 @@ async def _get_dog_by_name(name: str, session) -> UUID:
         dog_id = await dog_dal.get_dog_by_name(name)
         return dog_id
 
-async def _get_active_dogs(session) -> List[ShowDog]:
+async def _get_active_dogs(session) -> list:
     async with session.begin():
         dog_dal = DogDAL(session)
-        active_dogs = await dog_dal.get_active_dogs()
-        return [
-            ShowDog(
-                dog_id=dog.dog_id,
-                name=dog.name,
-                gender=dog.gender,
-                is_active=dog.is_active,
-            )
-            for dog in active_dogs
-        ]
+        active_dogs = await dog_dal.get_active_dog_rows()
+        return active_dogs
+
+
+async def _search_dogs(query: str, limit: int, session) -> List[dict]:
+    async with session.begin():
+        await dog_name_index.ensure_loaded(session)
+    return dog_name_index.search(query, limit)
+
 
+async def _get_dogs_within_radius(latitude: float, longitude: float, radius_km: float, session) -> List[dict]:
+    async with session.begin():
+        await dog_spatial_index.ensure_loaded(session)
+    return dog_spatial_index.within_radius(latitude, longitude, radius_km)
+
+async def _get_dogs_in_bbox(
+    min_latitude: float, min_longitude: float, max_latitude: float, max_longitude: float, session
+) -> List[dict]:
+    async with session.begin():
+        await dog_spatial_index.ensure_loaded(session)
+    return dog_spatial_index.in_bbox(min_latitude, min_longitude, max_latitude, max_longitude)
+
+async def _get_nearest_dogs_with_open_tasks(latitude: float, longitude: float, k: int, session) -> List[dict]:
+    async with session.begin():
+        task_dal = TaskDAL(session)
+        open_task_counts = await task_dal.get_open_task_counts_by_dog()
+        await dog_spatial_index.ensure_loaded(session)
+    # a point far from every dog scans all of them, which is CPU bound
+    nearest_dogs = await run_in_threadpool(
+        dog_spatial_index.nearest, latitude, longitude, k, allowed=open_task_counts
+    )
+    for dog in nearest_dogs:
+        dog["open_tasks"] = open_task_counts[dog["dog_id"]]
+    return nearest_dogs
+
+
+async def _get_area_stats(session) -> dict:
+    if not area_stats.is_loaded:
+        async with session.begin():
+            await area_stats.ensure_loaded(session)
+    return area_stats.summary()
+
+
+async def _ingest_positions(payload: bytes, session) -> IngestPositionsResponse:
+    try:
+        records = decode_position_records(payload)
+    except ValueError as err:
+        raise HTTPException(status_code=400, detail=str(err))
+    if len(records) > settings.POSITION_INGEST_MAX_RECORDS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.POSITION_INGEST_MAX_RECORDS} records per request.",
+        )
+    batch, rejected, duplicates = prepare_position_batch(records, settings.POSITION_MAX_CLOCK_SKEW)
+    async with session.begin():
+        updated = await write_positions(batch, session)
+    return IngestPositionsResponse(
+        received=len(records), rejected=rejected, duplicates=duplicates, updated=updated
+    )
 
         
 def check_user_permissions_for_dog(target_dog: Dog, current_user: User) -> bool:
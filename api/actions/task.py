@@ -1,24 +1,118 @@
+from logging import getLogger
 from typing import List, Union
 from uuid import UUID
+from uuid import uuid4
 # from geopy.distance import geodesic
 
-from numpy import sin, cos, arccos, pi, round
 from sqlalchemy.ext.asyncio import AsyncSession
 
+import settings
 from db.session import get_db
 
 from fastapi import HTTPException
 from fastapi import Depends
+from starlette.concurrency import run_in_threadpool
+from api.schemas import BulkTaskCreate
+from api.schemas import BulkTaskCreateResponse
+from api.schemas import BulkTaskItemResult
+from api.schemas import LeaderboardEntry
+from api.schemas import LeaderboardResponse
+from api.schemas import ProposedAssignment
+from api.schemas import ProposedAssignmentsResponse
+from api.schemas import RoutePlanRequest
+from api.schemas import RoutePlanResponse
+from api.schemas import RouteStop
 from api.schemas import ShowTask
 from api.schemas import TaskCreate
+from api.schemas import TaskSearchResponse
 
+from db.dals import DogDAL
 from db.dals import TaskDAL
+from db.dals import UserDAL
 
 from db.models import Task
 from db.models import PortalRole
 from db.models import User
 
 from api.actions.dog import _get_dog_by_id
+from api.services.area_stats import area_stats
+from api.services.assignment import choose_assignment_method
+from api.services.assignment import propose_assignments
+from api.services.job_queue import job_queue
+from api.services.leaderboard import completion_ranks
+from api.services.notifications import notification_hub
+from api.services.pagination import decode_cursor
+from api.services.pagination import encode_cursor
+from api.services.route_planner import plan_route
+
+from geo import KM_PER_DEGREE
+from geo import get_distance_between_points
+from geo import longitude_delta
+
+logger = getLogger(__name__)
+
+@job_queue.job("notify_nearby_volunteers")
+async def _notify_nearby_volunteers(session, tasks: List[dict], created_by: str) -> None:
+    import numpy as np
+
+    dog_dal = DogDAL(session)
+    user_dal = UserDAL(session)
+    dogs = {
+        dog.dog_id: dog
+        for dog in await dog_dal.get_located_dog_rows(list({UUID(task["created_for"]) for task in tasks}))
+    }
+    radius_km = settings.NOTIFICATION_RADIUS_KM
+    latitude_delta = radius_km / KM_PER_DEGREE
+    for task in tasks:
+        dog = dogs.get(UUID(task["created_for"]))
+        if dog is None:
+            continue
+        # the indexed box query narrows volunteers down, exact distances are vectorized
+        delta = longitude_delta(latitude_delta, abs(dog.latitude) + latitude_delta)
+        if delta >= 180:
+            min_longitude, max_longitude = -180.0, 180.0
+        else:
+            min_longitude = (dog.longitude - delta + 180) % 360 - 180
+            max_longitude = (dog.longitude + delta + 180) % 360 - 180
+        users = [
+            user for user in await user_dal.get_located_users_in_box(
+                dog.latitude - latitude_delta, dog.latitude + latitude_delta, min_longitude, max_longitude
+            )
+            if str(user.user_id) != created_by
+        ]
+        if not users:
+            continue
+        distances = get_distance_between_points(
+            dog.latitude,
+            dog.longitude,
+            np.array([user.latitude for user in users]),
+            np.array([user.longitude for user in users]),
+        )
+        nearby = np.flatnonzero(distances <= radius_km)
+        await notification_hub.publish(
+            session,
+            {
+                "task_id": UUID(task["task_id"]),
+                "dog_id": dog.dog_id,
+                "dog_name": dog.name,
+                "description": task["description"],
+            },
+            [users[index].user_id for index in nearby.tolist()],
+            distances[nearby].tolist(),
+        )
+
+
+async def _enqueue_task_notifications(tasks: List[ShowTask], created_by: UUID) -> None:
+    payload = {
+        "tasks": [
+            {"task_id": str(task.task_id), "created_for": str(task.created_for), "description": task.description}
+            for task in tasks
+        ],
+        "created_by": str(created_by),
+    }
+    if not await job_queue.enqueue("notify_nearby_volunteers", payload):
+        logger.warning(f"Notifications about {len(tasks)} new tasks were not sent, the job queue is unavailable")
+
 
 async def _create_new_task(body: TaskCreate, session, current_user: User) -> ShowTask:
     async with session.begin():
@@ -28,13 +122,66 @@ async def _create_new_task(body: TaskCreate, session, current_user: User) -> Sho
             created_for=body.created_for,
             created_by=current_user.user_id,
         )
-        return ShowTask(
+        new_task = ShowTask(
             task_id=task.task_id,
             description=task.description,
             created_by=task.created_by,
             created_for=body.created_for,
             is_active=task.is_active,
         )
+    area_stats.task_opened(new_task.task_id, new_task.created_for)
+    await _enqueue_task_notifications([new_task], current_user.user_id)
+    return new_task
+
+async def _create_new_tasks(body: BulkTaskCreate, session, current_user: User) -> BulkTaskCreateResponse:
+    async with session.begin():
+        dog_dal = DogDAL(session)
+        task_dal = TaskDAL(session)
+        active_dog_ids = await dog_dal.get_active_dog_ids(
+            list({task.created_for for task in body.tasks})
+        )
+        valid_items = [
+            (index, task) for index, task in enumerate(body.tasks)
+            if task.created_for in active_dog_ids
+        ]
+        # ids are generated here, so returned rows are matched to items by id, not by order
+        task_ids = {index: uuid4() for index, _ in valid_items}
+        rows = []
+        if valid_items:
+            rows = await task_dal.create_tasks(
+                tasks=[{**task.dict(), "task_id": task_ids[index]} for index, task in valid_items],
+                created_by=current_user.user_id,
+            )
+        created_rows = {row.task_id: row for row in rows}
+        results = []
+        for index, task in enumerate(body.tasks):
+            if task.created_for not in active_dog_ids:
+                results.append(BulkTaskItemResult(
+                    index=index,
+                    error=f"Dog with id {task.created_for} not found.",
+                ))
+                continue
+            row = created_rows[task_ids[index]]
+            results.append(BulkTaskItemResult(
+                index=index,
+                task=ShowTask(
+                    task_id=row.task_id,
+                    description=row.description,
+                    created_by=row.created_by,
+                    created_for=row.created_for,
+                    is_active=row.is_active,
+                ),
+            ))
+    created_tasks = [result.task for result in results if result.task is not None]
+    for task in created_tasks:
+        area_stats.task_opened(task.task_id, task.created_for)
+    if created_tasks:
+        await _enqueue_task_notifications(created_tasks, current_user.user_id)
+    return BulkTaskCreateResponse(
+        created=len(rows),
+        failed=len(body.tasks) - len(rows),
+        results=results,
+    )
 
 async def _close_task(task_id: UUID, session, current_user: User) -> UUID:
     async with session.begin():
@@ -43,7 +190,10 @@ async def _close_task(task_id: UUID, session, current_user: User) -> UUID:
             task_id=task_id, 
             current_user=current_user
         )
-        return updated_task_id
+    if updated_task_id is not None:
+        area_stats.task_closed(updated_task_id)
+        completion_ranks.task_completed(current_user.completed_tasks_count)
+    return updated_task_id
 
 async def _update_task(updated_task_params: dict, task_id: UUID, session) -> UUID:
     async with session.begin():
@@ -75,10 +225,10 @@ async def _get_tasks_by_created_for(created_for: UUID, session) -> List[Task]:
         )
         return [task for task in tasks if task.is_active]
 
-async def _get_active_tasks(session) -> List[Task]:
+async def _get_active_tasks(session) -> list:
     async with session.begin():
         task_dal = TaskDAL(session)
-        tasks = await task_dal.get_active_tasks()
+        tasks = await task_dal.get_active_task_rows()
         return tasks
     
 async def _get_completed_tasks(session) -> List[Task]:
@@ -87,12 +237,117 @@ async def _get_completed_tasks(session) -> List[Task]:
         tasks = await task_dal.get_completed_tasks()
         return tasks
     
-async def _get_tasks_by_closed_by(closed_by: UUID, session: AsyncSession) -> List[Task]:
+async def _get_tasks_by_closed_by(closed_by: UUID, session: AsyncSession) -> list:
     async with session.begin():
         task_dal = TaskDAL(session)
-        tasks = await task_dal.get_tasks_by_closed_by(closed_by)
+        tasks = await task_dal.get_completed_task_rows_by_closed_by(closed_by)
         return tasks
     
+TASK_SEARCH_STATUSES = {"active": True, "closed": False, "all": None}
+
+async def _search_tasks(query: str, status: str, limit: int, cursor: Union[str, None], session) -> TaskSearchResponse:
+    after_rank = after_task_id = None
+    if cursor is not None:
+        try:
+            after_rank, after_task_id = decode_cursor(cursor, 2)
+            if isinstance(after_rank, bool) or not isinstance(after_rank, (int, float)):
+                raise ValueError("Invalid cursor.")
+            if not isinstance(after_task_id, str):
+                raise ValueError("Invalid cursor.")
+            after_rank, after_task_id = float(after_rank), UUID(after_task_id)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Invalid cursor.")
+    async with session.begin():
+        task_dal = TaskDAL(session)
+        # one extra row tells whether there is a next page
+        rows = await task_dal.search_tasks(
+            query,
+            limit + 1,
+            is_active=TASK_SEARCH_STATUSES[status],
+            after_rank=after_rank,
+            after_task_id=after_task_id,
+        )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].rank, rows[-1].task_id)
+    return TaskSearchResponse(results=rows, next_cursor=next_cursor)
+
+async def _get_leaderboard(limit: int, session, current_user: User) -> LeaderboardResponse:
+    async with session.begin():
+        user_dal = UserDAL(session)
+        top_rows = await user_dal.get_leaderboard(limit)
+        await completion_ranks.ensure_loaded(session)
+    return LeaderboardResponse(
+        top=[
+            LeaderboardEntry(
+                rank=completion_ranks.rank(row.completed_tasks_count),
+                user_id=row.user_id,
+                name=row.name,
+                surname=row.surname,
+                completed_tasks=row.completed_tasks_count,
+            )
+            for row in top_rows
+        ],
+        my_rank=completion_ranks.rank(current_user.completed_tasks_count),
+        my_completed_tasks=current_user.completed_tasks_count,
+        ranked_users=completion_ranks.ranked_users,
+    )
+
+async def _propose_assignments(
+    capacity: int, max_distance_km: Union[float, None], method: str, session
+) -> ProposedAssignmentsResponse:
+    async with session.begin():
+        user_dal = UserDAL(session)
+        task_dal = TaskDAL(session)
+        volunteers = await user_dal.get_located_volunteers()
+        tasks = await task_dal.get_open_task_locations()
+    try:
+        method = choose_assignment_method(len(volunteers), len(tasks), capacity, method)
+    except ValueError as err:
+        raise HTTPException(status_code=422, detail=str(err))
+    # the solvers are CPU bound, keep them off the event loop
+    used_method, assignments = await run_in_threadpool(
+        propose_assignments, volunteers, tasks, capacity, max_distance_km, method
+    )
+    assigned_task_ids = {task_id for task_id, _, _ in assignments}
+    return ProposedAssignmentsResponse(
+        method=used_method,
+        total_distance=round(sum(distance for _, _, distance in assignments), 4),
+        assignments=[
+            ProposedAssignment(task_id=task_id, user_id=user_id, distance=distance)
+            for task_id, user_id, distance in assignments
+        ],
+        unassigned_task_ids=[task.task_id for task in tasks if task.task_id not in assigned_task_ids],
+    )
+    
+async def _plan_route(body: RoutePlanRequest, session) -> RoutePlanResponse:
+    task_ids = list(dict.fromkeys(body.task_ids))
+    async with session.begin():
+        task_dal = TaskDAL(session)
+        tasks = await task_dal.get_task_locations(task_ids)
+    order, legs = await run_in_threadpool(
+        plan_route,
+        (body.latitude, body.longitude),
+        [(task.latitude, task.longitude) for task in tasks],
+        settings.ROUTE_PLAN_TIME_LIMIT,
+    )
+    resolved_task_ids = {task.task_id for task in tasks}
+    return RoutePlanResponse(
+        total_distance=round(sum(legs), 4),
+        stops=[
+            RouteStop(
+                task_id=tasks[index].task_id,
+                dog_id=tasks[index].created_for,
+                latitude=tasks[index].latitude,
+                longitude=tasks[index].longitude,
+                distance_from_previous=leg,
+            )
+            for index, leg in zip(order, legs)
+        ],
+        unresolved_task_ids=[task_id for task_id in task_ids if task_id not in resolved_task_ids],
+    )
+    
 async def check_user_permissions_for_close_task(target_task: Task, current_user: User, db: AsyncSession = Depends(get_db)) -> bool:
     if PortalRole.ROLE_PORTAL_SUPERADMIN in current_user.roles:
         raise HTTPException(
@@ -114,25 +369,3 @@ async def check_user_permissions_for_close_task(target_task: Task, current_user:
         return True
 
     return False
-
-def rad2deg(radians):
-    degrees = radians * 180 / pi
-    return degrees
-
-def deg2rad(degrees):
-    radians = degrees * pi / 180
-    return radians
-
-def get_distance_between_points(latitude1, longitude1, latitude2, longitude2, unit = 'kilometers'):
-    theta = longitude1 - longitude2
-    distance = 60 * 1.1515 * rad2deg(
-        arccos(
-            (sin(deg2rad(latitude1)) * sin(deg2rad(latitude2))) + 
-            (cos(deg2rad(latitude1)) * cos(deg2rad(latitude2)) * cos(deg2rad(theta)))
-        )
-    )
-    
-    if unit == 'miles':
-        return round(distance, 4)
-    if unit == 'kilometers':
-        return round(distance * 1.609344, 4)
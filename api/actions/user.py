@@ -1,16 +1,30 @@
-from typing import Union
+import csv
+import io
+import json
+from typing import Iterator, List, Tuple, Union
 from uuid import UUID
+from uuid import uuid4
 
 from fastapi import HTTPException
+from pydantic import ValidationError
 
+import settings
+from api.schemas import ImportUserRowError
+from api.schemas import ImportUsersResponse
+from api.schemas import NotificationsResponse
 from api.schemas import ShowUser
 from api.schemas import UserCreate
+from api.schemas import UsersPage
+from api.services.notifications import notification_hub
+from api.services.pagination import decode_cursor
+from api.services.pagination import encode_cursor
 from db.dals import UserDAL
 
 from db.models import PortalRole
 from db.models import User
 
 from hashing import Hasher
+from hashing import hash_passwords
 
 
 async def _create_new_user(body: UserCreate, session) -> ShowUser:
@@ -34,6 +48,101 @@ async def _create_new_user(body: UserCreate, session) -> ShowUser:
         )
 
 
+def _iter_import_rows(content: bytes, file_format: str) -> Iterator[Tuple[int, object]]:
+    text = content.decode("utf-8-sig")
+    if file_format == "csv":
+        yield from enumerate(csv.DictReader(io.StringIO(text)), start=1)
+        return
+    for row_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except json.JSONDecodeError as err:
+            yield row_number, err
+
+
+def _read_import_rows(content: bytes, file_format: str) -> List[Tuple[int, object]]:
+    rows = []
+    try:
+        # the limit is checked while reading, an oversized upload is not parsed to the end
+        for row in _iter_import_rows(content, file_format):
+            if len(rows) == settings.USER_IMPORT_MAX_ROWS:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Too many rows, max {settings.USER_IMPORT_MAX_ROWS} per import",
+                )
+            rows.append(row)
+    except (UnicodeDecodeError, csv.Error) as err:
+        raise HTTPException(status_code=422, detail=f"Could not parse file: {err}")
+    return rows
+
+
+def _parse_users_import(
+    content: bytes, file_format: str
+) -> Tuple[List[UserCreate], List[ImportUserRowError]]:
+    rows = _read_import_rows(content, file_format)
+    users = []
+    errors = []
+    for row_number, row in rows:
+        if not isinstance(row, dict):
+            errors.append(ImportUserRowError(row=row_number, error=f"Invalid row: {row}"))
+            continue
+        # csv.DictReader collects fields beyond the header under the None key
+        if None in row:
+            errors.append(
+                ImportUserRowError(row=row_number, email=row.get("email"), error="Row has more fields than the header")
+            )
+            continue
+        try:
+            users.append(UserCreate(**row))
+        except HTTPException as err:
+            errors.append(ImportUserRowError(row=row_number, email=row.get("email"), error=err.detail))
+        except ValidationError as err:
+            error = "; ".join(
+                f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in err.errors()
+            )
+            errors.append(ImportUserRowError(row=row_number, email=row.get("email"), error=error))
+    return users, errors
+
+
+async def _import_users(content: bytes, file_format: str, session) -> ImportUsersResponse:
+    users, errors = _parse_users_import(content, file_format)
+    duplicates = []
+    unique_users = {}
+    # emails are unique regardless of case
+    for user in users:
+        if user.email.lower() in unique_users:
+            duplicates.append(user.email)
+        else:
+            unique_users[user.email.lower()] = user
+    users = list(unique_users.values())
+    if not users:
+        return ImportUsersResponse(imported=0, duplicates=duplicates, errors=errors)
+
+    hashed_passwords = await hash_passwords([user.password for user in users])
+    records = [
+        (
+            uuid4(),
+            user.name,
+            user.surname,
+            user.email,
+            True,
+            hashed_password,
+            [PortalRole.ROLE_PORTAL_USER.value],
+        )
+        for user, hashed_password in zip(users, hashed_passwords)
+    ]
+    async with session.begin():
+        user_dal = UserDAL(session)
+        inserted_rows = await user_dal.copy_users(records)
+    inserted_emails = {row.email.lower() for row in inserted_rows}
+    duplicates.extend(user.email for user in users if user.email.lower() not in inserted_emails)
+    return ImportUsersResponse(
+        imported=len(inserted_rows), duplicates=duplicates, errors=errors
+    )
+
+
 async def _delete_user(user_id, session) -> Union[UUID, None]:
     async with session.begin():
         user_dal = UserDAL(session)
@@ -64,6 +173,60 @@ async def _get_user_by_id(user_id, session) -> Union[User, None]:
             return user
 
 
+async def _get_notifications(current_user: User, after: int, timeout: float, session) -> NotificationsResponse:
+    async def read_notifications() -> list:
+        async with session.begin():
+            return await notification_hub.read(session, current_user.user_id, after)
+
+    notifications = await notification_hub.wait(current_user.user_id, read_notifications, timeout)
+    return NotificationsResponse(
+        last_notification_id=notifications[-1]["notification_id"] if notifications else after,
+        notifications=notifications,
+    )
+
+
+async def _list_users(
+    limit: int,
+    role: Union[PortalRole, None],
+    is_active: Union[bool, None],
+    email_prefix: Union[str, None],
+    name_prefix: Union[str, None],
+    cursor: Union[str, None],
+    session,
+) -> UsersPage:
+    after_email = None
+    if cursor is not None:
+        try:
+            (after_email,) = decode_cursor(cursor, 1)
+            if not isinstance(after_email, str):
+                raise ValueError("Invalid cursor.")
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Invalid cursor.")
+    async with session.begin():
+        user_dal = UserDAL(session)
+        # one extra row tells whether there is a next page
+        rows = await user_dal.list_users(
+            limit + 1,
+            role=role.value if role is not None else None,
+            is_active=is_active,
+            email_prefix=email_prefix,
+            name_prefix=name_prefix,
+            after_email=after_email,
+        )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].email_key)
+    return UsersPage(users=rows, next_cursor=next_cursor)
+
+
+def check_admin(current_user: User) -> bool:
+    return bool({
+        PortalRole.ROLE_PORTAL_ADMIN,
+        PortalRole.ROLE_PORTAL_SUPERADMIN,
+    }.intersection(current_user.roles))
+
+
 def check_user_permissions(target_user: User, current_user: User) -> bool:
     if PortalRole.ROLE_PORTAL_SUPERADMIN in current_user.roles:
         raise HTTPException(
@@ -6,24 +6,41 @@ from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import HTTPException
 from fastapi import Query
+from fastapi import Request
+from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.actions.dog import _create_new_dog, _get_active_dogs, _get_dog_by_name
 from api.actions.dog import _delete_dog
 from api.actions.dog import _get_dog_by_id
+from api.actions.dog import _get_area_stats
+from api.actions.dog import _get_dogs_in_bbox
+from api.actions.dog import _get_dogs_within_radius
+from api.actions.dog import _get_nearest_dogs_with_open_tasks
+from api.actions.dog import _ingest_positions
+from api.actions.dog import _search_dogs
 from api.actions.dog import _update_dog
 from api.actions.dog import check_user_permissions_for_dog
 from api.actions.dog import check_superadmin
 
 from api.actions.auth import get_current_user_from_token
+from api.actions.user import check_admin
 
+from api.schemas import AreaStatsResponse
 from api.schemas import DogCreate
 from api.schemas import UpdatedDogResponse
 from api.schemas import UpdateDogRequest
 from api.schemas import DeleteDogResponse
+from api.schemas import DogSearchResult
+from api.schemas import IngestPositionsResponse
 from api.schemas import ShowDog
 from api.schemas import ShowDogCoords
+from api.schemas import ShowDogDistance
+from api.schemas import ShowNearestDog
+from api.services.area_stats import area_stats
+from api.services.name_index import dog_name_index
+from api.services.spatial_index import dog_spatial_index
 from db.models import User
 from db.session import get_db
 
@@ -37,26 +54,21 @@ async def create_dog(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user_from_token)) -> ShowDog:
     try:
-        return await _create_new_dog(body, db, current_user)
+        new_dog = await _create_new_dog(body, db, current_user)
     except IntegrityError as err:
         logger.error(err)
         raise HTTPException(status_code=503, detail=f"Database error: {err}")
+    area_stats.dog_added(new_dog.dog_id)
+    dog_name_index.upsert(new_dog.dog_id, new_dog.name)
+    return new_dog
     
 @dog_router.get("/active_dogs", response_model=List[ShowDog])
 async def get_active_dogs(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user_from_token)
 ) -> List[ShowDog]:
-    active_dogs = await _get_active_dogs(db)
-    return [
-        ShowDog(
-            dog_id=dog.dog_id,
-            name=dog.name,
-            gender=dog.gender,
-            is_active=dog.is_active,
-        )
-        for dog in active_dogs
-    ]
+    # rows are validated into ShowDog once by the response model
+    return await _get_active_dogs(db)
 
 @dog_router.delete("/delete_dog/", response_model=DeleteDogResponse)
 async def delete_dog(
@@ -79,6 +91,9 @@ async def delete_dog(
         raise HTTPException(
             status_code=404, detail=f"Dog with id {dog_id} not found."
         )
+    dog_spatial_index.remove(deleted_dog_id)
+    area_stats.dog_removed(deleted_dog_id)
+    dog_name_index.remove(deleted_dog_id)
     return DeleteDogResponse(deleted_dog_id=deleted_dog_id)
 
 @dog_router.patch("/update_dog_by_id/", response_model=UpdatedDogResponse)
@@ -113,6 +128,9 @@ async def update_dog_by_id(
         raise HTTPException(status_code=503, detail=f"Database error: {err}")
     if updated_dog_id is None:
         raise HTTPException(status_code=400, detail="Dog is not active")
+    if "name" in updated_dog_params:
+        dog_spatial_index.rename(updated_dog_id, updated_dog_params["name"])
+        dog_name_index.upsert(updated_dog_id, updated_dog_params["name"])
     return UpdatedDogResponse(updated_dog_id=updated_dog_id)
 
 @dog_router.get("/get_dog_by_id/", response_model=ShowDog)
@@ -150,6 +168,8 @@ async def update_dog_location(
     updated_dog_params = {
         "latitude": latitude,
         "longitude": longitude,
+        # collar fixes taken before the manual one must not overwrite it
+        "location_fixed_at": func.now(),
     }
     try:
         updated_dog_id = await _update_dog(
@@ -158,8 +178,35 @@ async def update_dog_location(
     except IntegrityError as err:
         logger.error(err)
         raise HTTPException(status_code=503, detail=f"Database error: {err}")
+    if updated_dog_id is not None:
+        dog_spatial_index.upsert(updated_dog_id, dog_for_update.name, latitude, longitude)
+        area_stats.dog_moved(updated_dog_id, latitude, longitude)
     return ShowDogCoords(dog_id=dog_for_update.dog_id, name=dog_for_update.name, latitude=updated_dog_params["latitude"], longitude=updated_dog_params["longitude"])
 
+@dog_router.post(
+    "/ingest_positions/",
+    response_model=IngestPositionsResponse,
+    openapi_extra={
+        "requestBody": {
+            "content": {"application/octet-stream": {"schema": {"type": "string", "format": "binary"}}},
+            "required": True,
+        }
+    },
+)
+async def ingest_positions(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_token),
+) -> IngestPositionsResponse:
+    if not check_superadmin(current_user=current_user):
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    payload = await request.body()
+    try:
+        return await _ingest_positions(payload, db)
+    except IntegrityError as err:
+        logger.error(err)
+        raise HTTPException(status_code=503, detail=f"Database error: {err}")
+
 @dog_router.get("/get_dog_location/", response_model=ShowDogCoords)
 async def get_dog_location(
     dog_id: UUID,
@@ -186,4 +233,61 @@ async def get_dog_by_name(
     dog = await _get_dog_by_name(name, db)
     if dog is None:
         raise HTTPException(status_code=404, detail="Dog not found")
-    return dog
\ No newline at end of file
+    return dog
+
+@dog_router.get("/search", response_model=List[DogSearchResult])
+async def search_dogs(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_token)
+) -> List[DogSearchResult]:
+    return await _search_dogs(q, limit, db)
+
+@dog_router.get("/dogs_within_radius/", response_model=List[ShowDogDistance])
+async def get_dogs_within_radius(
+    latitude: float = Query(..., ge=-90.0, le=90.0),
+    longitude: float = Query(..., ge=-180.0, le=180.0),
+    radius_km: float = Query(..., gt=0, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_token)
+) -> List[ShowDogDistance]:
+    return await _get_dogs_within_radius(latitude, longitude, radius_km, db)
+
+@dog_router.get("/dogs_in_bbox/", response_model=List[ShowDogDistance])
+async def get_dogs_in_bbox(
+    min_latitude: float = Query(..., ge=-90.0, le=90.0),
+    min_longitude: float = Query(..., ge=-180.0, le=180.0),
+    max_latitude: float = Query(..., ge=-90.0, le=90.0),
+    max_longitude: float = Query(..., ge=-180.0, le=180.0),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_token)
+) -> List[ShowDogDistance]:
+    if min_latitude > max_latitude:
+        raise HTTPException(
+            status_code=422, detail="min_latitude should not be greater than max_latitude"
+        )
+    return await _get_dogs_in_bbox(min_latitude, min_longitude, max_latitude, max_longitude, db)
+
+@dog_router.get("/area_stats/", response_model=AreaStatsResponse)
+async def get_area_stats(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_token)
+) -> AreaStatsResponse:
+    if not check_admin(current_user=current_user):
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    return await _get_area_stats(db)
+
+@dog_router.get("/nearest", response_model=List[ShowNearestDog])
+async def get_nearest_dogs(
+    k: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_token)
+) -> List[ShowNearestDog]:
+    if current_user.latitude is None or current_user.longitude is None:
+        raise HTTPException(
+            status_code=400, detail="User location is not set."
+        )
+    return await _get_nearest_dogs_with_open_tasks(
+        current_user.latitude, current_user.longitude, k, db
+    )
@@ -5,10 +5,16 @@ from typing import List, Union
 from fastapi import APIRouter
 from fastapi import HTTPException
 from fastapi import Depends
+from fastapi import Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
 from api.actions.task import _create_new_task, _get_active_tasks, _get_completed_tasks, _get_tasks_by_closed_by
+from api.actions.task import _create_new_tasks
+from api.actions.task import _get_leaderboard
+from api.actions.task import _plan_route
+from api.actions.task import _search_tasks
+from api.actions.task import _propose_assignments
 from api.actions.task import _close_task
 from api.actions.task import _get_task_by_id
 from api.actions.task import _update_task
@@ -16,8 +22,14 @@ from api.actions.task import _get_tasks_by_created_for
 from api.actions.task import check_user_permissions_for_close_task
 
 from api.actions.auth import get_current_user_from_token
+from api.actions.user import check_admin
 
 from api.schemas import CloseTaskResponse, ShowCompletedTask, TaskCreate, ShowTask, UpdateTask, UpdatedTaskResponse
+from api.schemas import BulkTaskCreate, BulkTaskCreateResponse
+from api.schemas import LeaderboardResponse
+from api.schemas import ProposedAssignmentsResponse
+from api.schemas import RoutePlanRequest, RoutePlanResponse
+from api.schemas import TaskSearchResponse
 from db.models import User
 from db.session import get_db
 
@@ -38,6 +50,19 @@ async def create_task(
             raise HTTPException(status_code=503, detail=f"Database error: {err}")
 
 
+@task_router.post("/create_tasks/", response_model=BulkTaskCreateResponse)
+async def create_tasks(
+    body: BulkTaskCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_token)
+) -> BulkTaskCreateResponse:
+    try:
+        return await _create_new_tasks(body, db, current_user)
+    except IntegrityError as err:
+        logger.error(err)
+        raise HTTPException(status_code=503, detail=f"Database error: {err}")
+
+
 @task_router.delete("/close_task/", response_model=CloseTaskResponse)
 async def close_task(
     task_id: UUID,
@@ -56,6 +81,11 @@ async def close_task(
             detail="You are too far from dog to complete this task",
         )
     close_task_id = await _close_task(task_id, db, current_user)
+    if close_task_id is None:
+        # closed by a concurrent request after the lookup above
+        raise HTTPException(
+            status_code=404, detail=f"Task with id {task_id} not found."
+        )
     return CloseTaskResponse(close_task_id=close_task_id)
 
 @task_router.put("/update_task/", response_model=UpdatedTaskResponse)
@@ -140,13 +170,8 @@ async def get_all_active_tasks(
         raise HTTPException(
             status_code=404, detail='No active tasks'
         )
-    return [ShowTask(
-                task_id=task.task_id,
-                description=task.description,
-                created_for=task.created_for,
-                created_by=task.created_by,
-                is_active=task.is_active,
-            ) for task in tasks]
+    # rows are validated into ShowTask once by the response model
+    return tasks
 
 @task_router.get("/all_completed_tasks/", response_model=List[ShowCompletedTask])
 async def get_completed_tasks_by_user(
@@ -157,10 +182,43 @@ async def get_completed_tasks_by_user(
     tasks = await _get_tasks_by_closed_by(user_id, db)
     if not tasks:
         raise HTTPException(status_code=404, detail="No completed tasks found")
-    return [ShowCompletedTask(
-        task_id=task.task_id,
-        description=task.description,
-        created_by=task.created_by,
-        closed_by=task.closed_by,
-        created_for=task.created_for,
-    ) for task in tasks]
\ No newline at end of file
+    return tasks
+
+@task_router.get("/search/", response_model=TaskSearchResponse)
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200),
+    status: str = Query("active", regex="^(active|closed|all)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Union[str, None] = Query(None, max_length=200),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_token)
+) -> TaskSearchResponse:
+    return await _search_tasks(q, status, limit, cursor, db)
+
+@task_router.get("/leaderboard/", response_model=LeaderboardResponse)
+async def get_leaderboard(
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_token)
+) -> LeaderboardResponse:
+    return await _get_leaderboard(limit, db, current_user)
+
+@task_router.get("/proposed_assignments/", response_model=ProposedAssignmentsResponse)
+async def get_proposed_assignments(
+    capacity: int = Query(1, ge=1, le=50),
+    max_distance_km: Union[float, None] = Query(None, gt=0),
+    method: str = Query("auto", regex="^(auto|hungarian|greedy)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_token)
+) -> ProposedAssignmentsResponse:
+    if not check_admin(current_user):
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    return await _propose_assignments(capacity, max_distance_km, method, db)
+
+@task_router.post("/route_plan/", response_model=RoutePlanResponse)
+async def get_route_plan(
+    body: RoutePlanRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_token)
+) -> RoutePlanResponse:
+    return await _plan_route(body, db)
@@ -1,26 +1,38 @@
 from logging import getLogger
+from typing import Union
 from uuid import UUID
 
 from fastapi import APIRouter, Query
 from fastapi import Depends
+from fastapi import File
 from fastapi import HTTPException
+from fastapi import UploadFile
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.actions.user import _create_new_user
 from api.actions.user import _delete_user
+from api.actions.user import _get_notifications
 from api.actions.user import _get_user_by_id
+from api.actions.user import _import_users
+from api.actions.user import _list_users
 from api.actions.user import _update_user
+from api.actions.user import check_admin
 from api.actions.user import check_user_permissions
 
 from api.schemas import DeleteUserResponse, ShowUserCoords
+from api.schemas import ImportUsersResponse
+from api.schemas import NotificationsResponse
 from api.schemas import ShowUser
 from api.schemas import UpdatedUserResponse
 from api.schemas import UpdateUserRequest
 from api.schemas import UserCreate
+from api.schemas import UsersPage
 
 from api.actions.auth import get_current_user_from_token
 
+import settings
+from db.models import PortalRole
 from db.models import User
 from db.session import get_db
 
@@ -38,6 +50,23 @@ async def create_user(body: UserCreate, db: AsyncSession = Depends(get_db)) -> S
         raise HTTPException(status_code=503, detail=f"Database error: {err}")
 
 
+@user_router.post("/import_users/", response_model=ImportUsersResponse)
+async def import_users(
+    file: UploadFile = File(...),
+    file_format: str = Query("csv", alias="format", regex="^(csv|ndjson)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_token),
+) -> ImportUsersResponse:
+    if not check_admin(current_user):
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    content = await file.read()
+    try:
+        return await _import_users(content, file_format, db)
+    except IntegrityError as err:
+        logger.error(err)
+        raise HTTPException(status_code=503, detail=f"Database error: {err}")
+
+
 @user_router.delete("/delete_user/", response_model=DeleteUserResponse)
 async def delete_user(
     user_id: UUID,
@@ -145,6 +174,22 @@ async def get_user_by_id(
     return user
 
 
+@user_router.get("/list_users/", response_model=UsersPage)
+async def list_users(
+    role: Union[PortalRole, None] = None,
+    is_active: Union[bool, None] = None,
+    email_prefix: Union[str, None] = Query(None, max_length=100),
+    name_prefix: Union[str, None] = Query(None, max_length=100),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Union[str, None] = Query(None, max_length=500),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_token),
+) -> UsersPage:
+    if not check_admin(current_user):
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    return await _list_users(limit, role, is_active, email_prefix, name_prefix, cursor, db)
+
+
 @user_router.patch("/update_user_by_id/", response_model=UpdatedUserResponse)
 async def update_user_by_id(
     user_id: UUID,
@@ -219,3 +264,12 @@ async def get_user_location(
     if user.longitude is None:
         user.longitude = 0
     return ShowUserCoords(user_id=user.user_id, name=user.name, latitude=user.latitude, longitude=user.longitude)
+
+@user_router.get("/notifications", response_model=NotificationsResponse)
+async def get_notifications(
+    after: int = Query(0, ge=0),
+    timeout: float = Query(0, ge=0, le=settings.NOTIFICATION_LONG_POLL_MAX_TIMEOUT),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_token),
+) -> NotificationsResponse:
+    return await _get_notifications(current_user, after, timeout, db)
@@ -0,0 +1,48 @@
+from collections import OrderedDict
+from typing import Optional
+
+import settings
+
+###############################################
+# БЛОК ОПРЕДЕЛЕНИЯ КЛИЕНТА ДЛЯ MIDDLEWARE API #
+###############################################
+
+
+class ClientIdentity:
+    """Resolves a request to its bearer token subject or client IP.
+
+    Verified token subjects are cached, least recently used tokens are evicted.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self._token_subjects: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._max_keys = max_keys
+
+    def get_client_key(self, scope) -> str:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    subject = self._get_token_subject(token)
+                    if subject is not None:
+                        return f"sub:{subject}"
+                break
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    def _get_token_subject(self, token: str) -> Optional[str]:
+        if token in self._token_subjects:
+            self._token_subjects.move_to_end(token)
+            return self._token_subjects[token]
+        from jose import jwt
+        from jose import JWTError
+
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            subject = payload.get("sub")
+        except JWTError:
+            subject = None
+        self._token_subjects[token] = subject
+        if len(self._token_subjects) > self._max_keys:
+            self._token_subjects.popitem(last=False)
+        return subject
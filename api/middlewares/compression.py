@@ -0,0 +1,110 @@
+import gzip
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.datastructures import MutableHeaders
+
+###############################
+# БЛОК СЖАТИЯ ОТВЕТОВ СЕРВЕРА #
+###############################
+
+COMPRESSIBLE_CONTENT_TYPES = ("application/json", "text/")
+
+
+def _parse_accept_encoding(value: str) -> dict:
+    """Map of content codings to their q-values from an Accept-Encoding header"""
+    codings = {}
+    for item in value.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        codings[coding] = quality
+    return codings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """gzip when the client accepts it, the only coding supported"""
+    codings = _parse_accept_encoding(accept_encoding)
+    if codings.get("gzip", codings.get("*", 0.0)) > 0:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing single-chunk responses with gzip.
+
+    Streaming responses (more than one body chunk) are passed through untouched.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        threadpool_min_size: int = 65536,
+        enabled: bool = True,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.threadpool_min_size = threadpool_min_size
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            if message.get("more_body", False) or not self._is_compressible(headers, body):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+            if len(body) >= self.threadpool_min_size:
+                body = await run_in_threadpool(self.compress, body, encoding)
+            else:
+                body = self.compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _is_compressible(self, headers: MutableHeaders, body: bytes) -> bool:
+        if len(body) < self.minimum_size or "content-encoding" in headers:
+            return False
+        return headers.get("content-type", "").startswith(COMPRESSIBLE_CONTENT_TYPES)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
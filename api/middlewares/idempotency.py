@@ -0,0 +1,281 @@
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from logging import getLogger
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.responses import JSONResponse
+
+from api.middlewares.client_identity import ClientIdentity
+from db.dals import IdempotencyKeyDAL
+from db.session import get_session_factory
+
+logger = getLogger(__name__)
+
+#############################################
+# БЛОК ПОВТОРНЫХ ЗАПРОСОВ С IDEMPOTENCY KEY #
+#############################################
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+# expired DB rows are purged once per this many saved responses
+DB_PURGE_EVERY = 1000
+
+
+class IdempotencyRecord:
+    __slots__ = ("fingerprint", "status_code", "headers", "body", "expires_at")
+
+    def __init__(self, fingerprint: str, expires_at: float):
+        self.fingerprint = fingerprint
+        self.status_code: Optional[int] = None
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.body = b""
+        self.expires_at = expires_at
+
+    @property
+    def in_flight(self) -> bool:
+        return self.status_code is None
+
+
+class IdempotencyStore:
+    """Responses by idempotency key with a fixed TTL and a bound on stored keys.
+
+    Records are kept in expiry order, so eviction only looks at the oldest ones.
+    """
+
+    def __init__(self, ttl: float, max_keys: int):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._records: "OrderedDict[str, IdempotencyRecord]" = OrderedDict()
+
+    def _evict(self, now: float):
+        while self._records:
+            record = next(iter(self._records.values()))
+            if record.expires_at > now and len(self._records) <= self.max_keys:
+                break
+            self._records.popitem(last=False)
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[IdempotencyRecord]:
+        if now is None:
+            now = time.monotonic()
+        self._evict(now)
+        return self._records.get(key)
+
+    def reserve(self, key: str, fingerprint: str, now: Optional[float] = None) -> IdempotencyRecord:
+        """Mark key as in flight until the response is completed or released"""
+        if now is None:
+            now = time.monotonic()
+        record = IdempotencyRecord(fingerprint, now + self.ttl)
+        self._records[key] = record
+        self._records.move_to_end(key)
+        self._evict(now)
+        return record
+
+    def complete(
+        self,
+        key: str,
+        record: IdempotencyRecord,
+        status_code: int,
+        headers: Iterable[Tuple[bytes, bytes]],
+        body: bytes,
+        now: Optional[float] = None,
+    ):
+        if now is None:
+            now = time.monotonic()
+        record.status_code = status_code
+        record.headers = list(headers)
+        record.body = body
+        record.expires_at = now + self.ttl
+        self._records[key] = record
+        self._records.move_to_end(key)
+        self._evict(now)
+
+    def release(self, key: str, record: IdempotencyRecord):
+        if self._records.get(key) is record:
+            del self._records[key]
+
+
+# auth, lookup and conflict failures can pass on a retry once their cause is fixed,
+# throttling is transient
+RETRYABLE_CLIENT_ERRORS = frozenset({401, 403, 404, 409, 429})
+
+
+def _is_replayable(status_code: Optional[int]) -> bool:
+    # successes and client errors the handler would return again; server errors run again
+    if status_code is None:
+        return False
+    if 200 <= status_code < 300:
+        return True
+    return 400 <= status_code < 500 and status_code not in RETRYABLE_CLIENT_ERRORS
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware replaying the stored response for a retried Idempotency-Key.
+
+    The key is scoped to the client (token subject or IP), method and path. Reusing
+    a key with a different body or query string is rejected with 422, a retry that
+    arrives while the original is still running gets 409.
+    """
+
+    def __init__(
+        self,
+        app,
+        routes: Iterable[Tuple[str, str]],
+        ttl: float = 24 * 60 * 60,
+        max_keys: int = 100000,
+        use_database: bool = False,
+        enabled: bool = True,
+    ):
+        self.app = app
+        self.routes = frozenset(routes)
+        self.enabled = enabled
+        self.use_database = use_database
+        self._store = IdempotencyStore(ttl=ttl, max_keys=max_keys)
+        self._client_identity = ClientIdentity(max_keys=max_keys)
+        self._db_saves = 0
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or (scope["method"], scope["path"]) not in self.routes:
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = None
+        for name, value in scope["headers"]:
+            if name == IDEMPOTENCY_HEADER:
+                idempotency_key = value
+                break
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            response = JSONResponse(status_code=400, content={"detail": "Invalid Idempotency-Key header."})
+            await response(scope, receive, send)
+            return
+
+        body_messages = []
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                body_messages.append(message)
+                break
+            body_messages.append(message)
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        key = hashlib.sha256(
+            b"\n".join(
+                (
+                    self._client_identity.get_client_key(scope).encode(),
+                    scope["method"].encode(),
+                    scope["path"].encode(),
+                    idempotency_key,
+                )
+            )
+        ).hexdigest()
+        fingerprint = hashlib.sha256(scope["query_string"] + b"\n" + body).hexdigest()
+
+        record = self._store.get(key)
+        if record is None and self.use_database:
+            record = await self._load_record(key)
+        if record is not None:
+            await self._respond_to_retry(record, fingerprint, scope, receive, send)
+            return
+
+        record = self._store.reserve(key, fingerprint)
+        status_code = None
+        headers = []
+        chunks = []
+
+        async def replay_receive():
+            if body_messages:
+                return body_messages.pop(0)
+            return await receive()
+
+        async def send_wrapper(message):
+            nonlocal status_code, headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, send_wrapper)
+        except BaseException:
+            self._store.release(key, record)
+            raise
+        if not _is_replayable(status_code):
+            self._store.release(key, record)
+            return
+        response_body = b"".join(chunks)
+        self._store.complete(key, record, status_code, headers, response_body)
+        if self.use_database:
+            await self._save_record(key, record)
+
+    async def _respond_to_retry(self, record: IdempotencyRecord, fingerprint: str, scope, receive, send):
+        if record.fingerprint != fingerprint:
+            response = JSONResponse(
+                status_code=422,
+                content={"detail": "Idempotency-Key was already used for a different request."},
+            )
+        elif record.in_flight:
+            response = JSONResponse(
+                status_code=409,
+                content={"detail": "A request with this Idempotency-Key is still in progress."},
+                headers={"Retry-After": "1"},
+            )
+        else:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": record.status_code,
+                    "headers": record.headers + [(b"idempotent-replayed", b"true")],
+                }
+            )
+            await send({"type": "http.response.body", "body": record.body})
+            return
+        await response(scope, receive, send)
+
+    async def _load_record(self, key: str) -> Optional[IdempotencyRecord]:
+        try:
+            async with get_session_factory()() as session:
+                async with session.begin():
+                    idempotency_key_dal = IdempotencyKeyDAL(session)
+                    row = await idempotency_key_dal.get_key(key)
+        except (OSError, SQLAlchemyError) as err:
+            logger.error(f"Could not load idempotency key: {err}")
+            return None
+        if row is None:
+            return None
+        record = IdempotencyRecord(row.fingerprint, 0)
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in row.headers]
+        self._store.complete(key, record, row.status_code, headers, row.body)
+        return record
+
+    async def _save_record(self, key: str, record: IdempotencyRecord):
+        self._db_saves += 1
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self._store.ttl)
+        try:
+            async with get_session_factory()() as session:
+                async with session.begin():
+                    idempotency_key_dal = IdempotencyKeyDAL(session)
+                    await idempotency_key_dal.save_key(
+                        key=key,
+                        fingerprint=record.fingerprint,
+                        status_code=record.status_code,
+                        headers=[
+                            [name.decode("latin-1"), value.decode("latin-1")] for name, value in record.headers
+                        ],
+                        body=record.body,
+                        expires_at=expires_at,
+                    )
+                    if self._db_saves % DB_PURGE_EVERY == 0:
+                        await idempotency_key_dal.delete_expired_keys()
+        except (OSError, SQLAlchemyError) as err:
+            logger.error(f"Could not save idempotency key: {err}")
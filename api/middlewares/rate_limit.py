@@ -0,0 +1,93 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from api.middlewares.client_identity import ClientIdentity
+
+#####################################
+# БЛОК ОГРАНИЧЕНИЯ ЧАСТОТЫ ЗАПРОСОВ #
+#####################################
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by client, evicting least recently seen keys"""
+
+    def __init__(self, capacity: int, refill_rate: float, max_keys: int):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[object, list]" = OrderedDict()
+
+    def clear(self):
+        self._buckets.clear()
+
+    def consume(self, key, now: Optional[float] = None) -> float:
+        """Take one token for key. Returns 0 if allowed, otherwise seconds to wait"""
+        if now is None:
+            now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(self.capacity), now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            tokens = bucket[0] + (now - bucket[1]) * self.refill_rate
+            bucket[0] = min(float(self.capacity), tokens)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.refill_rate
+
+
+class RateLimitMiddleware:
+    """ASGI middleware limiting requests per route by bearer token subject or client IP"""
+
+    def __init__(
+        self,
+        app,
+        default_budget: Tuple[int, float],
+        route_budgets: Dict[str, Tuple[int, float]],
+        max_keys: int = 100000,
+        enabled: bool = True,
+    ):
+        self.app = app
+        self.enabled = enabled
+        self._default_limiter = TokenBucketLimiter(*default_budget, max_keys=max_keys)
+        self._route_limiters = {
+            path: TokenBucketLimiter(*budget, max_keys=max_keys)
+            for path, budget in route_budgets.items()
+        }
+        self._client_identity = ClientIdentity(max_keys=max_keys)
+
+    def reset(self):
+        """Refill every bucket, budgets are per process and otherwise live as long as it"""
+        self._default_limiter.clear()
+        for limiter in self._route_limiters.values():
+            limiter.clear()
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        limiter = self._route_limiters.get(path)
+        key = self._client_identity.get_client_key(scope)
+        if limiter is None:
+            limiter = self._default_limiter
+            key = (path, key)
+        retry_after = limiter.consume(key)
+        if retry_after:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests"},
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -1,9 +1,13 @@
 import re
 import uuid
+from datetime import datetime
+from typing import List
 from typing import Optional
 
 from fastapi import HTTPException
 from pydantic import BaseModel
+from pydantic import confloat
+from pydantic import conlist
 from pydantic import constr
 from pydantic import EmailStr
 from pydantic import validator
@@ -27,6 +31,13 @@ class ShowUser(TunedModel):
     email: EmailStr
     is_active: bool
 
+class ShowUserWithRoles(ShowUser):
+    roles: List[str]
+
+class UsersPage(BaseModel):
+    users: List[ShowUserWithRoles]
+    next_cursor: Optional[str]
+
 class ShowUserCoords(TunedModel):
     user_id: uuid.UUID
     name: str
@@ -85,6 +96,17 @@ class UpdateUserRequest(BaseModel):
             )
         return value
 
+class ImportUserRowError(BaseModel):
+    row: int
+    email: Optional[str]
+    error: str
+
+
+class ImportUsersResponse(BaseModel):
+    imported: int
+    duplicates: List[str]
+    errors: List[ImportUserRowError]
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -103,6 +125,45 @@ class ShowDogCoords(TunedModel):
     longitude: float
     latitude: float
 
+class IngestPositionsResponse(BaseModel):
+    received: int
+    rejected: int
+    duplicates: int
+    updated: int
+
+class DogSearchResult(BaseModel):
+    dog_id: uuid.UUID
+    name: str
+    match: str
+    score: float
+
+class AreaCellStats(BaseModel):
+    min_latitude: float
+    min_longitude: float
+    max_latitude: float
+    max_longitude: float
+    active_dogs: int
+    open_tasks: int
+
+class AreaStatsResponse(BaseModel):
+    cell_size: float
+    active_dogs: int
+    open_tasks: int
+    unlocated_dogs: int
+    unlocated_open_tasks: int
+    reconciled_at: Optional[datetime]
+    cells: List[AreaCellStats]
+
+class ShowDogDistance(TunedModel):
+    dog_id: uuid.UUID
+    name: str
+    longitude: float
+    latitude: float
+    distance: Optional[float]
+
+class ShowNearestDog(ShowDogDistance):
+    open_tasks: int
+
 
 class DogCreate(BaseModel):
     name: str
@@ -160,6 +221,9 @@ class TaskCreate(BaseModel):
     description: str
     created_for: uuid.UUID
 
+class BulkTaskCreate(BaseModel):
+    tasks: conlist(TaskCreate, min_items=1, max_items=1000)
+
 class UpdateTask(BaseModel):
     description: str
 
@@ -183,3 +247,78 @@ class CloseTaskResponse(BaseModel):
 class UpdatedTaskResponse(BaseModel):
     updated_task_id: uuid.UUID
 
+class BulkTaskItemResult(BaseModel):
+    index: int
+    task: Optional[ShowTask]
+    error: Optional[str]
+
+class BulkTaskCreateResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkTaskItemResult]
+
+class ProposedAssignment(BaseModel):
+    task_id: uuid.UUID
+    user_id: uuid.UUID
+    distance: float
+
+class ProposedAssignmentsResponse(BaseModel):
+    method: str
+    total_distance: float
+    assignments: List[ProposedAssignment]
+    unassigned_task_ids: List[uuid.UUID]
+
+class ShowNotification(BaseModel):
+    notification_id: int
+    task_id: uuid.UUID
+    dog_id: uuid.UUID
+    dog_name: str
+    description: str
+    distance: float
+    created_at: datetime
+
+class NotificationsResponse(BaseModel):
+    last_notification_id: int
+    notifications: List[ShowNotification]
+
+class TaskSearchResult(TunedModel):
+    task_id: uuid.UUID
+    description: str
+    created_by: uuid.UUID
+    created_for: uuid.UUID
+    is_active: bool
+    rank: float
+
+class TaskSearchResponse(BaseModel):
+    results: List[TaskSearchResult]
+    next_cursor: Optional[str]
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: uuid.UUID
+    name: str
+    surname: str
+    completed_tasks: int
+
+class LeaderboardResponse(BaseModel):
+    top: List[LeaderboardEntry]
+    my_rank: Optional[int]
+    my_completed_tasks: int
+    ranked_users: int
+
+class RoutePlanRequest(BaseModel):
+    task_ids: conlist(uuid.UUID, min_items=1, max_items=500)
+    latitude: confloat(ge=-90.0, le=90.0)
+    longitude: confloat(ge=-180.0, le=180.0)
+
+class RouteStop(BaseModel):
+    task_id: uuid.UUID
+    dog_id: uuid.UUID
+    latitude: float
+    longitude: float
+    distance_from_previous: float
+
+class RoutePlanResponse(BaseModel):
+    total_distance: float
+    stops: List[RouteStop]
+    unresolved_task_ids: List[uuid.UUID]
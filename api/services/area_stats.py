@@ -0,0 +1,242 @@
+import asyncio
+import math
+from datetime import datetime
+from datetime import timezone
+from logging import getLogger
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy.exc import SQLAlchemyError
+
+import settings
+from db.dals import DogDAL
+from db.dals import TaskDAL
+
+logger = getLogger(__name__)
+
+#####################################
+# БЛОК СТАТИСТИКИ ПО УЧАСТКАМ КАРТЫ #
+#####################################
+
+Cell = Optional[Tuple[int, int]]
+
+
+class AreaCounters:
+    """Active dogs and open tasks per grid cell, dogs without a position are in the None cell.
+
+    Open tasks are tracked by id, so opening or closing the same task twice
+    changes nothing and events can be replayed over a DB snapshot.
+    """
+
+    def __init__(self):
+        # cell -> [active dogs, open tasks]
+        self.cells: Dict[Cell, List[int]] = {}
+        self.dog_cells: Dict[UUID, Cell] = {}
+        self.dog_tasks: Dict[UUID, Set[UUID]] = {}
+        self.task_dogs: Dict[UUID, UUID] = {}
+
+    def _change(self, cell: Cell, dogs: int, tasks: int):
+        counts = self.cells.get(cell)
+        if counts is None:
+            counts = self.cells[cell] = [0, 0]
+        counts[0] += dogs
+        counts[1] += tasks
+        if counts == [0, 0]:
+            del self.cells[cell]
+
+    def move_dog(self, dog_id: UUID, cell: Cell):
+        tasks = len(self.dog_tasks.get(dog_id, ()))
+        if dog_id in self.dog_cells:
+            old_cell = self.dog_cells[dog_id]
+            if old_cell == cell:
+                return
+            self._change(old_cell, -1, -tasks)
+        self.dog_cells[dog_id] = cell
+        self._change(cell, 1, tasks)
+
+    def add_dog(self, dog_id: UUID):
+        if dog_id not in self.dog_cells:
+            self.move_dog(dog_id, None)
+
+    def remove_dog(self, dog_id: UUID):
+        if dog_id not in self.dog_cells:
+            return
+        # tasks of a removed dog are closed in bulk by a background job
+        tasks = self.dog_tasks.pop(dog_id, set())
+        for task_id in tasks:
+            del self.task_dogs[task_id]
+        self._change(self.dog_cells.pop(dog_id), -1, -len(tasks))
+
+    def open_task(self, task_id: UUID, dog_id: UUID):
+        if task_id in self.task_dogs:
+            return
+        # a dog created by another process is counted as not located until it moves
+        self.add_dog(dog_id)
+        self.task_dogs[task_id] = dog_id
+        self.dog_tasks.setdefault(dog_id, set()).add(task_id)
+        self._change(self.dog_cells[dog_id], 0, 1)
+
+    def close_task(self, task_id: UUID):
+        dog_id = self.task_dogs.pop(task_id, None)
+        if dog_id is None:
+            return
+        tasks = self.dog_tasks[dog_id]
+        tasks.discard(task_id)
+        if not tasks:
+            del self.dog_tasks[dog_id]
+        self._change(self.dog_cells[dog_id], 0, -1)
+
+
+class AreaStats:
+    """Per-cell counts of active dogs and open tasks kept up to date by write events.
+
+    Handlers report dog moves and removals and task opening and closing, so
+    a summary costs O(cells) and never touches the tables. Writes made by
+    other processes (another API worker, the LoRa listener) are picked up by
+    a periodic reconciliation that rebuilds the counters from the DB; events
+    arriving while the snapshot is read are replayed over it.
+    """
+
+    def __init__(self, cell_size: float, reconcile_interval: float):
+        self.cell_size = cell_size
+        self.reconcile_interval = reconcile_interval
+        self._lon_cells = math.ceil(360 / cell_size)
+        self.session_factory = None
+        self._reconcile_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.clear()
+
+    def clear(self):
+        self._counters = AreaCounters()
+        self._pending: Optional[list] = None
+        self.reconciled_at: Optional[datetime] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.reconciled_at is not None
+
+    def _cell(self, latitude: Optional[float], longitude: Optional[float]) -> Cell:
+        if latitude is None or longitude is None:
+            return None
+        return (
+            math.floor((latitude + 90) / self.cell_size),
+            math.floor((longitude + 180) / self.cell_size) % self._lon_cells,
+        )
+
+    def _apply(self, method: str, *args):
+        getattr(self._counters, method)(*args)
+        if self._pending is not None:
+            self._pending.append((method, args))
+
+    def dog_added(self, dog_id: UUID):
+        self._apply("add_dog", dog_id)
+
+    def dog_moved(self, dog_id: UUID, latitude: Optional[float], longitude: Optional[float]):
+        self._apply("move_dog", dog_id, self._cell(latitude, longitude))
+
+    def dog_removed(self, dog_id: UUID):
+        self._apply("remove_dog", dog_id)
+
+    def task_opened(self, task_id: UUID, dog_id: UUID):
+        self._apply("open_task", task_id, dog_id)
+
+    def task_closed(self, task_id: UUID):
+        self._apply("close_task", task_id)
+
+    async def reconcile(self, session) -> int:
+        """Rebuild the counters from the DB, returns the number of cells that had drifted"""
+        async with self._reconcile_lock:
+            self._pending = []
+            try:
+                dog_rows = await DogDAL(session).get_active_dog_positions()
+                task_rows = await TaskDAL(session).get_open_tasks_of_active_dogs()
+                counters = AreaCounters()
+                for dog_id, latitude, longitude in dog_rows:
+                    counters.move_dog(dog_id, self._cell(latitude, longitude))
+                for task_id, dog_id in task_rows:
+                    counters.open_task(task_id, dog_id)
+                for method, args in self._pending:
+                    getattr(counters, method)(*args)
+            finally:
+                self._pending = None
+            old_cells = self._counters.cells
+            drifted = sum(
+                old_cells.get(cell) != counters.cells.get(cell)
+                for cell in old_cells.keys() | counters.cells.keys()
+            )
+            self._counters = counters
+            self.reconciled_at = datetime.now(timezone.utc)
+        return drifted
+
+    async def ensure_loaded(self, session):
+        """Reconcile once if the counters were never built from the DB"""
+        if not self.is_loaded:
+            await self.reconcile(session)
+
+    async def start(self):
+        if self._task is not None:
+            return
+        if self.session_factory is None:
+            from db.session import get_session_factory
+
+            self.session_factory = get_session_factory()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        while True:
+            was_loaded = self.is_loaded
+            try:
+                async with self.session_factory() as session:
+                    async with session.begin():
+                        drifted = await self.reconcile(session)
+            except (OSError, SQLAlchemyError) as err:
+                logger.error(f"Could not reconcile area statistics: {err}")
+            else:
+                if was_loaded and drifted:
+                    logger.warning(f"Area statistics drifted in {drifted} cells")
+            await asyncio.sleep(self.reconcile_interval)
+
+    def summary(self) -> dict:
+        """Counts per non-empty cell with its bounds, and totals"""
+        cells = []
+        unlocated_dogs, unlocated_tasks = self._counters.cells.get(None, (0, 0))
+        total_dogs, total_tasks = unlocated_dogs, unlocated_tasks
+        for cell, (dogs, tasks) in self._counters.cells.items():
+            if cell is None:
+                continue
+            total_dogs += dogs
+            total_tasks += tasks
+            row, column = cell
+            # rounding hides float noise of the multiplication in the bounds
+            min_latitude = round(row * self.cell_size - 90, 9)
+            min_longitude = round(column * self.cell_size - 180, 9)
+            cells.append({
+                "min_latitude": min_latitude,
+                "min_longitude": min_longitude,
+                "max_latitude": min(round(min_latitude + self.cell_size, 9), 90.0),
+                "max_longitude": min(round(min_longitude + self.cell_size, 9), 180.0),
+                "active_dogs": dogs,
+                "open_tasks": tasks,
+            })
+        return {
+            "cell_size": self.cell_size,
+            "active_dogs": total_dogs,
+            "open_tasks": total_tasks,
+            "unlocated_dogs": unlocated_dogs,
+            "unlocated_open_tasks": unlocated_tasks,
+            "reconciled_at": self.reconciled_at,
+            "cells": cells,
+        }
+
+
+area_stats = AreaStats(
+    cell_size=settings.AREA_STATS_CELL_SIZE,
+    reconcile_interval=settings.AREA_STATS_RECONCILE_INTERVAL,
+)
@@ -0,0 +1,141 @@
+from typing import List, Optional, Tuple
+
+import settings
+from geo import get_distance_matrix
+
+##########################################
+# БЛОК РАСПРЕДЕЛЕНИЯ ЗАДАЧ ПО ВОЛОНТЁРАМ #
+##########################################
+
+# cost of a forbidden (too far) volunteer-task pair, far above any real distance
+FORBIDDEN_COST = 1e9
+
+
+def _hungarian(cost) -> Tuple[object, object]:
+    """Min-cost assignment of every row to a distinct column, rows <= columns.
+
+    Shortest augmenting path version with potentials, O(rows^2 * columns)
+    with the inner loop over columns vectorized.
+    """
+    import numpy as np
+
+    rows, columns = cost.shape
+    u = np.zeros(rows + 1)
+    v = np.zeros(columns + 1)
+    # column_row[j] is the 1-based row matched to column j, 0 is the virtual column
+    column_row = np.zeros(columns + 1, dtype=np.int64)
+    way = np.zeros(columns + 1, dtype=np.int64)
+    for row in range(1, rows + 1):
+        column_row[0] = row
+        column = 0
+        min_reduced = np.full(columns, np.inf)
+        used = np.zeros(columns + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current_row = column_row[column]
+            free = ~used[1:]
+            reduced = cost[current_row - 1] - u[current_row] - v[1:]
+            improved = free & (reduced < min_reduced)
+            min_reduced[improved] = reduced[improved]
+            way[1:][improved] = column
+            candidates = np.where(free, min_reduced, np.inf)
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+            u[column_row[used]] += delta
+            v[used] -= delta
+            min_reduced[free] -= delta
+            column = next_column
+            if column_row[column] == 0:
+                break
+        while column:
+            previous_column = way[column]
+            column_row[column] = column_row[previous_column]
+            column = previous_column
+    matched_columns = np.nonzero(column_row[1:])[0]
+    return column_row[1:][matched_columns] - 1, matched_columns
+
+
+def _solve_hungarian(distances, capacity: int):
+    import numpy as np
+
+    # every volunteer gets `capacity` identical rows
+    cost = np.repeat(distances, capacity, axis=0)
+    if cost.shape[0] <= cost.shape[1]:
+        slot_rows, task_columns = _hungarian(cost)
+    else:
+        task_columns, slot_rows = _hungarian(cost.T)
+    return slot_rows // capacity, task_columns
+
+
+def _solve_greedy(distances, capacity: int):
+    import numpy as np
+
+    volunteers_count, tasks_count = distances.shape
+    remaining = np.full(volunteers_count, capacity)
+    assigned_tasks = np.zeros(tasks_count, dtype=bool)
+    volunteer_indexes, task_indexes = [], []
+    left = min(tasks_count, volunteers_count * capacity)
+    for flat_index in np.argsort(distances, axis=None, kind="stable").tolist():
+        volunteer, task = divmod(flat_index, tasks_count)
+        if assigned_tasks[task] or not remaining[volunteer]:
+            continue
+        assigned_tasks[task] = True
+        remaining[volunteer] -= 1
+        volunteer_indexes.append(volunteer)
+        task_indexes.append(task)
+        left -= 1
+        if not left:
+            break
+    return np.array(volunteer_indexes, dtype=np.int64), np.array(task_indexes, dtype=np.int64)
+
+
+def choose_assignment_method(volunteers_count: int, tasks_count: int, capacity: int, method: str) -> str:
+    """Resolve auto to the exact hungarian solver while its cost matrix is small, greedy otherwise.
+
+    Raises ValueError when hungarian is requested for a cost matrix over the limit.
+    """
+    cells = volunteers_count * capacity * tasks_count
+    if method == "auto":
+        return "hungarian" if cells <= settings.ASSIGNMENT_HUNGARIAN_MAX_CELLS else "greedy"
+    if method == "hungarian" and cells > settings.ASSIGNMENT_HUNGARIAN_MAX_CELLS:
+        raise ValueError(
+            f"Too many volunteer-task pairs for the hungarian method, max {settings.ASSIGNMENT_HUNGARIAN_MAX_CELLS}"
+        )
+    return method
+
+
+def propose_assignments(
+    volunteers: List[tuple],
+    tasks: List[tuple],
+    capacity: int,
+    max_distance_km: Optional[float] = None,
+    method: str = "auto",
+) -> Tuple[str, List[tuple]]:
+    """Assign tasks to volunteers minimizing the total distance.
+
+    volunteers: (user_id, latitude, longitude), tasks: (task_id, latitude, longitude).
+    Each volunteer takes at most `capacity` tasks, pairs further than
+    max_distance_km are never proposed. Returns the used method and
+    (task_id, user_id, distance) triples, see choose_assignment_method.
+    """
+    import numpy as np
+
+    method = choose_assignment_method(len(volunteers), len(tasks), capacity, method)
+    if not volunteers or not tasks:
+        return method, []
+    distances = get_distance_matrix(
+        [volunteer[1] for volunteer in volunteers],
+        [volunteer[2] for volunteer in volunteers],
+        [task[1] for task in tasks],
+        [task[2] for task in tasks],
+    )
+    cost = distances
+    if max_distance_km is not None:
+        cost = np.where(distances > max_distance_km, FORBIDDEN_COST, distances)
+    solve = _solve_hungarian if method == "hungarian" else _solve_greedy
+    volunteer_indexes, task_indexes = solve(cost, capacity)
+    allowed = cost[volunteer_indexes, task_indexes] < FORBIDDEN_COST
+    return method, [
+        (tasks[task][0], volunteers[volunteer][0], float(distances[volunteer, task]))
+        for volunteer, task in zip(volunteer_indexes[allowed].tolist(), task_indexes[allowed].tolist())
+    ]
@@ -0,0 +1,271 @@
+import asyncio
+import random
+from collections import Counter
+from logging import getLogger
+from typing import Awaitable, Callable, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy.exc import SQLAlchemyError
+
+import settings
+from db.dals import JobDAL
+
+logger = getLogger(__name__)
+
+#########################################
+# БЛОК ФОНОВОЙ ОЧЕРЕДИ ОТЛОЖЕННЫХ ЗАДАЧ #
+#########################################
+
+JobHandler = Callable[..., Awaitable[None]]
+
+
+class Job:
+    __slots__ = ("name", "payload", "attempts", "job_id")
+
+    def __init__(self, name: str, payload: dict, attempts: int = 0, job_id: Optional[UUID] = None):
+        self.name = name
+        self.payload = payload
+        self.attempts = attempts
+        self.job_id = job_id
+
+
+class JobQueue:
+    """Asyncio job queue with a fixed pool of workers and retries with exponential backoff.
+
+    A job handler is registered by name and called as handler(session, **payload)
+    inside its own transaction. In memory the queue is bounded and lost on
+    restart; with persistence jobs are rows of the jobs table, claimed by any
+    worker process with SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_size: int,
+        max_attempts: int,
+        retry_base_delay: float,
+        retry_max_delay: float,
+        persistent: bool = False,
+        poll_interval: float = 1.0,
+        lock_timeout: float = 300,
+        shutdown_timeout: float = 5,
+    ):
+        self.workers = workers
+        self.max_size = max_size
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.persistent = persistent
+        self.poll_interval = poll_interval
+        self.lock_timeout = lock_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.session_factory = None
+        self.counters = Counter()
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._retry_handles = set()
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._worker_tasks)
+
+    def job(self, name: str):
+        """Decorator registering a job handler under name"""
+
+        def register(handler: JobHandler) -> JobHandler:
+            self._handlers[name] = handler
+            return handler
+
+        return register
+
+    async def start(self):
+        if self.is_running:
+            return
+        if self.session_factory is None:
+            from db.session import get_session_factory
+
+            self.session_factory = get_session_factory()
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._wakeup = asyncio.Event()
+        worker = self._run_persistent_worker if self.persistent else self._run_worker
+        self._worker_tasks = [asyncio.create_task(worker()) for _ in range(self.workers)]
+        if self.persistent:
+            self._worker_tasks.append(asyncio.create_task(self._run_stale_job_releaser()))
+
+    async def stop(self):
+        """Let queued jobs finish for up to shutdown_timeout seconds, then cancel workers"""
+        if not self.is_running:
+            return
+        if not self.persistent:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=self.shutdown_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Job queue stopped with {self._queue.qsize()} jobs left")
+        for handle in self._retry_handles:
+            handle.cancel()
+        self._retry_handles.clear()
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def enqueue(self, name: str, payload: dict) -> bool:
+        """Schedule a job. Returns False if it was not accepted and the caller should do the work inline"""
+        if name not in self._handlers:
+            raise ValueError(f"Unknown job {name}")
+        if not self.is_running:
+            return False
+        if self.persistent:
+            try:
+                async with self.session_factory() as session:
+                    async with session.begin():
+                        await JobDAL(session).enqueue_job(name, payload)
+            except (OSError, SQLAlchemyError) as err:
+                logger.error(f"Could not persist job {name}: {err}")
+                return False
+            self._wakeup.set()
+        else:
+            try:
+                self._queue.put_nowait(Job(name, payload))
+            except asyncio.QueueFull:
+                self.counters["rejected"] += 1
+                return False
+        self.counters["enqueued"] += 1
+        return True
+
+    def _retry_delay(self, attempts: int) -> float:
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+        # jitter spreads retries of jobs that failed together
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _execute(self, job: Job):
+        handler = self._handlers[job.name]
+        async with self.session_factory() as session:
+            async with session.begin():
+                await handler(session, **job.payload)
+
+    async def _run_worker(self):
+        while True:
+            job = await self._queue.get()
+            job.attempts += 1
+            try:
+                await self._execute(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                self._on_memory_job_error(job, err)
+            else:
+                self.counters["completed"] += 1
+            finally:
+                self._queue.task_done()
+
+    def _on_memory_job_error(self, job: Job, err: Exception):
+        if job.attempts >= self.max_attempts:
+            self.counters["failed"] += 1
+            logger.error(f"Job {job.name} failed after {job.attempts} attempts: {err}")
+            return
+        self.counters["retried"] += 1
+        handle = None
+
+        def requeue():
+            self._retry_handles.discard(handle)
+            try:
+                self._queue.put_nowait(job)
+            except asyncio.QueueFull:
+                self.counters["failed"] += 1
+                logger.error(f"Job {job.name} dropped, the queue is full")
+
+        handle = asyncio.get_running_loop().call_later(self._retry_delay(job.attempts), requeue)
+        self._retry_handles.add(handle)
+
+    async def _run_persistent_worker(self):
+        while True:
+            try:
+                job = await self._claim_job()
+            except (OSError, SQLAlchemyError) as err:
+                logger.error(f"Could not claim a job: {err}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._execute(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                await self._finish_persistent_job(job, err)
+            else:
+                await self._finish_persistent_job(job, None)
+
+    async def _claim_job(self) -> Optional[Job]:
+        async with self.session_factory() as session:
+            async with session.begin():
+                row = await JobDAL(session).claim_job()
+        if row is None:
+            return None
+        if row.name not in self._handlers:
+            # a job for a handler this process does not know, it stays for lock_timeout
+            logger.error(f"Claimed job {row.job_id} with unknown handler {row.name}")
+            return None
+        return Job(row.name, row.payload, row.attempts, row.job_id)
+
+    async def _finish_persistent_job(self, job: Job, err: Optional[Exception]):
+        try:
+            async with self.session_factory() as session:
+                async with session.begin():
+                    job_dal = JobDAL(session)
+                    if err is None:
+                        await job_dal.complete_job(job.job_id)
+                        self.counters["completed"] += 1
+                    elif job.attempts >= self.max_attempts:
+                        await job_dal.fail_job(job.job_id, repr(err))
+                        self.counters["failed"] += 1
+                        logger.error(f"Job {job.name} failed after {job.attempts} attempts: {err}")
+                    else:
+                        await job_dal.retry_job(job.job_id, self._retry_delay(job.attempts), repr(err))
+                        self.counters["retried"] += 1
+        except (OSError, SQLAlchemyError) as db_err:
+            # the job stays running and is released after lock_timeout
+            logger.error(f"Could not finish job {job.job_id}: {db_err}")
+
+    async def _run_stale_job_releaser(self):
+        # runs however busy the workers are, a job of a stopped worker
+        # goes back to the queue within 1.5 lock timeouts
+        while True:
+            await asyncio.sleep(self.lock_timeout / 2)
+            await self._release_stale_jobs()
+
+    async def _release_stale_jobs(self):
+        try:
+            async with self.session_factory() as session:
+                async with session.begin():
+                    released, failed = await JobDAL(session).release_stale_jobs(
+                        self.lock_timeout, self.max_attempts
+                    )
+        except (OSError, SQLAlchemyError) as err:
+            logger.error(f"Could not release stale jobs: {err}")
+            return
+        if released:
+            logger.warning(f"Released {released} jobs of stopped workers")
+        if failed:
+            self.counters["failed"] += failed
+            logger.error(f"Failed {failed} jobs of stopped workers after {self.max_attempts} attempts")
+
+
+job_queue = JobQueue(
+    workers=settings.JOB_QUEUE_WORKERS,
+    max_size=settings.JOB_QUEUE_MAX_SIZE,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+    retry_base_delay=settings.JOB_RETRY_BASE_DELAY,
+    retry_max_delay=settings.JOB_RETRY_MAX_DELAY,
+    persistent=settings.JOB_QUEUE_PERSISTENT,
+    poll_interval=settings.JOB_POLL_INTERVAL,
+    lock_timeout=settings.JOB_LOCK_TIMEOUT,
+    shutdown_timeout=settings.JOB_SHUTDOWN_TIMEOUT,
+)
@@ -0,0 +1,117 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+import settings
+from db.dals import UserDAL
+
+############################
+# БЛОК РЕЙТИНГА ВОЛОНТЁРОВ #
+############################
+
+
+class FenwickTree:
+    """Prefix sums over positions 1..size with O(log size) updates and queries"""
+
+    def __init__(self, frequencies: List[int]):
+        # frequencies[0] is unused, positions start at 1
+        self.size = len(frequencies) - 1
+        self._tree = list(frequencies)
+        for position in range(1, self.size + 1):
+            parent = position + (position & -position)
+            if parent <= self.size:
+                self._tree[parent] += self._tree[position]
+
+    def add(self, position: int, delta: int):
+        while position <= self.size:
+            self._tree[position] += delta
+            position += position & -position
+
+    def prefix_sum(self, position: int) -> int:
+        total = 0
+        position = min(position, self.size)
+        while position > 0:
+            total += self._tree[position]
+            position -= position & -position
+        return total
+
+
+class CompletionRanks:
+    """Ranks of volunteers by completed tasks from a Fenwick tree over the counts.
+
+    The tree holds how many users have each completed task count, so the
+    rank of a count (1 + users with a larger count, ties share a rank) is
+    one prefix sum. Closes in this process update it as they commit; the
+    tree is rebuilt from a grouped count over the users index when it is
+    older than reload_interval or was invalidated.
+    """
+
+    def __init__(self, reload_interval: float):
+        self.reload_interval = reload_interval
+        self._load_lock = asyncio.Lock()
+        self.clear()
+
+    def clear(self):
+        self._tree = FenwickTree([0])
+        self._frequencies: List[int] = [0]
+        self.ranked_users = 0
+        self._loaded_at: Optional[float] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.reload_interval
+        )
+
+    def invalidate(self):
+        """Rebuild on next use, for bulk changes that were not reported one by one"""
+        self._loaded_at = None
+
+    async def ensure_loaded(self, session):
+        if self.is_loaded:
+            return
+        async with self._load_lock:
+            if self.is_loaded:
+                return
+            histogram = await UserDAL(session).get_completed_tasks_histogram()
+            self._build(histogram)
+            self._loaded_at = time.monotonic()
+
+    def _build(self, histogram: Dict[int, int], size: int = 0):
+        size = max(size, max(histogram, default=0), 64)
+        frequencies = [0] * (size + 1)
+        for completed_tasks_count, users in histogram.items():
+            frequencies[completed_tasks_count] = users
+        self._frequencies = frequencies
+        self._tree = FenwickTree(frequencies)
+        self.ranked_users = sum(frequencies)
+
+    def _change(self, completed_tasks_count: int, users: int):
+        if completed_tasks_count <= 0:
+            return
+        if completed_tasks_count > self._tree.size:
+            histogram = {count: number for count, number in enumerate(self._frequencies) if number}
+            self._build(histogram, size=completed_tasks_count * 2)
+        if self._frequencies[completed_tasks_count] + users < 0:
+            # the user was not in the last snapshot
+            return
+        self._frequencies[completed_tasks_count] += users
+        self._tree.add(completed_tasks_count, users)
+        self.ranked_users += users
+
+    def task_completed(self, completed_tasks_count: int, completed: int = 1):
+        """A user reached completed_tasks_count by completing completed more tasks"""
+        if self._loaded_at is None:
+            return
+        self._change(completed_tasks_count - completed, -1)
+        self._change(completed_tasks_count, 1)
+
+    def rank(self, completed_tasks_count: int) -> Optional[int]:
+        """Competition rank of a completed task count, None for users without completed tasks"""
+        if completed_tasks_count <= 0:
+            return None
+        return 1 + self.ranked_users - self._tree.prefix_sum(completed_tasks_count)
+
+
+completion_ranks = CompletionRanks(reload_interval=settings.LEADERBOARD_RELOAD_INTERVAL)
@@ -0,0 +1,182 @@
+import asyncio
+import bisect
+import heapq
+import math
+import re
+import time
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from uuid import UUID
+
+import settings
+from db.dals import DogDAL
+
+###############################
+# БЛОК ПОИСКА СОБАК ПО КЛИЧКЕ #
+###############################
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def normalize_name(name: str) -> str:
+    """Case-insensitive form of a name, ё is folded into е as Russian users type it either way"""
+    return " ".join(WORD_PATTERN.findall(name.casefold().replace("ё", "е")))
+
+
+def get_trigrams(normalized: str) -> FrozenSet[str]:
+    """Trigrams of every word padded like pg_trgm does: two spaces before, one after"""
+    trigrams = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(trigrams)
+
+
+class DogNameIndex:
+    """Prefix and fuzzy search over names of active dogs.
+
+    Normalized names are kept in a sorted list, so a prefix lookup is a
+    bisection followed by a scan of the matches only. Fuzzy matches are
+    ranked by trigram similarity (shared / all distinct trigrams of both
+    names); candidates are gathered from the rarest trigrams of the query
+    only, enough of them that any name reaching min_similarity shares at
+    least one, and then checked exactly.
+    """
+
+    def __init__(self, min_similarity: float, reload_interval: float):
+        self.min_similarity = min_similarity
+        self.reload_interval = reload_interval
+        self._load_lock = asyncio.Lock()
+        self.clear()
+
+    def clear(self):
+        self._names: Dict[UUID, str] = {}
+        self._normalized: Dict[UUID, str] = {}
+        self._sorted: List[Tuple[str, UUID]] = []
+        self._trigrams: Dict[UUID, FrozenSet[str]] = {}
+        self._postings: Dict[str, Set[UUID]] = defaultdict(set)
+        self._loaded_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @property
+    def is_loaded(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.reload_interval
+        )
+
+    async def ensure_loaded(self, session):
+        """(Re)load names of active dogs from the DB when the index is empty or stale"""
+        if self.is_loaded:
+            return
+        async with self._load_lock:
+            if self.is_loaded:
+                return
+            dog_dal = DogDAL(session)
+            active_dogs = await dog_dal.get_active_dog_rows()
+            self.clear()
+            for dog in active_dogs:
+                self._add(dog.dog_id, dog.name)
+            self._sorted.sort()
+            self._loaded_at = time.monotonic()
+
+    def _add(self, dog_id: UUID, name: str):
+        normalized = normalize_name(name)
+        trigrams = get_trigrams(normalized)
+        self._names[dog_id] = name
+        self._normalized[dog_id] = normalized
+        self._trigrams[dog_id] = trigrams
+        self._sorted.append((normalized, dog_id))
+        for trigram in trigrams:
+            self._postings[trigram].add(dog_id)
+
+    def upsert(self, dog_id: UUID, name: str):
+        self.remove(dog_id)
+        self._add(dog_id, name)
+        # the appended entry is moved into place, cheap next to rebuilding the list
+        entry = self._sorted.pop()
+        bisect.insort(self._sorted, entry)
+
+    def remove(self, dog_id: UUID):
+        normalized = self._normalized.pop(dog_id, None)
+        if normalized is None:
+            return
+        del self._names[dog_id]
+        position = bisect.bisect_left(self._sorted, (normalized, dog_id))
+        del self._sorted[position]
+        for trigram in self._trigrams.pop(dog_id):
+            postings = self._postings[trigram]
+            postings.discard(dog_id)
+            if not postings:
+                del self._postings[trigram]
+
+    def _prefix_matches(self, prefix: str, limit: int) -> List[UUID]:
+        dog_ids = []
+        position = bisect.bisect_left(self._sorted, (prefix,))
+        while position < len(self._sorted) and len(dog_ids) < limit:
+            normalized, dog_id = self._sorted[position]
+            if not normalized.startswith(prefix):
+                break
+            dog_ids.append(dog_id)
+            position += 1
+        return dog_ids
+
+    def _fuzzy_matches(self, normalized: str) -> List[Tuple[float, UUID]]:
+        query_trigrams = get_trigrams(normalized)
+        if not query_trigrams:
+            return []
+        # similarity >= min_similarity needs at least min_shared common trigrams
+        min_shared = max(1, math.ceil(self.min_similarity * len(query_trigrams)))
+        posting_lists = sorted(
+            (self._postings.get(trigram, set()) for trigram in query_trigrams), key=len
+        )
+        candidates = set().union(*posting_lists[:len(query_trigrams) - min_shared + 1])
+        matches = []
+        for dog_id in candidates:
+            trigrams = self._trigrams[dog_id]
+            shared = len(query_trigrams & trigrams)
+            similarity = shared / (len(query_trigrams) + len(trigrams) - shared)
+            if similarity >= self.min_similarity:
+                matches.append((similarity, dog_id))
+        return matches
+
+    def search(self, query: str, limit: int) -> List[dict]:
+        """Exact and prefix matches first, in name order, then fuzzy matches by similarity"""
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+        results = []
+        for dog_id in self._prefix_matches(normalized, limit):
+            is_exact = self._normalized[dog_id] == normalized
+            results.append({
+                "dog_id": dog_id,
+                "name": self._names[dog_id],
+                "match": "exact" if is_exact else "prefix",
+                "score": len(normalized) / len(self._normalized[dog_id]),
+            })
+        if len(results) < limit:
+            found = {result["dog_id"] for result in results}
+            fuzzy_matches = heapq.nsmallest(
+                limit - len(results),
+                (
+                    (-similarity, self._normalized[dog_id], dog_id)
+                    for similarity, dog_id in self._fuzzy_matches(normalized)
+                    if dog_id not in found
+                ),
+            )
+            for negative_similarity, _, dog_id in fuzzy_matches:
+                results.append({
+                    "dog_id": dog_id,
+                    "name": self._names[dog_id],
+                    "match": "fuzzy",
+                    "score": -negative_similarity,
+                })
+        return results
+
+
+dog_name_index = DogNameIndex(
+    min_similarity=settings.DOG_SEARCH_MIN_SIMILARITY,
+    reload_interval=settings.DOG_SEARCH_RELOAD_INTERVAL,
+)
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from logging import getLogger
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy.exc import SQLAlchemyError
+
+import settings
+from db.dals import NotificationDAL
+
+logger = getLogger(__name__)
+
+##############################################
+# БЛОК УВЕДОМЛЕНИЙ ВОЛОНТЁРОВ О НОВЫХ ЗАДАЧАХ #
+##############################################
+
+
+class NotificationHub:
+    """Inboxes of volunteer notifications with long-poll waiting.
+
+    Inbox entries are rows of the notifications table, so a notification
+    published by one worker process is read through any other, and ids keep
+    growing across processes and restarts. The hub itself only wakes up
+    waiting requests: each process runs a watcher that polls the table for
+    recipients of rows newer than the last one it has seen, so waiting
+    requests cost no queries until they are woken or time out.
+    """
+
+    def __init__(self, page_size: int, poll_interval: float, ttl: float, purge_interval: float):
+        self.page_size = page_size
+        self.poll_interval = poll_interval
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self.session_factory = None
+        # user id -> events of its waiting requests
+        self._waiters: Dict[UUID, Set[asyncio.Event]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.clear()
+
+    def clear(self):
+        self._last_seen_id: Optional[int] = None
+        self._purged_at: Optional[float] = None
+
+    async def publish(
+        self, session, notification: dict, user_ids: List[UUID], distances: List[float]
+    ) -> None:
+        """Store notification about a task in the inboxes of the users"""
+        if not user_ids:
+            return
+        await NotificationDAL(session).create_notifications(
+            task_id=notification["task_id"],
+            dog_id=notification["dog_id"],
+            dog_name=notification["dog_name"],
+            description=notification["description"],
+            user_ids=user_ids,
+            distances=distances,
+        )
+
+    async def read(self, session, user_id: UUID, after: int) -> List[dict]:
+        """Notifications of the user newer than the id after, oldest first"""
+        rows = await NotificationDAL(session).get_notifications(user_id, after, self.page_size)
+        return [dict(row._mapping) for row in rows]
+
+    def wake(self, user_ids: Iterable[UUID]):
+        for user_id in user_ids:
+            for event in self._waiters.get(user_id, ()):
+                event.set()
+
+    async def wait(self, user_id: UUID, read: Callable[[], Awaitable[List[dict]]], timeout: float) -> List[dict]:
+        """Entries returned by read, waiting up to timeout seconds for a new notification if there are none"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        event = asyncio.Event()
+        # registered before the first read, so a wake-up between the read and the wait is not lost
+        self._waiters.setdefault(user_id, set()).add(event)
+        try:
+            while True:
+                event.clear()
+                entries = await read()
+                remaining = deadline - loop.time()
+                if entries or remaining <= 0:
+                    return entries
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            waiters = self._waiters.get(user_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[user_id]
+
+    async def start(self):
+        if self._task is not None:
+            return
+        if self.session_factory is None:
+            from db.session import get_session_factory
+
+            self.session_factory = get_session_factory()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self._poll()
+            except (OSError, SQLAlchemyError) as err:
+                logger.error(f"Could not poll notifications: {err}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _poll(self):
+        async with self.session_factory() as session:
+            async with session.begin():
+                notification_dal = NotificationDAL(session)
+                if self._last_seen_id is None:
+                    self._last_seen_id = await notification_dal.get_last_notification_id()
+                    return
+                recipients = await notification_dal.get_new_recipients(self._last_seen_id)
+                now = time.monotonic()
+                if self._purged_at is None or now - self._purged_at >= self.purge_interval:
+                    self._purged_at = now
+                    await notification_dal.delete_old_notifications(self.ttl)
+        if recipients:
+            self._last_seen_id = max(self._last_seen_id, max(last_id for _, last_id in recipients))
+            self.wake(user_id for user_id, _ in recipients)
+
+
+notification_hub = NotificationHub(
+    page_size=settings.NOTIFICATION_PAGE_SIZE,
+    poll_interval=settings.NOTIFICATION_POLL_INTERVAL,
+    ttl=settings.NOTIFICATION_TTL_SECONDS,
+    purge_interval=settings.NOTIFICATION_PURGE_INTERVAL,
+)
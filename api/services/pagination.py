@@ -0,0 +1,25 @@
+import base64
+import json
+from typing import Any, List
+
+###########################
+# БЛОК КУРСОРОВ ПАГИНАЦИИ #
+###########################
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque keyset cursor holding the sort key of the last returned row"""
+    payload = json.dumps([str(value) if not isinstance(value, (int, float)) else value for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Values of a cursor made by encode_cursor, raises ValueError if it is malformed"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(payload)
+    except (ValueError, UnicodeDecodeError) as err:
+        raise ValueError("Invalid cursor.") from err
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor.")
+    return values
@@ -0,0 +1,216 @@
+import asyncio
+import time
+from collections import Counter
+from functools import lru_cache
+from logging import getLogger
+from typing import List, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from api.services.area_stats import area_stats
+from api.services.spatial_index import dog_spatial_index
+from db.dals import DogDAL
+
+logger = getLogger(__name__)
+
+###########################################
+# БЛОК ПРИЁМА КООРДИНАТ С ОШЕЙНИКОВ СОБАК #
+###########################################
+
+# packed little-endian record sent by collar gateways:
+# collar_id  16 bytes  dog UUID in network byte order
+# timestamp  uint32    unix seconds of the fix
+# latitude   float64   degrees
+# longitude  float64   degrees
+# battery    uint8     percent
+# rssi       int16     dBm
+POSITION_RECORD_SIZE = 39
+MAX_BATTERY_PERCENT = 100
+
+
+@lru_cache(maxsize=None)
+def get_position_record_dtype():
+    import numpy as np
+
+    dtype = np.dtype(
+        [
+            ("collar_id", "V16"),
+            ("timestamp", "<u4"),
+            ("latitude", "<f8"),
+            ("longitude", "<f8"),
+            ("battery", "u1"),
+            ("rssi", "<i2"),
+        ]
+    )
+    assert dtype.itemsize == POSITION_RECORD_SIZE
+    return dtype
+
+
+def decode_position_records(payload: bytes):
+    """View payload as a structured array of position records without copying.
+
+    Raises ValueError when the payload is not a whole number of records.
+    """
+    import numpy as np
+
+    if len(payload) % POSITION_RECORD_SIZE:
+        raise ValueError(f"Payload size must be a multiple of {POSITION_RECORD_SIZE} bytes.")
+    return np.frombuffer(payload, dtype=get_position_record_dtype())
+
+
+def encode_position_records(records) -> bytes:
+    """Pack (collar_id, timestamp, latitude, longitude, battery, rssi) tuples, collar_id as UUID"""
+    import numpy as np
+
+    array = np.array(
+        [(collar_id.bytes, *fields) for collar_id, *fields in records],
+        dtype=get_position_record_dtype(),
+    )
+    return array.tobytes()
+
+
+def valid_position_mask(records, now: float, max_clock_skew: float):
+    """Vectorized range checks, True for records that may be written"""
+    import numpy as np
+
+    latitudes = records["latitude"]
+    longitudes = records["longitude"]
+    timestamps = records["timestamp"]
+    return (
+        np.isfinite(latitudes)
+        & np.isfinite(longitudes)
+        & (np.abs(latitudes) <= 90)
+        & (np.abs(longitudes) <= 180)
+        & (timestamps > 0)
+        & (timestamps <= now + max_clock_skew)
+        & (records["battery"] <= MAX_BATTERY_PERCENT)
+    )
+
+
+def latest_position_per_collar(records):
+    """Keep only the newest fix of every collar in the batch"""
+    import numpy as np
+
+    if len(records) < 2:
+        return records
+    # compare collar ids as two integers, byte order does not matter for grouping
+    id_halves = np.ascontiguousarray(records["collar_id"]).view("<u8").reshape(-1, 2)
+    order = np.lexsort((records["timestamp"], id_halves[:, 1], id_halves[:, 0]))
+    sorted_halves = id_halves[order]
+    is_last = np.ones(len(order), dtype=bool)
+    is_last[:-1] = np.any(sorted_halves[1:] != sorted_halves[:-1], axis=1)
+    return records[order[is_last]]
+
+
+def prepare_position_batch(records, max_clock_skew: float, now: float = None) -> Tuple[object, int, int]:
+    """Drop invalid records and older duplicates.
+
+    Returns the records to write, the number of rejected records and the number of duplicates.
+    """
+    if now is None:
+        now = time.time()
+    valid = records[valid_position_mask(records, now, max_clock_skew)]
+    latest = latest_position_per_collar(valid)
+    return latest, len(records) - len(valid), len(valid) - len(latest)
+
+
+async def write_positions(records, session) -> int:
+    """Apply a prepared batch with a single UPDATE and refresh the in-memory indexes.
+
+    Returns the number of dogs whose position changed.
+    """
+    if not len(records):
+        return 0
+    dog_dal = DogDAL(session)
+    updated_rows = await dog_dal.update_dog_positions(
+        collar_ids=records["collar_id"].tobytes(),
+        latitudes=records["latitude"].astype(">f8").tobytes(),
+        longitudes=records["longitude"].astype(">f8").tobytes(),
+        fixed_at=records["timestamp"].astype(">u4").tobytes(),
+    )
+    for dog_id, name, latitude, longitude in updated_rows:
+        dog_spatial_index.upsert(dog_id, name, latitude, longitude)
+        area_stats.dog_moved(dog_id, latitude, longitude)
+    return len(updated_rows)
+
+
+class PositionBatcher:
+    """Collects raw position records from many small sources and writes them in batches.
+
+    Pending records are bounded: when the DB falls behind, new payloads are
+    dropped and counted instead of growing memory. A batch is written once
+    batch_size records are pending or max_delay seconds after the first one.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        batch_size: int,
+        max_delay: float,
+        max_pending_records: int,
+        max_clock_skew: float,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_pending_records = max_pending_records
+        self.max_clock_skew = max_clock_skew
+        self.counters = Counter()
+        self._chunks: List[bytes] = []
+        self._pending_records = 0
+        self._has_records = asyncio.Event()
+        self._batch_full = asyncio.Event()
+
+    @property
+    def pending_records(self) -> int:
+        return self._pending_records
+
+    def submit(self, payload: bytes) -> bool:
+        """Queue a payload of whole records. Returns False if it was dropped"""
+        records = len(payload) // POSITION_RECORD_SIZE
+        if not records or len(payload) % POSITION_RECORD_SIZE:
+            self.counters["malformed_payloads"] += 1
+            return False
+        if self._pending_records + records > self.max_pending_records:
+            self.counters["dropped_records"] += records
+            return False
+        self._chunks.append(payload)
+        self._pending_records += records
+        self.counters["queued_records"] += records
+        self._has_records.set()
+        if self._pending_records >= self.batch_size:
+            self._batch_full.set()
+        return True
+
+    async def run(self):
+        """Write batches until cancelled"""
+        while True:
+            await self._has_records.wait()
+            if self._pending_records < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), timeout=self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            await self.flush()
+
+    async def flush(self):
+        chunks, self._chunks = self._chunks, []
+        self._pending_records = 0
+        self._has_records.clear()
+        self._batch_full.clear()
+        if not chunks:
+            return
+        records = decode_position_records(b"".join(chunks))
+        batch, rejected, duplicates = prepare_position_batch(records, self.max_clock_skew)
+        self.counters["rejected_records"] += rejected
+        self.counters["duplicate_records"] += duplicates
+        try:
+            async with self.session_factory() as session:
+                async with session.begin():
+                    updated = await write_positions(batch, session)
+        except (OSError, SQLAlchemyError) as err:
+            logger.error(f"Could not write {len(batch)} positions: {err}")
+            self.counters["failed_records"] += len(batch)
+            return
+        self.counters["written_batches"] += 1
+        self.counters["updated_dogs"] += updated
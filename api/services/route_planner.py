@@ -0,0 +1,68 @@
+import time
+from typing import List, Tuple
+
+from geo import get_distance_matrix
+
+###################################
+# БЛОК ПОСТРОЕНИЯ МАРШРУТА ОБХОДА #
+###################################
+
+
+def _nearest_neighbour_order(distances) -> List[int]:
+    import numpy as np
+
+    points_count = len(distances)
+    visited = np.zeros(points_count, dtype=bool)
+    visited[0] = True
+    order = [0]
+    for _ in range(points_count - 1):
+        candidates = np.where(visited, np.inf, distances[order[-1]])
+        next_point = int(np.argmin(candidates))
+        visited[next_point] = True
+        order.append(next_point)
+    return order
+
+
+def _two_opt(distances, order: List[int], deadline: float) -> List[int]:
+    """Improve an open path with a fixed start by segment reversals until
+    no reversal shortens it or the deadline passes"""
+    import numpy as np
+
+    route = np.array(order, dtype=np.int64)
+    last = len(route) - 1
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(1, last):
+            # reverse route[i..j] for every j > i at once
+            j = np.arange(i + 1, last + 1)
+            before, first, current = route[i - 1], route[i], route[j]
+            delta = distances[before, current] - distances[before, first]
+            has_next = j < last
+            after = route[np.minimum(j + 1, last)]
+            delta = delta + np.where(
+                has_next, distances[first, after] - distances[current, after], 0.0
+            )
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                route[i:j[best] + 1] = route[i:j[best] + 1][::-1].copy()
+                improved = True
+            if time.perf_counter() >= deadline:
+                break
+    return route.tolist()
+
+
+def plan_route(start: Tuple[float, float], stops: List[Tuple[float, float]], time_limit: float) -> Tuple[List[int], List[float]]:
+    """Near-optimal visiting order of stops from start (the path does not return).
+
+    Returns stop indexes in visiting order and the distance of every leg.
+    """
+    if not stops:
+        return [], []
+    deadline = time.perf_counter() + time_limit
+    latitudes = [start[0]] + [stop[0] for stop in stops]
+    longitudes = [start[1]] + [stop[1] for stop in stops]
+    distances = get_distance_matrix(latitudes, longitudes, latitudes, longitudes)
+    order = _two_opt(distances, _nearest_neighbour_order(distances), deadline)
+    legs = [float(distances[previous, current]) for previous, current in zip(order, order[1:])]
+    return [point - 1 for point in order[1:]], legs
@@ -0,0 +1,336 @@
+import asyncio
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+import settings
+from db.dals import DogDAL
+from geo import KM_PER_DEGREE
+from geo import get_distance_between_points
+from geo import longitude_delta
+
+#################################################
+# БЛОК ПРОСТРАНСТВЕННОГО ИНДЕКСА СОБАК В ПАМЯТИ #
+#################################################
+
+
+def _min_arc_to_longitude_gap(gap_degrees: float, max_abs_latitude: float) -> float:
+    """Smallest arc between points gap_degrees of longitude apart with |latitude| <= max_abs_latitude"""
+    if max_abs_latitude >= 90:
+        return 0.0
+    ratio = math.cos(math.radians(max_abs_latitude)) * math.sin(math.radians(min(gap_degrees, 180)) / 2)
+    return math.degrees(2 * math.asin(min(1.0, ratio)))
+
+
+class DogSpatialIndex:
+    """Uniform grid over positions of active dogs.
+
+    Positions live in compact NumPy arrays indexed by slot, the grid maps
+    a cell to the slots inside it, so radius and bounding box queries only
+    compute distances for dogs in the touched cells. NumPy is imported on
+    first use to keep it out of the application startup.
+    """
+
+    def __init__(self, cell_size: float, reload_interval: float):
+        self.cell_size = cell_size
+        self.reload_interval = reload_interval
+        self._lon_cells = math.ceil(360 / cell_size)
+        self._loaded_at: Optional[float] = None
+        self._load_lock = asyncio.Lock()
+        # writes happen on the event loop, nearest() may run in a worker thread
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._slots: Dict[UUID, int] = {}
+        self._dog_ids: List[UUID] = []
+        self._names: List[str] = []
+        self._slot_cells: List[Tuple[int, int]] = []
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        self._latitudes = None
+        self._longitudes = None
+        self._loaded_at = None
+
+    def __len__(self) -> int:
+        return len(self._dog_ids)
+
+    def __contains__(self, dog_id: UUID) -> bool:
+        return dog_id in self._slots
+
+    @property
+    def is_loaded(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.reload_interval
+        )
+
+    async def ensure_loaded(self, session):
+        """(Re)load active dogs from the DB when the index is empty or stale"""
+        if self.is_loaded:
+            return
+        async with self._load_lock:
+            if self.is_loaded:
+                return
+            dog_dal = DogDAL(session)
+            active_dogs = await dog_dal.get_active_dogs()
+            self.clear()
+            for dog in active_dogs:
+                self.upsert(dog.dog_id, dog.name, dog.latitude, dog.longitude)
+            self._loaded_at = time.monotonic()
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (
+            math.floor((latitude + 90) / self.cell_size),
+            math.floor((longitude + 180) / self.cell_size) % self._lon_cells,
+        )
+
+    def upsert(self, dog_id: UUID, name: str, latitude: Optional[float], longitude: Optional[float]):
+        if latitude is None or longitude is None:
+            self.remove(dog_id)
+            return
+        with self._lock:
+            self._upsert(dog_id, name, latitude, longitude)
+
+    def _upsert(self, dog_id: UUID, name: str, latitude: float, longitude: float):
+        import numpy as np
+
+        cell = self._cell(latitude, longitude)
+        slot = self._slots.get(dog_id)
+        if slot is None:
+            slot = len(self._dog_ids)
+            if self._latitudes is None:
+                self._latitudes = np.empty(64, dtype=np.float64)
+                self._longitudes = np.empty(64, dtype=np.float64)
+            elif slot == len(self._latitudes):
+                self._latitudes = np.resize(self._latitudes, slot * 2)
+                self._longitudes = np.resize(self._longitudes, slot * 2)
+            self._slots[dog_id] = slot
+            self._dog_ids.append(dog_id)
+            self._names.append(name)
+            self._slot_cells.append(cell)
+        else:
+            self._names[slot] = name
+            old_cell = self._slot_cells[slot]
+            if old_cell != cell:
+                self._discard_from_cell(old_cell, slot)
+                self._slot_cells[slot] = cell
+            else:
+                cell = None
+        self._latitudes[slot] = latitude
+        self._longitudes[slot] = longitude
+        if cell is not None:
+            self._cells.setdefault(cell, set()).add(slot)
+
+    def rename(self, dog_id: UUID, name: str):
+        with self._lock:
+            slot = self._slots.get(dog_id)
+            if slot is not None:
+                self._names[slot] = name
+
+    def remove(self, dog_id: UUID):
+        with self._lock:
+            self._remove(dog_id)
+
+    def _remove(self, dog_id: UUID):
+        slot = self._slots.pop(dog_id, None)
+        if slot is None:
+            return
+        self._discard_from_cell(self._slot_cells[slot], slot)
+        last = len(self._dog_ids) - 1
+        if slot != last:
+            # move the last dog into the freed slot to keep arrays dense
+            last_cell = self._slot_cells[last]
+            self._cells[last_cell].discard(last)
+            self._cells[last_cell].add(slot)
+            self._dog_ids[slot] = self._dog_ids[last]
+            self._names[slot] = self._names[last]
+            self._slot_cells[slot] = last_cell
+            self._latitudes[slot] = self._latitudes[last]
+            self._longitudes[slot] = self._longitudes[last]
+            self._slots[self._dog_ids[slot]] = slot
+        self._dog_ids.pop()
+        self._names.pop()
+        self._slot_cells.pop()
+
+    def _discard_from_cell(self, cell: Tuple[int, int], slot: int):
+        cell_slots = self._cells[cell]
+        cell_slots.discard(slot)
+        if not cell_slots:
+            del self._cells[cell]
+
+    def _cells_in_box(self, min_latitude, min_longitude, max_latitude, max_longitude) -> List[Tuple[int, int]]:
+        min_row, min_column = self._cell(max(min_latitude, -90.0), min_longitude)
+        max_row, max_column = self._cell(min(max_latitude, 90.0), max_longitude)
+        if max_longitude - min_longitude >= 360:
+            columns = range(self._lon_cells)
+        elif max_column >= min_column:
+            columns = range(min_column, max_column + 1)
+        else:
+            # the box crosses the antimeridian
+            columns = set(range(min_column, self._lon_cells)) | set(range(0, max_column + 1))
+        rows = range(min_row, max_row + 1)
+        if len(rows) * len(columns) > len(self._cells):
+            return [
+                cell for cell in self._cells
+                if min_row <= cell[0] <= max_row and cell[1] in columns
+            ]
+        return [(row, column) for row in rows for column in columns if (row, column) in self._cells]
+
+    def _candidate_slots(self, cells):
+        import numpy as np
+
+        slots = [slot for cell in cells for slot in self._cells[cell]]
+        return np.fromiter(slots, dtype=np.int64, count=len(slots))
+
+    def _distances(self, slots, latitude: float, longitude: float):
+        return get_distance_between_points(
+            latitude, longitude, self._latitudes[slots], self._longitudes[slots]
+        )
+
+    def _entries(self, slots, distances=None) -> List[dict]:
+        return [
+            {
+                "dog_id": self._dog_ids[slot],
+                "name": self._names[slot],
+                "latitude": float(self._latitudes[slot]),
+                "longitude": float(self._longitudes[slot]),
+                "distance": None if distances is None else float(distances[i]),
+            }
+            for i, slot in enumerate(slots.tolist())
+        ]
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float) -> List[dict]:
+        """Dogs within radius_km of the point, nearest first"""
+        import numpy as np
+
+        lat_delta = radius_km / KM_PER_DEGREE
+        lon_delta = longitude_delta(lat_delta, abs(latitude) + lat_delta)
+        cells = self._cells_in_box(
+            latitude - lat_delta, longitude - lon_delta,
+            latitude + lat_delta, longitude + lon_delta,
+        )
+        slots = self._candidate_slots(cells)
+        if not len(slots):
+            return []
+        distances = self._distances(slots, latitude, longitude)
+        inside = distances <= radius_km
+        slots, distances = slots[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return self._entries(slots[order], distances[order])
+
+    def nearest(self, latitude: float, longitude: float, k: int, allowed=None) -> List[dict]:
+        """k nearest dogs (optionally only dog ids in allowed), nearest first.
+
+        Visits grid rings around the point and stops once no unvisited cell
+        can hold a dog closer than the current k-th distance. Once the rings
+        walked cost more than computing the distances to all dogs (the point
+        is far from them), that is done instead, followed by argpartition.
+        Safe to call from a worker thread.
+        """
+        with self._lock:
+            return self._nearest(latitude, longitude, k, allowed)
+
+    def _nearest(self, latitude: float, longitude: float, k: int, allowed) -> List[dict]:
+        import numpy as np
+
+        if k <= 0 or not self._cells:
+            return []
+        center_row, center_column = self._cell(latitude, longitude)
+        best_slots = np.empty(0, dtype=np.int64)
+        best_distances = np.empty(0, dtype=np.float64)
+        walked_cells = 0
+        ring = 0
+        while True:
+            walked_cells += max(1, 8 * ring)
+            # looking up a cell of a ring costs about as much as computing eight distances
+            if 8 * walked_cells > len(self._dog_ids):
+                return self._nearest_by_scan(latitude, longitude, k, allowed)
+            slots = self._candidate_slots(self._ring_cells(center_row, center_column, ring))
+            if allowed is not None and len(slots):
+                slots = slots[[self._dog_ids[slot] in allowed for slot in slots.tolist()]]
+            if len(slots):
+                best_slots = np.concatenate([best_slots, slots])
+                best_distances = np.concatenate(
+                    [best_distances, self._distances(slots, latitude, longitude)]
+                )
+                if len(best_slots) > k:
+                    keep = np.argpartition(best_distances, k - 1)[:k]
+                    best_slots, best_distances = best_slots[keep], best_distances[keep]
+            if len(best_slots) == k and best_distances.max() <= self._unvisited_lower_bound(latitude, ring):
+                break
+            ring += 1
+        order = np.argsort(best_distances, kind="stable")
+        return self._entries(best_slots[order], best_distances[order])
+
+    def _nearest_by_scan(self, latitude: float, longitude: float, k: int, allowed) -> List[dict]:
+        import numpy as np
+
+        count = len(self._dog_ids)
+        if allowed is None:
+            slots = np.arange(count, dtype=np.int64)
+        elif len(allowed) < count:
+            slots = np.fromiter(
+                (self._slots[dog_id] for dog_id in allowed if dog_id in self._slots), dtype=np.int64
+            )
+        else:
+            slots = np.flatnonzero(
+                np.fromiter((dog_id in allowed for dog_id in self._dog_ids), dtype=bool, count=count)
+            )
+        if not len(slots):
+            return []
+        distances = self._distances(slots, latitude, longitude)
+        if len(slots) > k:
+            keep = np.argpartition(distances, k - 1)[:k]
+            slots, distances = slots[keep], distances[keep]
+        order = np.argsort(distances, kind="stable")
+        return self._entries(slots[order], distances[order])
+
+    def _ring_cells(self, center_row: int, center_column: int, ring: int) -> List[Tuple[int, int]]:
+        if ring == 0:
+            candidates = [(center_row, center_column)]
+        else:
+            rows = range(center_row - ring, center_row + ring + 1)
+            columns = range(center_column - ring, center_column + ring + 1)
+            candidates = [(center_row - ring, column) for column in columns]
+            candidates += [(center_row + ring, column) for column in columns]
+            candidates += [(row, center_column - ring) for row in rows[1:-1]]
+            candidates += [(row, center_column + ring) for row in rows[1:-1]]
+        cells = {(row, column % self._lon_cells) for row, column in candidates}
+        return [cell for cell in cells if cell in self._cells]
+
+    def _unvisited_lower_bound(self, latitude: float, ring: int) -> float:
+        """Lower bound in km of the distance to any dog outside rings 0..ring"""
+        gap = ring * self.cell_size
+        arc = min(gap, _min_arc_to_longitude_gap(gap, abs(latitude) + gap))
+        return arc * KM_PER_DEGREE
+
+    def in_bbox(self, min_latitude: float, min_longitude: float, max_latitude: float, max_longitude: float) -> List[dict]:
+        """Dogs inside the box, min_longitude > max_longitude means the box crosses the antimeridian"""
+        import numpy as np
+
+        if min_longitude > max_longitude:
+            max_longitude += 360
+        cells = self._cells_in_box(min_latitude, min_longitude, max_latitude, max_longitude)
+        slots = self._candidate_slots(cells)
+        if not len(slots):
+            return []
+        latitudes = self._latitudes[slots]
+        longitudes = self._longitudes[slots]
+        longitudes = np.where(longitudes < min_longitude, longitudes + 360, longitudes)
+        inside = (
+            (latitudes >= min_latitude) & (latitudes <= max_latitude)
+            & (longitudes >= min_longitude) & (longitudes <= max_longitude)
+        )
+        return self._entries(slots[inside])
+
+
+dog_spatial_index = DogSpatialIndex(
+    cell_size=settings.SPATIAL_INDEX_CELL_SIZE,
+    reload_interval=settings.SPATIAL_INDEX_RELOAD_INTERVAL,
+)
@@ -0,0 +1,333 @@
+"""Simulated collar fleet: ingest throughput and end-to-end fix latency.
+
+Creates N dogs through the DAL (owned by an existing superadmin), moves them
+by a random walk or around a home point, and sends their fixes to a running
+service in the binary collar record format, either over HTTP to
+/dog/ingest_positions/ or as packet forwarder uplinks over UDP to the LoRa
+listener. Delivery gets random jitter, duplicated fixes and delayed
+(out-of-order) fixes. A poller reads a sample of dogs back through
+/dog/get_dog_location/ to measure the time from a fix being emitted to it
+being visible.
+
+Timestamps have one second resolution, so keep --rate at or below 1 fix/s.
+
+Run from the project folder with the service (and `make lora` for UDP) up:
+    python benchmarks/collar_simulator.py --email admin@kek.com --dogs 1000 --rate 0.5 --duration 60
+    python benchmarks/collar_simulator.py --email admin@kek.com --transport udp --udp-port 1700
+"""
+import argparse
+import asyncio
+import base64
+import heapq
+import json
+import os
+import socket
+import statistics
+import sys
+import time
+from collections import Counter
+from uuid import UUID
+from uuid import uuid4
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+
+from api.services.positions import get_position_record_dtype  # noqa: E402
+from db.dals import DogDAL  # noqa: E402
+from db.dals import UserDAL  # noqa: E402
+from db.session import dispose_engines  # noqa: E402
+from db.session import get_session_factory  # noqa: E402
+from security import create_access_token  # noqa: E402
+
+KM_PER_DEGREE_LATITUDE = 111.19
+
+
+class Fleet:
+    """Positions of all simulated collars, moved together with NumPy"""
+
+    def __init__(self, dog_ids, center, radius_km, movement, step_km, home_pull, rng):
+        self.dog_ids = dog_ids
+        self.collar_ids = np.frombuffer(b"".join(dog_id.bytes for dog_id in dog_ids), dtype="V16")
+        self.movement = movement
+        self.step_km = step_km
+        self.home_pull = home_pull
+        self.rng = rng
+        count = len(dog_ids)
+        radius_degrees = radius_km / KM_PER_DEGREE_LATITUDE
+        self.home_latitudes = center[0] + rng.uniform(-radius_degrees, radius_degrees, count)
+        self.home_longitudes = center[1] + rng.uniform(-radius_degrees, radius_degrees, count) / np.cos(
+            np.radians(center[0])
+        )
+        self.latitudes = self.home_latitudes.copy()
+        self.longitudes = self.home_longitudes.copy()
+
+    def step(self):
+        count = len(self.dog_ids)
+        step_degrees = self.step_km / KM_PER_DEGREE_LATITUDE
+        self.latitudes += self.rng.normal(0, step_degrees, count)
+        self.longitudes += self.rng.normal(0, step_degrees, count) / np.cos(np.radians(self.latitudes))
+        if self.movement == "home-range":
+            self.latitudes += self.home_pull * (self.home_latitudes - self.latitudes)
+            self.longitudes += self.home_pull * (self.home_longitudes - self.longitudes)
+        np.clip(self.latitudes, -90, 90, out=self.latitudes)
+        self.longitudes = (self.longitudes + 180) % 360 - 180
+
+    def fixes(self, timestamp: int):
+        records = np.zeros(len(self.dog_ids), dtype=get_position_record_dtype())
+        records["collar_id"] = self.collar_ids
+        records["timestamp"] = timestamp
+        records["latitude"] = self.latitudes
+        records["longitude"] = self.longitudes
+        records["battery"] = self.rng.integers(20, 101, len(self.dog_ids))
+        records["rssi"] = self.rng.integers(-120, -60, len(self.dog_ids))
+        return records
+
+
+class LatencyTracker:
+    """Fixes of sampled dogs waiting to become visible through the API"""
+
+    def __init__(self, sampled_dog_ids):
+        self.pending = {dog_id: [] for dog_id in sampled_dog_ids}
+        self.latencies = []
+
+    def emitted(self, dog_id: UUID, latitude: float, longitude: float, emitted_at: float):
+        if dog_id in self.pending:
+            self.pending[dog_id].append((latitude, longitude, emitted_at))
+
+    def observed(self, dog_id: UUID, latitude: float, longitude: float, observed_at: float):
+        fixes = self.pending[dog_id]
+        for index, (fix_latitude, fix_longitude, emitted_at) in enumerate(fixes):
+            if fix_latitude == latitude and fix_longitude == longitude:
+                self.latencies.append(observed_at - emitted_at)
+                # older fixes were superseded and will never be visible
+                del fixes[: index + 1]
+                return
+
+
+class HttpSender:
+    def __init__(self, client: httpx.AsyncClient, headers: dict, concurrency: int, counters: Counter):
+        self.client = client
+        self.headers = {**headers, "Content-Type": "application/octet-stream"}
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.counters = counters
+        self.tasks = set()
+
+    def send(self, payloads):
+        for payload in payloads:
+            task = asyncio.create_task(self._post(payload))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _post(self, payload: bytes):
+        async with self.semaphore:
+            try:
+                resp = await self.client.post("/dog/ingest_positions/", content=payload, headers=self.headers)
+            except httpx.HTTPError:
+                self.counters["http_errors"] += 1
+                return
+        self.counters["requests"] += 1
+        if resp.status_code != 200:
+            self.counters[f"http_{resp.status_code}"] += 1
+            return
+        result = resp.json()
+        self.counters["updated"] += result["updated"]
+        self.counters["rejected"] += result["rejected"]
+        self.counters["duplicates"] += result["duplicates"]
+
+    async def drain(self):
+        if self.tasks:
+            await asyncio.gather(*self.tasks)
+
+
+class UdpGatewayProtocol(asyncio.DatagramProtocol):
+    def __init__(self, counters: Counter):
+        self.counters = counters
+
+    def datagram_received(self, data, addr):
+        if len(data) == 4 and data[3] == 0x01:
+            self.counters["push_acks"] += 1
+
+
+class UdpSender:
+    def __init__(self, transport, counters: Counter):
+        self.transport = transport
+        self.counters = counters
+        self.gateway_eui = os.urandom(8)
+
+    def send(self, payloads):
+        for payload in payloads:
+            uplink = {"rxpk": [{"data": base64.b64encode(payload).decode(), "rssi": -90, "lsnr": 7.5}]}
+            datagram = b"\x02" + os.urandom(2) + b"\x00" + self.gateway_eui + json.dumps(uplink).encode()
+            self.transport.sendto(datagram)
+            self.counters["datagrams"] += 1
+
+    async def drain(self):
+        await asyncio.sleep(0.5)
+
+
+async def create_dogs(email: str, count: int, prefix: str):
+    async with get_session_factory()() as session:
+        async with session.begin():
+            owner = await UserDAL(session).get_user_by_email(email)
+            if owner is None:
+                raise SystemExit(f"User {email} not found")
+            dog_dal = DogDAL(session)
+            dogs = [
+                await dog_dal.create_dog(name=f"{prefix}-{index}", gender="male", created_by=owner.user_id)
+                for index in range(count)
+            ]
+            return [dog.dog_id for dog in dogs]
+
+
+async def delete_dogs(dog_ids):
+    async with get_session_factory()() as session:
+        async with session.begin():
+            dog_dal = DogDAL(session)
+            for dog_id in dog_ids:
+                await dog_dal.delete_dog(dog_id)
+
+
+async def poll_locations(client: httpx.AsyncClient, headers: dict, tracker: LatencyTracker, interval: float, stop):
+    async def poll(dog_id):
+        try:
+            resp = await client.get("/dog/get_dog_location/", params={"dog_id": str(dog_id)}, headers=headers)
+        except httpx.HTTPError:
+            return
+        if resp.status_code == 200:
+            location = resp.json()
+            tracker.observed(dog_id, location["latitude"], location["longitude"], time.monotonic())
+
+    while not stop.is_set():
+        await asyncio.gather(*(poll(dog_id) for dog_id in tracker.pending))
+        await asyncio.sleep(interval)
+
+
+def chunk(records: list, size: int):
+    return [b"".join(records[start:start + size]) for start in range(0, len(records), size)]
+
+
+async def simulate(args, dog_ids, sender, tracker: LatencyTracker, counters: Counter):
+    rng = np.random.default_rng(args.seed)
+    fleet = Fleet(
+        dog_ids, (args.latitude, args.longitude), args.radius_km, args.movement, args.step_km, args.home_pull, rng
+    )
+    # (send at, sequence, record bytes): jitter and delays decide the delivery order
+    outbox = []
+    sequence = 0
+    interval = 1 / args.rate
+    started = time.monotonic()
+    next_tick = started
+    while time.monotonic() - started < args.duration or outbox:
+        now = time.monotonic()
+        if now >= next_tick and now - started < args.duration:
+            next_tick += interval
+            fleet.step()
+            records = fleet.fixes(int(time.time()))
+            counters["fixes"] += len(records)
+            delays = rng.uniform(0, args.jitter, len(records))
+            delayed = rng.random(len(records)) < args.reorder
+            delays[delayed] += rng.uniform(interval, 3 * interval, int(delayed.sum()))
+            duplicated = np.flatnonzero(rng.random(len(records)) < args.duplicates)
+            for index in range(len(records)):
+                heapq.heappush(outbox, (now + delays[index], sequence, records[index].tobytes()))
+                sequence += 1
+            # the sampled dogs are the first ones of the fleet
+            for index, dog_id in enumerate(tracker.pending):
+                tracker.emitted(dog_id, float(fleet.latitudes[index]), float(fleet.longitudes[index]), now)
+            for index in duplicated:
+                heapq.heappush(outbox, (now + rng.uniform(0, args.jitter), sequence, records[index].tobytes()))
+                sequence += 1
+            counters["duplicated_fixes"] += len(duplicated)
+        due = []
+        while outbox and outbox[0][0] <= now:
+            due.append(heapq.heappop(outbox)[2])
+        if due:
+            counters["records_sent"] += len(due)
+            sender.send(chunk(due, args.records_per_payload))
+        await asyncio.sleep(0.005)
+    await sender.drain()
+    return time.monotonic() - started
+
+
+def report(elapsed: float, counters: Counter, tracker: LatencyTracker):
+    print(f"elapsed {elapsed:.1f}s")
+    for name, value in sorted(counters.items()):
+        print(f"{name:>18}: {value}")
+    print(f"{'sent records/s':>18}: {counters['records_sent'] / elapsed:.0f}")
+    if counters["requests"]:
+        print(f"{'updated dogs/s':>18}: {counters['updated'] / elapsed:.0f}")
+    latencies = sorted(tracker.latencies)
+    if not latencies:
+        print("no fixes observed through get_dog_location")
+        return
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    print(
+        f"e2e latency over {len(latencies)} fixes: p50 {quantiles[49] * 1000:.0f}ms "
+        f"p95 {quantiles[94] * 1000:.0f}ms p99 {quantiles[98] * 1000:.0f}ms max {latencies[-1] * 1000:.0f}ms"
+    )
+
+
+async def main(args):
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': args.email})}"}
+    dog_ids = await create_dogs(args.email, args.dogs, f"sim-{uuid4().hex[:8]}")
+    counters = Counter()
+    tracker = LatencyTracker(dog_ids[: args.latency_sample])
+    stop = asyncio.Event()
+    transport = None
+    try:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+            if args.transport == "http":
+                sender = HttpSender(client, headers, args.concurrency, counters)
+            else:
+                transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                    lambda: UdpGatewayProtocol(counters), remote_addr=(args.udp_host, args.udp_port), family=socket.AF_INET
+                )
+                sender = UdpSender(transport, counters)
+            poller = asyncio.create_task(poll_locations(client, headers, tracker, args.poll_interval, stop))
+            elapsed = await simulate(args, dog_ids, sender, tracker, counters)
+            # give the last fixes a chance to become visible
+            await asyncio.sleep(args.settle)
+            stop.set()
+            await poller
+        report(elapsed, counters, tracker)
+    finally:
+        if transport is not None:
+            transport.close()
+        if not args.keep_dogs:
+            await delete_dogs(dog_ids)
+        await dispose_engines()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--email", required=True, help="superadmin that owns the dogs and signs requests")
+    parser.add_argument("--dogs", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=0.2, help="fixes per second per dog")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of emitted traffic")
+    parser.add_argument("--transport", choices=["http", "udp"], default="http")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--udp-host", default="127.0.0.1")
+    parser.add_argument("--udp-port", type=int, default=1700)
+    parser.add_argument("--records-per-payload", type=int, default=500, help="use <= 5 for realistic LoRa uplinks")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel HTTP requests")
+    parser.add_argument("--movement", choices=["random-walk", "home-range"], default="home-range")
+    parser.add_argument("--latitude", type=float, default=55.75)
+    parser.add_argument("--longitude", type=float, default=37.62)
+    parser.add_argument("--radius-km", type=float, default=10)
+    parser.add_argument("--step-km", type=float, default=0.02, help="std of one movement step")
+    parser.add_argument("--home-pull", type=float, default=0.05, help="share of the way back home per step")
+    parser.add_argument("--jitter", type=float, default=0.5, help="max random delivery delay, seconds")
+    parser.add_argument("--duplicates", type=float, default=0.02, help="probability a fix is sent twice")
+    parser.add_argument("--reorder", type=float, default=0.02, help="probability a fix is delayed past later ones")
+    parser.add_argument("--latency-sample", type=int, default=20, help="dogs polled for e2e latency")
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--settle", type=float, default=2, help="seconds to keep polling after the last fix")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--keep-dogs", action="store_true", help="do not deactivate the simulated dogs")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
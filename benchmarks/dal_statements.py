@@ -0,0 +1,82 @@
+"""Per-query Python overhead of the hot DAL lookups, no database needed.
+
+Emulates what the engine does before sending SQL to asyncpg: build the
+statement, compute its cache key, look up the compiled form in the
+compiled cache (compiling on a miss). "before" rebuilds the select() on
+every call like the DAL used to, "after" reuses the module level
+statements from db/dals.py.
+
+Run from the project folder:
+    python benchmarks/dal_statements.py --number 20000
+"""
+import argparse
+import os
+import sys
+import timeit
+from uuid import uuid4
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect  # noqa: E402
+
+from db import dals  # noqa: E402
+from db.models import Dog  # noqa: E402
+from db.models import Task  # noqa: E402
+from db.models import User  # noqa: E402
+
+DIALECT = asyncpg_dialect()
+
+
+def make_runner():
+    compiled_cache = {}
+
+    def run(statement):
+        cache_key = statement._generate_cache_key()[0]
+        compiled = compiled_cache.get(cache_key)
+        if compiled is None:
+            compiled = statement.compile(dialect=DIALECT)
+            compiled_cache[cache_key] = compiled
+        return compiled
+
+    return run
+
+
+def get_cases():
+    email = "volunteer@kek.com"
+    dog_id = uuid4()
+    task_id = uuid4()
+    return {
+        "UserDAL.get_user_by_email": (
+            lambda: select(User).where(User.email == email),
+            lambda: dals.USER_BY_EMAIL_QUERY,
+        ),
+        "DogDAL.get_dog_by_id": (
+            lambda: select(Dog).where(Dog.dog_id == dog_id),
+            lambda: dals.DOG_BY_ID_QUERY,
+        ),
+        "TaskDAL.get_task_by_id": (
+            lambda: select(Task).filter(Task.task_id == task_id),
+            lambda: dals.TASK_BY_ID_QUERY,
+        ),
+    }
+
+
+def main(number: int):
+    run = make_runner()
+    for name, (before, after) in get_cases().items():
+        timings = []
+        for build in (before, after):
+            run(build())
+            seconds = timeit.timeit(lambda: run(build()), number=number)
+            timings.append(seconds / number * 1e6)
+        print(
+            f"{name:28s} before {timings[0]:8.2f} us/query  "
+            f"after {timings[1]:8.2f} us/query  x{timings[0] / timings[1]:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    main(parser.parse_args().number)
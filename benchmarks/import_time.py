@@ -0,0 +1,73 @@
+"""Cold start benchmark: `python -X importtime` breakdown of `import main`
+and wall time from interpreter start to the first served request.
+
+Run from the project folder:
+    python benchmarks/import_time.py --repeat 5 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_REQUEST_SCRIPT = """
+from starlette.testclient import TestClient
+import main
+with TestClient(main.app) as client:
+    assert client.get("/openapi.json").status_code == 200
+"""
+
+
+def parse_importtime(stderr: str) -> list:
+    """Return (cumulative_us, self_us, module) for every `import time:` line"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    return rows
+
+
+def measure_imports(top: int):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=PROJECT_DIR, capture_output=True, text=True, check=True,
+    )
+    rows = parse_importtime(result.stderr)
+    total_us = next(cumulative for cumulative, _, module in rows if module.strip() == "main")
+    print(f"import main: {total_us / 1000:.1f} ms cumulative")
+    print(f"top {top} packages by cumulative import time:")
+    top_level = [row for row in rows if row[2].startswith("   ") and not row[2].startswith("    ")]
+    for cumulative_us, self_us, module in sorted(top_level or rows, reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {module.strip()}")
+    for heavy in ("numpy", "passlib", "jose", "bcrypt"):
+        loaded = any(module.strip() == heavy for _, _, module in rows)
+        print(f"  {heavy:8s} imported at startup: {loaded}")
+
+
+def measure_first_request(repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", FIRST_REQUEST_SCRIPT],
+            cwd=PROJECT_DIR, capture_output=True, check=True,
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+    print(
+        f"process start to first served request: median {statistics.median(timings):.1f} ms, "
+        f"min {min(timings):.1f} ms over {repeat} runs"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    measure_imports(args.top)
+    measure_first_request(args.repeat)
@@ -1,11 +1,36 @@
-from typing import List, Union
+from datetime import datetime
+from datetime import timedelta
+from typing import List, Set, Tuple, Union
 from uuid import UUID
+from uuid import uuid4
 
 from sqlalchemy import and_
+from sqlalchemy import bindparam
+from sqlalchemy import case
+from sqlalchemy import cast
+from sqlalchemy import delete
+from sqlalchemy import exists
+from sqlalchemy import Float
+from sqlalchemy import column
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import literal_column
+from sqlalchemy import or_
 from sqlalchemy import select
+from sqlalchemy import table
+from sqlalchemy import text
+from sqlalchemy import tuple_
 from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import REAL
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
+from db.models import IdempotencyKey
+from db.models import Job
+from db.models import Notification
 from db.models import PortalRole
 from db.models import User
 from db.models import Dog
@@ -15,6 +40,250 @@ from db.models import Task
 # БЛОК ИНТЕРАКЦИЙ С DALS #
 ##########################
 
+# hot queries are built once: their cache key is memoized, so SQLAlchemy
+# finds the compiled SQL without rebuilding and traversing the construct,
+# and asyncpg reuses the prepared statement per connection
+USER_BY_ID_QUERY = select(User).where(User.user_id == bindparam("user_id"))
+# logins are case-insensitive, lower(email) is unique
+USER_BY_EMAIL_QUERY = select(User).where(func.lower(User.email) == bindparam("lower_email"))
+DOG_BY_ID_QUERY = select(Dog).where(Dog.dog_id == bindparam("dog_id"))
+TASK_BY_ID_QUERY = select(Task).where(Task.task_id == bindparam("task_id"))
+
+# list endpoints select only the serialized columns as plain rows,
+# skipping ORM entity construction and identity map bookkeeping
+ACTIVE_DOG_ROWS_QUERY = select(Dog.dog_id, Dog.name, Dog.gender, Dog.is_active).where(
+    Dog.is_active == True
+)
+ACTIVE_TASK_ROWS_QUERY = select(
+    Task.task_id, Task.description, Task.created_for, Task.created_by, Task.is_active
+).where(Task.is_active == True)
+OPEN_TASK_COUNTS_BY_DOG_QUERY = (
+    select(Task.created_for, func.count())
+    .where(Task.is_active == True)
+    .group_by(Task.created_for)
+)
+LOCATED_VOLUNTEERS_QUERY = select(User.user_id, User.latitude, User.longitude).where(
+    and_(User.is_active == True, User.latitude.isnot(None), User.longitude.isnot(None))
+)
+OPEN_TASK_LOCATIONS_QUERY = (
+    select(Task.task_id, Dog.latitude, Dog.longitude)
+    .join(Dog, Dog.dog_id == Task.created_for)
+    .where(
+        and_(
+            Task.is_active == True,
+            Dog.is_active == True,
+            Dog.latitude.isnot(None),
+            Dog.longitude.isnot(None),
+        )
+    )
+)
+# snapshots for reconciling the in-memory area statistics
+ACTIVE_DOG_POSITIONS_QUERY = select(Dog.dog_id, Dog.latitude, Dog.longitude).where(Dog.is_active == True)
+OPEN_TASKS_OF_ACTIVE_DOGS_QUERY = (
+    select(Task.task_id, Task.created_for)
+    .join(Dog, Dog.dog_id == Task.created_for)
+    .where(and_(Task.is_active == True, Dog.is_active == True))
+)
+COMPLETED_TASK_ROWS_BY_CLOSED_BY_QUERY = select(
+    Task.task_id, Task.description, Task.created_by, Task.closed_by, Task.created_for
+).where(and_(Task.closed_by == bindparam("closed_by"), Task.is_active == False))
+
+# the admin user directory pages through users in lower(email) order, the key is unique
+USER_LIST_EMAIL_KEY = func.lower(User.email)
+USER_LIST_QUERY = (
+    select(
+        User.user_id,
+        User.name,
+        User.surname,
+        User.email,
+        User.is_active,
+        User.roles,
+        USER_LIST_EMAIL_KEY.label("email_key"),
+    )
+    .order_by(USER_LIST_EMAIL_KEY)
+    .limit(bindparam("limit"))
+)
+USER_LIST_AFTER_CURSOR = USER_LIST_EMAIL_KEY > bindparam("after_email", type_=User.email.type)
+
+
+def _like_prefix(prefix: str) -> str:
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
+
+# full-text search matches either stemming of the words, so the GIN index on
+# the combined vector serves both languages; the keyset cursor is (rank, task_id)
+TASK_SEARCH_TSQUERY = func.websearch_to_tsquery(literal_column("'russian'"), bindparam("query")).op("||")(
+    func.websearch_to_tsquery(literal_column("'english'"), bindparam("query"))
+)
+TASK_SEARCH_RANK = func.ts_rank_cd(Task.search_vector, TASK_SEARCH_TSQUERY, type_=REAL)
+TASK_SEARCH_QUERY = (
+    select(
+        Task.task_id,
+        Task.description,
+        Task.created_for,
+        Task.created_by,
+        Task.is_active,
+        TASK_SEARCH_RANK.label("rank"),
+    )
+    .where(Task.search_vector.op("@@")(TASK_SEARCH_TSQUERY))
+    .order_by(TASK_SEARCH_RANK.desc(), Task.task_id.desc())
+    .limit(bindparam("limit"))
+)
+TASK_SEARCH_AFTER_CURSOR = tuple_(TASK_SEARCH_RANK, Task.task_id) < tuple_(
+    cast(bindparam("after_rank", type_=REAL), REAL), bindparam("after_task_id", type_=Task.task_id.type)
+)
+
+# the completion counter is bumped atomically in the transaction that closes the tasks
+INCREMENT_COMPLETED_TASKS_QUERY = (
+    update(User)
+    .where(User.user_id == bindparam("completed_by"))
+    .values(completed_tasks_count=User.completed_tasks_count + bindparam("completed"))
+    .returning(User.completed_tasks_count)
+)
+# closing a task and counting it for the volunteer is one statement: only the
+# request whose conditional UPDATE still finds the task active bumps the counter
+CLOSED_TASK_CTE = (
+    update(Task)
+    .where(and_(Task.task_id == bindparam("closing_task_id"), Task.is_active == True))
+    .values(is_active=False, closed_by=bindparam("closing_user_id"))
+    .returning(Task.task_id, Task.closed_by)
+    .cte("closed_task")
+)
+CLOSE_TASK_QUERY = (
+    update(User)
+    .where(User.user_id == CLOSED_TASK_CTE.c.closed_by)
+    .values(completed_tasks_count=User.completed_tasks_count + 1)
+    .returning(CLOSED_TASK_CTE.c.task_id, User.completed_tasks_count)
+)
+# closing all tasks of a dog counts them for the volunteer in the same
+# statement; no row comes back when the dog had no open tasks
+CLOSED_DOG_TASKS_CTE = (
+    update(Task)
+    .where(and_(Task.created_for == bindparam("closing_dog_id"), Task.is_active == True))
+    .values(is_active=False, closed_by=bindparam("closing_user_id"))
+    .returning(Task.task_id)
+    .cte("closed_dog_tasks")
+)
+CLOSE_DOG_TASKS_QUERY = (
+    update(User)
+    .where(and_(User.user_id == bindparam("closing_user_id"), exists(select(CLOSED_DOG_TASKS_CTE.c.task_id))))
+    .values(
+        completed_tasks_count=User.completed_tasks_count
+        + select(func.count()).select_from(CLOSED_DOG_TASKS_CTE).scalar_subquery()
+    )
+    .returning(select(func.array_agg(CLOSED_DOG_TASKS_CTE.c.task_id)).scalar_subquery())
+)
+LEADERBOARD_QUERY = (
+    select(User.user_id, User.name, User.surname, User.completed_tasks_count)
+    .where(and_(User.is_active == True, User.completed_tasks_count > 0))
+    .order_by(User.completed_tasks_count.desc(), User.user_id.desc())
+    .limit(bindparam("limit"))
+)
+COMPLETED_TASKS_HISTOGRAM_QUERY = (
+    select(User.completed_tasks_count, func.count())
+    .where(and_(User.is_active == True, User.completed_tasks_count > 0))
+    .group_by(User.completed_tasks_count)
+)
+
+
+# a big-endian float8 packed into a bytea, rebuilt from its IEEE 754 sign,
+# exponent and mantissa bits; every step is exact, subnormals included
+PACKED_FLOAT8_BITS = (
+    "CAST(CAST('x' || encode(substring(CAST(:{name} AS bytea) FROM n * 8 - 7 FOR 8), 'hex') AS bit(64)) AS bigint)"
+)
+FLOAT8_FROM_BITS = (
+    "CASE WHEN {bits} < 0 THEN -1 ELSE 1 END * CASE WHEN ({bits} >> 52) & 2047 = 0 "
+    "THEN ({bits} & 4503599627370495) * power(CAST(2 AS float8), -1074) "
+    "ELSE (({bits} & 4503599627370495) + 4503599627370496) "
+    "* power(CAST(2 AS float8), (({bits} >> 52) & 2047) - 1075) END"
+)
+
+# a whole batch of collar fixes is applied by one statement: collar ids,
+# coordinates and fix times arrive as single bytea buffers of packed values
+# (16-byte UUIDs, float8 and uint32), so no per-fix objects are built,
+# and fixes older than the stored one are skipped
+UPDATE_DOG_POSITIONS_QUERY = text(
+    "UPDATE dogs SET latitude = fix.latitude, longitude = fix.longitude, location_fixed_at = fix.fixed_at "
+    "FROM (SELECT CAST(encode(substring(CAST(:collar_ids AS bytea) FROM n * 16 - 15 FOR 16), 'hex') AS uuid) AS dog_id, "
+    f"{FLOAT8_FROM_BITS.format(bits='bits.latitude')} AS latitude, "
+    f"{FLOAT8_FROM_BITS.format(bits='bits.longitude')} AS longitude, "
+    "to_timestamp(CAST(CAST('x' || encode(substring(CAST(:fixed_at AS bytea) FROM n * 4 - 3 FOR 4), 'hex') "
+    "AS bit(32)) AS bigint)) AS fixed_at "
+    "FROM generate_series(1, length(CAST(:collar_ids AS bytea)) / 16) AS n, "
+    f"LATERAL (SELECT {PACKED_FLOAT8_BITS.format(name='latitudes')} AS latitude, "
+    f"{PACKED_FLOAT8_BITS.format(name='longitudes')} AS longitude) AS bits) AS fix "
+    "WHERE dogs.dog_id = fix.dog_id "
+    "AND dogs.is_active "
+    "AND (dogs.location_fixed_at IS NULL OR dogs.location_fixed_at < fix.fixed_at) "
+    "RETURNING dogs.dog_id, dogs.name, dogs.latitude, dogs.longitude"
+)
+
+
+# a worker claims the oldest due job; SKIP LOCKED lets concurrent workers
+# pass over rows another worker is claiming instead of waiting on them
+CLAIM_JOB_QUERY = (
+    update(Job)
+    .where(
+        Job.job_id
+        == select(Job.job_id)
+        .where(and_(Job.status == "pending", Job.run_at <= func.now()))
+        .order_by(Job.run_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    .values(status="running", attempts=Job.attempts + 1, locked_at=func.now())
+    .returning(Job.job_id, Job.name, Job.payload, Job.attempts)
+)
+
+
+# a task fans out to all its recipients with one statement, their ids and
+# distances arrive as two arrays unnested side by side
+NOTIFICATION_RECIPIENTS = (
+    func.unnest(
+        cast(bindparam("user_ids"), ARRAY(PG_UUID(as_uuid=True))),
+        cast(bindparam("distances"), ARRAY(Float)),
+    )
+    .table_valued("user_id", "distance")
+    .render_derived()
+)
+INSERT_NOTIFICATIONS_QUERY = insert(Notification).from_select(
+    ["user_id", "task_id", "dog_id", "dog_name", "description", "distance"],
+    select(
+        NOTIFICATION_RECIPIENTS.c.user_id,
+        cast(bindparam("new_task_id"), Notification.task_id.type),
+        cast(bindparam("new_dog_id"), Notification.dog_id.type),
+        cast(bindparam("new_dog_name"), Notification.dog_name.type),
+        cast(bindparam("new_description"), Notification.description.type),
+        NOTIFICATION_RECIPIENTS.c.distance,
+    ),
+)
+NOTIFICATIONS_AFTER_QUERY = (
+    select(
+        Notification.notification_id,
+        Notification.task_id,
+        Notification.dog_id,
+        Notification.dog_name,
+        Notification.description,
+        Notification.distance,
+        Notification.created_at,
+    )
+    .where(
+        and_(
+            Notification.user_id == bindparam("user_id"),
+            Notification.notification_id > bindparam("after"),
+        )
+    )
+    .order_by(Notification.notification_id)
+    .limit(bindparam("limit"))
+)
+# recipients of notifications newer than the last one a process has seen
+NEW_NOTIFICATION_RECIPIENTS_QUERY = (
+    select(Notification.user_id, func.max(Notification.notification_id))
+    .where(Notification.notification_id > bindparam("after"))
+    .group_by(Notification.user_id)
+)
+
 
 class UserDAL:
     def __init__(self, db_session: AsyncSession):
@@ -39,6 +308,37 @@ class UserDAL:
         await self.db_session.flush()
         return new_user
 
+    async def copy_users(self, users: List[tuple]) -> List[tuple]:
+        """Load users through COPY into a temp table and move them to
+        users skipping already registered emails.
+        users: (user_id, name, surname, email, is_active, hashed_password, roles)
+        """
+        columns = [
+            "user_id", "name", "surname", "email",
+            "is_active", "hashed_password", "roles",
+        ]
+        await self.db_session.execute(text("DROP TABLE IF EXISTS users_import"))
+        await self.db_session.execute(
+            text("CREATE TEMP TABLE users_import (LIKE users INCLUDING DEFAULTS)")
+        )
+        connection = await self.db_session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            "users_import", records=users, columns=columns
+        )
+        users_import = table("users_import", *[column(name) for name in columns])
+        query = (
+            pg_insert(User)
+            .from_select(columns, select(users_import))
+            # no conflict target: an email registered in another case hits the lower(email) index
+            .on_conflict_do_nothing()
+            .returning(User.user_id, User.email)
+        )
+        res = await self.db_session.execute(query)
+        inserted_rows = res.fetchall()
+        await self.db_session.execute(text("DROP TABLE users_import"))
+        return inserted_rows
+
     async def delete_user(self, user_id: UUID) -> Union[UUID, None]:
         query = (
             update(User)
@@ -52,19 +352,77 @@ class UserDAL:
             return deleted_user_id_row[0]
 
     async def get_user_by_id(self, user_id: UUID) -> Union[User, None]:
-        query = select(User).where(User.user_id == user_id)
-        res = await self.db_session.execute(query)
+        res = await self.db_session.execute(USER_BY_ID_QUERY, {"user_id": user_id})
         user_row = res.fetchone()
         if user_row is not None:
             return user_row[0]
 
     async def get_user_by_email(self, email: str) -> Union[User, None]:
-        query = select(User).where(User.email == email)
-        res = await self.db_session.execute(query)
+        res = await self.db_session.execute(
+            USER_BY_EMAIL_QUERY, {"lower_email": email.lower()}
+        )
         user_row = res.fetchone()
         if user_row is not None:
             return user_row[0]
 
+    async def get_located_volunteers(self) -> list:
+        res = await self.db_session.execute(LOCATED_VOLUNTEERS_QUERY)
+        return res.all()
+
+    async def get_located_users_in_box(
+        self, min_latitude: float, max_latitude: float, min_longitude: float, max_longitude: float
+    ) -> list:
+        """Active users inside the box, min_longitude > max_longitude crosses the antimeridian"""
+        if min_longitude <= max_longitude:
+            longitude_condition = User.longitude.between(min_longitude, max_longitude)
+        else:
+            longitude_condition = or_(User.longitude >= min_longitude, User.longitude <= max_longitude)
+        query = select(User.user_id, User.latitude, User.longitude).where(
+            and_(
+                User.is_active == True,
+                User.latitude.between(min_latitude, max_latitude),
+                longitude_condition,
+            )
+        )
+        res = await self.db_session.execute(query)
+        return res.all()
+
+    async def list_users(
+        self,
+        limit: int,
+        role: Union[str, None] = None,
+        is_active: Union[bool, None] = None,
+        email_prefix: Union[str, None] = None,
+        name_prefix: Union[str, None] = None,
+        after_email: Union[str, None] = None,
+    ) -> list:
+        """A page of users ordered by lower(email); prefixes are matched case-insensitively"""
+        query = USER_LIST_QUERY
+        params = {"limit": limit}
+        if role is not None:
+            query = query.where(User.roles.contains([role]))
+        if is_active is not None:
+            query = query.where(User.is_active == is_active)
+        if email_prefix:
+            query = query.where(USER_LIST_EMAIL_KEY.like(_like_prefix(email_prefix.lower())))
+        if name_prefix:
+            pattern = _like_prefix(name_prefix.lower())
+            query = query.where(or_(func.lower(User.name).like(pattern), func.lower(User.surname).like(pattern)))
+        if after_email is not None:
+            query = query.where(USER_LIST_AFTER_CURSOR)
+            params["after_email"] = after_email
+        res = await self.db_session.execute(query, params)
+        return res.all()
+
+    async def get_leaderboard(self, limit: int) -> list:
+        res = await self.db_session.execute(LEADERBOARD_QUERY, {"limit": limit})
+        return res.all()
+
+    async def get_completed_tasks_histogram(self) -> dict:
+        """Number of active users per completed task count, users without completed tasks are left out"""
+        res = await self.db_session.execute(COMPLETED_TASKS_HISTOGRAM_QUERY)
+        return dict(res.all())
+
     async def update_user(self, user_id: UUID, **kwargs) -> Union[UUID, None]:
         query = (
             update(User)
@@ -108,8 +466,7 @@ class DogDAL:
             return deleted_dog_id_row[0]
 
     async def get_dog_by_id(self, dog_id: UUID) -> Dog:
-        query = select(Dog).where(Dog.dog_id == dog_id)
-        res = await self.db_session.execute(query)
+        res = await self.db_session.execute(DOG_BY_ID_QUERY, {"dog_id": dog_id})
         dog_row = res.fetchone()
         if dog_row is not None:
             return dog_row[0]
@@ -120,6 +477,31 @@ class DogDAL:
         active_dogs = result.scalars().all()
         return active_dogs
         
+    async def get_active_dog_ids(self, dog_ids: List[UUID]) -> Set[UUID]:
+        query = select(Dog.dog_id).where(and_(Dog.dog_id.in_(dog_ids), Dog.is_active == True))
+        res = await self.db_session.execute(query)
+        return set(res.scalars().all())
+
+    async def get_located_dog_rows(self, dog_ids: List[UUID]) -> list:
+        query = select(Dog.dog_id, Dog.name, Dog.latitude, Dog.longitude).where(
+            and_(
+                Dog.dog_id.in_(dog_ids),
+                Dog.is_active == True,
+                Dog.latitude.isnot(None),
+                Dog.longitude.isnot(None),
+            )
+        )
+        res = await self.db_session.execute(query)
+        return res.all()
+
+    async def get_active_dog_rows(self) -> list:
+        res = await self.db_session.execute(ACTIVE_DOG_ROWS_QUERY)
+        return res.all()
+
+    async def get_active_dog_positions(self) -> list:
+        res = await self.db_session.execute(ACTIVE_DOG_POSITIONS_QUERY)
+        return res.all()
+
     async def get_dog_by_name(self, name: str) -> Dog:
         query = select(Dog).where(Dog.name == name)
         res = await self.db_session.execute(query)
@@ -128,6 +510,21 @@ class DogDAL:
             return dog_row[0]
     
 
+    async def update_dog_positions(
+        self, collar_ids: bytes, latitudes: bytes, longitudes: bytes, fixed_at: bytes
+    ) -> list:
+        """Packed buffers: 16-byte UUIDs, big-endian float8 coordinates, big-endian uint32 unix seconds"""
+        res = await self.db_session.execute(
+            UPDATE_DOG_POSITIONS_QUERY,
+            {
+                "collar_ids": collar_ids,
+                "latitudes": latitudes,
+                "longitudes": longitudes,
+                "fixed_at": fixed_at,
+            },
+        )
+        return res.all()
+
     async def update_dog(self, dog_id: UUID, **kwargs) -> UUID:
         query = (
             update(Dog)
@@ -154,14 +551,48 @@ class TaskDAL:
         await self.session.flush()
         return new_task
 
+    async def create_tasks(self, tasks: List[dict], created_by: UUID) -> list:
+        """tasks: dicts with task_id, description and created_for"""
+        rows = [
+            {
+                "task_id": task["task_id"],
+                "description": task["description"],
+                "created_for": task["created_for"],
+                "created_by": created_by,
+                "is_active": True,
+            }
+            for task in tasks
+        ]
+        query = (
+            insert(Task)
+            .values(rows)
+            .returning(
+                Task.task_id,
+                Task.description,
+                Task.created_for,
+                Task.created_by,
+                Task.is_active,
+            )
+        )
+        res = await self.session.execute(query)
+        return res.fetchall()
+
     async def close_task(self, task_id: UUID, current_user: User) -> Union[UUID, None]:
-        task = await self.get_task_by_id(task_id)
-        if task and task.is_active:
-            task.is_active = False
-            task.closed_by = current_user.user_id
-            await self.session.flush()
-            return task_id
-        return None
+        res = await self.session.execute(
+            CLOSE_TASK_QUERY, {"closing_task_id": task_id, "closing_user_id": current_user.user_id}
+        )
+        closed_task = res.first()
+        if closed_task is None:
+            return None
+        # keep the caller's user in step without marking it dirty
+        set_committed_value(current_user, "completed_tasks_count", closed_task.completed_tasks_count)
+        return closed_task.task_id
+
+    async def increment_completed_tasks(self, user_id: UUID, completed: int) -> Union[int, None]:
+        res = await self.session.execute(
+            INCREMENT_COMPLETED_TASKS_QUERY, {"completed_by": user_id, "completed": completed}
+        )
+        return res.scalar()
     
 
     async def update_task(self, task_id: UUID, **updated_task_params) -> Union[UUID, None]:
@@ -174,33 +605,60 @@ class TaskDAL:
         return None
 
     async def get_task_by_id(self, task_id: UUID) -> Union[Task, None]:
-        query = select(Task).filter(Task.task_id == task_id)
-        result = await self.session.execute(query)
+        result = await self.session.execute(TASK_BY_ID_QUERY, {"task_id": task_id})
         task = result.scalar_one_or_none()
         return task
 
+    async def close_tasks_by_created_for(self, created_for: UUID, closed_by: UUID) -> List[UUID]:
+        res = await self.session.execute(
+            CLOSE_DOG_TASKS_QUERY, {"closing_dog_id": created_for, "closing_user_id": closed_by}
+        )
+        return res.scalar() or []
+
     async def get_tasks_by_created_for(self, created_for: UUID) -> List[Task]:
         query = select(Task).filter(Task.created_for == created_for)
         result = await self.session.execute(query)
         tasks = result.scalars().all()
         return tasks
     
-    async def delete_tasks_by_created_for(self, created_for: UUID) -> List[UUID]:
-        tasks = await self.get_tasks_by_created_for(created_for)
-        deleted_task_ids = []
-        for task in tasks:
-            if task.is_active:
-                task.is_active = False
-                deleted_task_ids.append(task.task_id)
-        await self.session.flush()
-        return deleted_task_ids
-
     async def get_active_tasks(self) -> List[Task]:
         query = select(Task).filter(Task.is_active == True)
         result = await self.session.execute(query)
         tasks = result.scalars().all()
         return tasks
 
+    async def get_active_task_rows(self) -> list:
+        result = await self.session.execute(ACTIVE_TASK_ROWS_QUERY)
+        return result.all()
+
+    async def get_open_task_locations(self) -> list:
+        result = await self.session.execute(OPEN_TASK_LOCATIONS_QUERY)
+        return result.all()
+
+    async def get_task_locations(self, task_ids: List[UUID]) -> list:
+        query = (
+            select(Task.task_id, Task.created_for, Dog.latitude, Dog.longitude)
+            .join(Dog, Dog.dog_id == Task.created_for)
+            .where(
+                and_(
+                    Task.task_id.in_(task_ids),
+                    Task.is_active == True,
+                    Dog.latitude.isnot(None),
+                    Dog.longitude.isnot(None),
+                )
+            )
+        )
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def get_open_task_counts_by_dog(self) -> dict:
+        result = await self.session.execute(OPEN_TASK_COUNTS_BY_DOG_QUERY)
+        return dict(result.all())
+
+    async def get_open_tasks_of_active_dogs(self) -> list:
+        result = await self.session.execute(OPEN_TASKS_OF_ACTIVE_DOGS_QUERY)
+        return result.all()
+
     async def get_completed_tasks(self) -> List[Task]:
         query = select(Task).filter(Task.is_active == False)
         result = await self.session.execute(query)
@@ -213,9 +671,183 @@ class TaskDAL:
         tasks = result.scalars().all()
         return tasks
     
+    async def get_completed_task_rows_by_closed_by(self, closed_by: UUID) -> list:
+        result = await self.session.execute(
+            COMPLETED_TASK_ROWS_BY_CLOSED_BY_QUERY, {"closed_by": closed_by}
+        )
+        return result.all()
+
+    async def search_tasks(
+        self,
+        query: str,
+        limit: int,
+        is_active: Union[bool, None] = None,
+        after_rank: Union[float, None] = None,
+        after_task_id: Union[UUID, None] = None,
+    ) -> list:
+        """Tasks matching the web-search style query, best ranked first"""
+        statement = TASK_SEARCH_QUERY
+        params = {"query": query, "limit": limit}
+        if is_active is not None:
+            statement = statement.where(Task.is_active == is_active)
+        if after_task_id is not None:
+            statement = statement.where(TASK_SEARCH_AFTER_CURSOR)
+            params.update(after_rank=after_rank, after_task_id=after_task_id)
+        result = await self.session.execute(statement, params)
+        return result.all()
+
     async def get_active_dogs(self) -> List[Dog]:
         query = select(Dog).filter(Dog.is_active == True)
         result = await self.session.execute(query)
         active_dogs = result.scalars().all()
         return active_dogs
 
+
+class IdempotencyKeyDAL:
+    """Data Access Layer for stored responses of idempotent requests"""
+
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def get_key(self, key: str) -> Union[IdempotencyKey, None]:
+        query = select(IdempotencyKey).where(
+            and_(IdempotencyKey.key == key, IdempotencyKey.expires_at > func.now())
+        )
+        res = await self.db_session.execute(query)
+        return res.scalar_one_or_none()
+
+    async def save_key(
+        self,
+        key: str,
+        fingerprint: str,
+        status_code: int,
+        headers: List[List[str]],
+        body: bytes,
+        expires_at: datetime,
+    ) -> None:
+        query = (
+            pg_insert(IdempotencyKey)
+            .values(
+                key=key,
+                fingerprint=fingerprint,
+                status_code=status_code,
+                headers=headers,
+                body=body,
+                expires_at=expires_at,
+            )
+            .on_conflict_do_nothing(index_elements=[IdempotencyKey.key])
+        )
+        await self.db_session.execute(query)
+
+    async def delete_expired_keys(self) -> None:
+        query = delete(IdempotencyKey).where(IdempotencyKey.expires_at <= func.now())
+        await self.db_session.execute(query)
+
+
+class JobDAL:
+    """Data Access Layer for persisted background jobs"""
+
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def enqueue_job(self, name: str, payload: dict) -> UUID:
+        query = insert(Job).values(job_id=uuid4(), name=name, payload=payload).returning(Job.job_id)
+        res = await self.db_session.execute(query)
+        return res.scalar_one()
+
+    async def claim_job(self):
+        res = await self.db_session.execute(CLAIM_JOB_QUERY)
+        return res.fetchone()
+
+    async def complete_job(self, job_id: UUID) -> None:
+        await self.db_session.execute(delete(Job).where(Job.job_id == job_id))
+
+    async def retry_job(self, job_id: UUID, delay_seconds: float, error: str) -> None:
+        query = (
+            update(Job)
+            .where(Job.job_id == job_id)
+            .values(
+                status="pending",
+                run_at=func.now() + timedelta(seconds=delay_seconds),
+                locked_at=None,
+                last_error=error,
+            )
+        )
+        await self.db_session.execute(query)
+
+    async def fail_job(self, job_id: UUID, error: str) -> None:
+        query = update(Job).where(Job.job_id == job_id).values(status="failed", locked_at=None, last_error=error)
+        await self.db_session.execute(query)
+
+    async def release_stale_jobs(self, lock_timeout_seconds: float, max_attempts: int) -> Tuple[int, int]:
+        """Return jobs of crashed workers to the queue, failing those out of attempts.
+
+        Returns the number of released and of failed jobs.
+        """
+        out_of_attempts = Job.attempts >= max_attempts
+        query = (
+            update(Job)
+            .where(
+                and_(
+                    Job.status == "running",
+                    Job.locked_at < func.now() - timedelta(seconds=lock_timeout_seconds),
+                )
+            )
+            .values(
+                status=case((out_of_attempts, "failed"), else_="pending"),
+                locked_at=None,
+                last_error=case((out_of_attempts, "Worker lock timed out"), else_=Job.last_error),
+            )
+            .returning(Job.status)
+        )
+        res = await self.db_session.execute(query)
+        statuses = res.scalars().all()
+        failed = statuses.count("failed")
+        return len(statuses) - failed, failed
+
+
+class NotificationDAL:
+    """Data Access Layer for inboxes of volunteer notifications"""
+
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def create_notifications(
+        self,
+        task_id: UUID,
+        dog_id: UUID,
+        dog_name: str,
+        description: str,
+        user_ids: List[UUID],
+        distances: List[float],
+    ) -> None:
+        await self.db_session.execute(
+            INSERT_NOTIFICATIONS_QUERY,
+            {
+                "user_ids": user_ids,
+                "distances": distances,
+                "new_task_id": task_id,
+                "new_dog_id": dog_id,
+                "new_dog_name": dog_name,
+                "new_description": description,
+            },
+        )
+
+    async def get_notifications(self, user_id: UUID, after: int, limit: int) -> list:
+        res = await self.db_session.execute(
+            NOTIFICATIONS_AFTER_QUERY, {"user_id": user_id, "after": after, "limit": limit}
+        )
+        return res.all()
+
+    async def get_last_notification_id(self) -> int:
+        res = await self.db_session.execute(select(func.coalesce(func.max(Notification.notification_id), 0)))
+        return res.scalar_one()
+
+    async def get_new_recipients(self, after: int) -> list:
+        """(user_id, newest notification id) of users notified after the id after"""
+        res = await self.db_session.execute(NEW_NOTIFICATION_RECIPIENTS_QUERY, {"after": after})
+        return res.all()
+
+    async def delete_old_notifications(self, ttl_seconds: float) -> None:
+        query = delete(Notification).where(Notification.created_at < func.now() - timedelta(seconds=ttl_seconds))
+        await self.db_session.execute(query)
@@ -1,12 +1,24 @@
 import uuid
 from enum import Enum
 
+from sqlalchemy import BigInteger
 from sqlalchemy import Boolean, Float
 from sqlalchemy import Column
+from sqlalchemy import Computed
+from sqlalchemy import DateTime
+from sqlalchemy import Index
+from sqlalchemy import Integer
+from sqlalchemy import LargeBinary
 from sqlalchemy import String
+from sqlalchemy import Text
+from sqlalchemy import func
+from sqlalchemy import text
 from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import deferred
 
 #############################
 # БЛОК РАБОТЫ С МОДЕЛЯМИ БД #
@@ -22,6 +34,13 @@ class PortalRole(str, Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_location", "latitude", "longitude", postgresql_where=text("latitude IS NOT NULL")),
+        # scanned backwards for the leaderboard, user_id breaks ties
+        Index("ix_users_completed_tasks_count", "completed_tasks_count", "user_id"),
+        # role filters use the array containment operator @>
+        Index("ix_users_roles", "roles", postgresql_using="gin"),
+    )
 
     user_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False)
@@ -32,6 +51,7 @@ class User(Base):
     roles = Column(ARRAY(String), nullable=False)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    completed_tasks_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     @property
     def is_superadmin(self) -> bool:
@@ -48,6 +68,17 @@ class User(Base):
     def remove_admin_privileges_from_model(self):
         if self.is_admin:
             return {role for role in self.roles if role != PortalRole.ROLE_PORTAL_ADMIN}
+
+
+# emails are unique regardless of case; logins and the keyset order of the user
+# directory use the first index, email prefix filters (LIKE 'abc%') need the
+# pattern operator class in non-C locales
+Index("ix_users_lower_email", func.lower(User.email).label("lower_email"), unique=True)
+Index(
+    "ix_users_lower_email_pattern",
+    func.lower(User.email).label("lower_email"),
+    postgresql_ops={"lower_email": "text_pattern_ops"},
+)
         
 class Dog(Base):
     __tablename__ = "dogs"
@@ -58,13 +89,68 @@ class Dog(Base):
     is_active = Column(Boolean(), default=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    location_fixed_at = Column(DateTime(timezone=True), nullable=True)
 
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_open_created_for", "created_for", postgresql_where=text("is_active")),
+        Index("ix_tasks_search_vector", "search_vector", postgresql_using="gin"),
+    )
     task_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     description = Column(String, nullable=False)
     created_for = Column(UUID(as_uuid=True), nullable=False)
     created_by = Column(UUID(as_uuid=True), nullable=False)
     closed_by = Column(UUID(as_uuid=True), nullable=True)
-    is_active = Column(Boolean(), default=True)
\ No newline at end of file
+    is_active = Column(Boolean(), default=True)
+    # maintained by Postgres, stemmed both ways since descriptions mix Russian and English;
+    # deferred so loading tasks does not drag the vector along
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('russian', description) || to_tsvector('english', description)",
+            persisted=True,
+        ),
+    ))
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    key = Column(String(64), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    headers = Column(JSONB, nullable=False)
+    body = Column(LargeBinary, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_pending_run_at", "run_at", postgresql_where=text("status = 'pending'")),
+    )
+    job_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    name = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    run_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+
+class Notification(Base):
+    """Inbox entry of a volunteer about a new task nearby, ids keep growing across processes and restarts"""
+    __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_id_notification_id", "user_id", "notification_id"),
+    )
+    notification_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    task_id = Column(UUID(as_uuid=True), nullable=False)
+    dog_id = Column(UUID(as_uuid=True), nullable=False)
+    dog_name = Column(String, nullable=False)
+    description = Column(String, nullable=False)
+    distance = Column(Float, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
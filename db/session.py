@@ -1,31 +1,197 @@
+import asyncio
+import time
+from logging import getLogger
 from typing import Generator
+from typing import Optional
 
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 import settings
 
+logger = getLogger(__name__)
+
 ##############################################
 # БЛОК ДЛЯ РАБОТЫ С ОБЫЧНЫМИ ИНТЕРАКЦИЯМИ БД #
 ##############################################
 
-# create async engine for interaction with database
-engine = create_async_engine(
-    settings.REAL_DATABASE_URL,
-    future=True,
-    echo=True,
-    execution_options={"isolation_level": "AUTOCOMMIT"},
+# engines are created by the application startup hook (or on first use by CLI tools)
+engine = None
+async_session = None
+
+# optional read-only replica used by GET requests
+read_engine = None
+async_read_session = None
+
+
+def _create_engine(database_url: str, pool_size: int):
+    return create_async_engine(
+        database_url,
+        future=True,
+        echo=True,
+        execution_options={"isolation_level": "AUTOCOMMIT"},
+        pool_size=pool_size,
+        max_overflow=settings.DB_POOL_MAX_OVERFLOW,
+        connect_args={
+            "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        },
+    )
+
+
+def init_engines():
+    """Create the primary engine and the optional replica engine"""
+    global engine, async_session, read_engine, async_read_session
+    if engine is not None:
+        return
+    # create async engine for interaction with database
+    engine = _create_engine(settings.REAL_DATABASE_URL, settings.DB_POOL_SIZE)
+    # create session for the interaction with database
+    async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    if settings.REPLICA_DATABASE_URL:
+        read_engine = _create_engine(settings.REPLICA_DATABASE_URL, settings.DB_READ_POOL_SIZE)
+        async_read_session = sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+
+
+async def dispose_engines():
+    global engine, async_session, read_engine, async_read_session
+    if engine is not None:
+        await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
+    engine = async_session = read_engine = async_read_session = None
+
+
+def get_session_factory(read_only: bool = False) -> sessionmaker:
+    init_engines()
+    if read_only and async_read_session is not None:
+        return async_read_session
+    return async_session
+
+
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_is_in_recovery() "
+    "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "ELSE 0 END"
+)
+
+
+class ReplicaHealth:
+    """Cached replica availability and lag check"""
+
+    def __init__(self, check_interval: float, check_timeout: float, max_lag: float):
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.max_lag = max_lag
+        self._usable = False
+        self._checked_at = None
+        self._refresh: Optional[asyncio.Task] = None
+
+    def mark_down(self):
+        self._usable = False
+        self._checked_at = time.monotonic()
+
+    async def is_usable(self) -> bool:
+        init_engines()
+        if read_engine is None:
+            return False
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return self._usable
+        # concurrent requests keep using the previous state while one of them checks
+        self._checked_at = now
+        try:
+            self._usable = await asyncio.wait_for(self._check(), self.check_timeout)
+        except (OSError, SQLAlchemyError, asyncio.TimeoutError) as err:
+            logger.warning("Read replica is unavailable: %s", err)
+            self._usable = False
+        return self._usable
+
+    def is_usable_nowait(self) -> bool:
+        """Last known state, a stale one is refreshed in the background for the next requests"""
+        init_engines()
+        if read_engine is None:
+            return False
+        if self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval:
+            if self._refresh is None or self._refresh.done():
+                self._refresh = asyncio.get_running_loop().create_task(self.is_usable())
+        return self._usable
+
+    async def _check(self) -> bool:
+        async with read_engine.connect() as connection:
+            lag = (await connection.execute(REPLICA_LAG_QUERY)).scalar()
+        if self.max_lag > 0 and lag is not None and lag > self.max_lag:
+            logger.warning("Read replica lag %.1fs exceeds %.1fs", lag, self.max_lag)
+            return False
+        return True
+
+
+replica_health = ReplicaHealth(
+    check_interval=settings.REPLICA_HEALTH_CHECK_INTERVAL,
+    check_timeout=settings.REPLICA_HEALTH_CHECK_TIMEOUT,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
 )
 
-# create session for the interaction with database
-async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+class LazySession:
+    """Session proxy that creates the underlying session on first use
+    and records on request.state whether the request needed the DB at all.
+
+    Read-only sessions pick the replica at that point, so requests that
+    never touch the DB do not wait for a replica health check either.
+    """
+
+    def __init__(self, request: Request, read_only: bool = False):
+        self._request = request
+        self._read_only = read_only
+        self._session = None
+        self.uses_replica = False
+        request.state.db_session_used = False
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self.uses_replica = self._read_only and replica_health.is_usable_nowait()
+            self._session = get_session_factory(read_only=self.uses_replica)()
+            self._request.state.db_session_used = True
+        return self._session
+
+    @property
+    def is_used(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+def dispose_engines_after_fork():
+    """Drop pooled connections inherited from the parent process without closing them"""
+    if engine is not None:
+        engine.sync_engine.dispose(close=False)
+    if read_engine is not None:
+        read_engine.sync_engine.dispose(close=False)
 
 
-async def get_db() -> Generator:
-    """Dependency for getting async session"""
+async def get_db(request: Request) -> Generator:
+    """Dependency for getting lazy async session, read-only requests use the replica when it is healthy"""
+    session = LazySession(request, read_only=request.method in READ_ONLY_METHODS)
     try:
-        session: AsyncSession = async_session()
         yield session
+    except (OSError, DBAPIError) as err:
+        # the request that finds the replica dead still fails, the following ones go to the primary
+        if session.uses_replica and (isinstance(err, OSError) or err.connection_invalidated):
+            replica_health.mark_down()
+        raise
     finally:
-        await session.close()
\ No newline at end of file
+        await session.close()
+        logger.debug("%s %s used db session: %s", request.method, request.url.path, session.is_used)
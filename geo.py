@@ -0,0 +1,61 @@
+import math
+
+# kilometers per degree of arc in get_distance_between_points
+KM_PER_DEGREE = 60 * 1.1515 * 1.609344
+
+
+def rad2deg(radians):
+    from numpy import pi
+
+    degrees = radians * 180 / pi
+    return degrees
+
+def deg2rad(degrees):
+    from numpy import pi
+
+    radians = degrees * pi / 180
+    return radians
+
+def get_distance_between_points(latitude1, longitude1, latitude2, longitude2, unit = 'kilometers'):
+    # numpy is imported lazily to keep it out of the application startup
+    from numpy import sin, cos, arccos, clip, round
+
+    theta = longitude1 - longitude2
+    distance = 60 * 1.1515 * rad2deg(
+        arccos(
+            # rounding can push the cosine slightly out of [-1, 1] for (almost) equal points
+            clip(
+                (sin(deg2rad(latitude1)) * sin(deg2rad(latitude2))) + 
+                (cos(deg2rad(latitude1)) * cos(deg2rad(latitude2)) * cos(deg2rad(theta))),
+                -1.0, 1.0,
+            )
+        )
+    )
+    
+    if unit == 'miles':
+        return round(distance, 4)
+    if unit == 'kilometers':
+        return round(distance * 1.609344, 4)
+
+
+def get_distance_matrix(latitudes1, longitudes1, latitudes2, longitudes2, unit = 'kilometers'):
+    """Distances between every point of the first set (rows) and of the second set (columns)"""
+    import numpy as np
+
+    return get_distance_between_points(
+        np.asarray(latitudes1, dtype=np.float64)[:, None],
+        np.asarray(longitudes1, dtype=np.float64)[:, None],
+        np.asarray(latitudes2, dtype=np.float64)[None, :],
+        np.asarray(longitudes2, dtype=np.float64)[None, :],
+        unit=unit,
+    )
+
+
+def longitude_delta(arc_degrees: float, max_abs_latitude: float) -> float:
+    """Longitude span reachable within arc_degrees from points with |latitude| <= max_abs_latitude"""
+    if max_abs_latitude >= 90:
+        return 360.0
+    ratio = math.sin(math.radians(arc_degrees) / 2) / math.cos(math.radians(max_abs_latitude))
+    if ratio >= 1:
+        return 360.0
+    return math.degrees(2 * math.asin(ratio))
@@ -1,13 +1,53 @@
-from passlib.context import CryptContext
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+import settings
+
+_pwd_context = None
+_hash_executor = None
+
+
+def get_pwd_context():
+    """passlib and bcrypt are imported on first use to keep them out of the application startup"""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 
 class Hasher:
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+        return get_pwd_context().verify(plain_password, hashed_password)
 
     @staticmethod
     def get_password_hash(password: str) -> str:
-        return pwd_context.hash(password)
\ No newline at end of file
+        return get_pwd_context().hash(password)
+
+
+def _hash_passwords_chunk(passwords: List[str]) -> List[str]:
+    return [Hasher.get_password_hash(password) for password in passwords]
+
+
+def _get_hash_executor() -> ProcessPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+    return _hash_executor
+
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash passwords in parallel across a process pool, keeping input order"""
+    if not passwords:
+        return []
+    executor = _get_hash_executor()
+    loop = asyncio.get_running_loop()
+    chunk_size = max(1, len(passwords) // (settings.PASSWORD_HASH_WORKERS * 4))
+    chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+    hashed_chunks = await asyncio.gather(
+        *(loop.run_in_executor(executor, _hash_passwords_chunk, chunk) for chunk in chunks)
+    )
+    return [hashed for chunk in hashed_chunks for hashed in chunk]
@@ -0,0 +1,136 @@
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import signal
+import socket
+from collections import Counter
+from logging import getLogger
+from typing import Optional, Tuple
+
+import settings
+from api.services.positions import PositionBatcher
+
+logger = getLogger(__name__)
+
+###########################################
+# блок с ПРИЁМОМ ДАННЫХ С БАЗОВОЙ СТАНЦИИ #
+###########################################
+
+# Semtech packet forwarder (GWMP) header: version, 2-byte token, identifier, 8-byte gateway EUI
+PROTOCOL_VERSIONS = {1, 2}
+PUSH_DATA = 0x00
+PUSH_ACK = 0x01
+PULL_DATA = 0x02
+PULL_ACK = 0x04
+PUSH_DATA_HEADER_SIZE = 12
+
+
+class PacketForwarderProtocol(asyncio.DatagramProtocol):
+    """Receives gateway uplinks and hands their payloads to the position batcher.
+
+    Every uplink payload ("data" of an rxpk item) is one or more collar
+    position records, whose collar id is the dog id. Acknowledgements are
+    sent before decoding so the gateway never retransmits because of us.
+    """
+
+    def __init__(self, batcher: PositionBatcher):
+        self.batcher = batcher
+        self.counters = Counter()
+        self.transport: Optional[asyncio.DatagramTransport] = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]):
+        self.counters["datagrams"] += 1
+        if len(data) < 4 or data[0] not in PROTOCOL_VERSIONS:
+            self.counters["malformed_datagrams"] += 1
+            return
+        identifier = data[3]
+        if identifier == PULL_DATA:
+            self.transport.sendto(data[:3] + bytes([PULL_ACK]), addr)
+            return
+        if identifier != PUSH_DATA or len(data) < PUSH_DATA_HEADER_SIZE:
+            self.counters["malformed_datagrams"] += 1
+            return
+        self.transport.sendto(data[:3] + bytes([PUSH_ACK]), addr)
+        try:
+            uplinks = json.loads(data[PUSH_DATA_HEADER_SIZE:]).get("rxpk", [])
+        except (ValueError, AttributeError):
+            self.counters["malformed_datagrams"] += 1
+            return
+        for uplink in uplinks:
+            self.counters["uplinks"] += 1
+            try:
+                payload = base64.b64decode(uplink["data"], validate=True)
+            except (KeyError, TypeError, binascii.Error):
+                self.counters["malformed_uplinks"] += 1
+                continue
+            if not self.batcher.submit(payload):
+                self.counters["rejected_uplinks"] += 1
+
+    def error_received(self, exc):
+        logger.error(f"LoRa listener socket error: {exc}")
+
+
+async def start_listener(
+    batcher: PositionBatcher, host: str, port: int, receive_buffer_size: int = 4 * 1024 * 1024
+) -> Tuple[asyncio.DatagramTransport, PacketForwarderProtocol]:
+    # a large kernel buffer absorbs bursts while the loop is busy flushing a batch
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer_size)
+    sock.bind((host, port))
+    loop = asyncio.get_running_loop()
+    return await loop.create_datagram_endpoint(lambda: PacketForwarderProtocol(batcher), sock=sock)
+
+
+async def _log_stats(protocol: PacketForwarderProtocol, batcher: PositionBatcher, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        logger.info(
+            "LoRa listener: %s, pending %s records, batcher: %s",
+            dict(protocol.counters),
+            batcher.pending_records,
+            dict(batcher.counters),
+        )
+
+
+async def serve():
+    from db.session import dispose_engines
+    from db.session import get_session_factory
+
+    batcher = PositionBatcher(
+        session_factory=get_session_factory(),
+        batch_size=settings.LORA_BATCH_SIZE,
+        max_delay=settings.LORA_BATCH_MAX_DELAY,
+        max_pending_records=settings.LORA_MAX_PENDING_RECORDS,
+        max_clock_skew=settings.POSITION_MAX_CLOCK_SKEW,
+    )
+    transport, protocol = await start_listener(
+        batcher, settings.LORA_LISTEN_HOST, settings.LORA_LISTEN_PORT, settings.LORA_RECEIVE_BUFFER_SIZE
+    )
+    logger.info("LoRa listener on %s:%s", settings.LORA_LISTEN_HOST, settings.LORA_LISTEN_PORT)
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stopped.set)
+    tasks = [
+        asyncio.create_task(batcher.run()),
+        asyncio.create_task(_log_stats(protocol, batcher, settings.LORA_STATS_INTERVAL)),
+    ]
+    try:
+        await stopped.wait()
+    finally:
+        transport.close()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await batcher.flush()
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve())
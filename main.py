@@ -1,11 +1,19 @@
 from fastapi import FastAPI
-import uvicorn
 from fastapi.routing import APIRouter
 
+import settings
 from api.handlers.dog_router import dog_router
 from api.handlers.user_router import user_router
 from api.handlers.task_router import task_router
 from api.handlers.login_router import login_router
+from api.middlewares.compression import CompressionMiddleware
+from api.middlewares.idempotency import IdempotencyMiddleware
+from api.middlewares.rate_limit import RateLimitMiddleware
+from api.services.area_stats import area_stats
+from api.services.job_queue import job_queue
+from api.services.notifications import notification_hub
+from db.session import dispose_engines
+from db.session import init_engines
 
 #####################
 # блок с API ROUTES #
@@ -13,6 +21,23 @@ from api.handlers.login_router import login_router
 
 app = FastAPI(title="MobileDogs_K_and_S")
 
+
+@app.on_event("startup")
+async def startup():
+    init_engines()
+    await job_queue.start()
+    await area_stats.start()
+    await notification_hub.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await notification_hub.stop()
+    await area_stats.stop()
+    await job_queue.stop()
+    await dispose_engines()
+
+
 main_api_router = APIRouter() # главный router
 
 main_api_router.include_router(user_router, prefix="/user", tags=["user"])
@@ -21,5 +46,34 @@ main_api_router.include_router(login_router, prefix="/login", tags=["login"])
 main_api_router.include_router(task_router, prefix="/task", tags=["task"])
 app.include_router(main_api_router)
 
+#####################
+# блок с MIDDLEWARE #
+#####################
+
+app.add_middleware(
+    IdempotencyMiddleware,
+    routes=settings.IDEMPOTENCY_ROUTES,
+    ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+    max_keys=settings.IDEMPOTENCY_MAX_KEYS,
+    use_database=settings.IDEMPOTENCY_DB_ENABLED,
+    enabled=settings.IDEMPOTENCY_ENABLED,
+)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    threadpool_min_size=settings.COMPRESSION_THREADPOOL_MIN_SIZE,
+    enabled=settings.COMPRESSION_ENABLED,
+)
+app.add_middleware(
+    RateLimitMiddleware,
+    default_budget=settings.RATE_LIMIT_DEFAULT,
+    route_budgets=settings.RATE_LIMIT_ROUTES,
+    max_keys=settings.RATE_LIMIT_MAX_KEYS,
+    enabled=settings.RATE_LIMIT_ENABLED,
+)
+
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,48 @@
+from gunicorn.app.base import BaseApplication
+
+import settings
+
+#####################################
+# блок с ПРОДАКШЕН ЗАПУСКОМ СЕРВЕРА #
+#####################################
+
+
+def post_fork(server, worker):
+    from db.session import dispose_engines_after_fork
+
+    dispose_engines_after_fork()
+
+
+class ProductionServer(BaseApplication):
+    """Gunicorn master with uvicorn workers, the app is imported once before forking"""
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from main import app
+
+        return app
+
+
+def get_server_options() -> dict:
+    return {
+        "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        "workers": settings.WEB_CONCURRENCY,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "max_requests": settings.WORKER_MAX_REQUESTS,
+        "max_requests_jitter": settings.WORKER_MAX_REQUESTS_JITTER,
+        "timeout": settings.WORKER_TIMEOUT,
+        "graceful_timeout": settings.WORKER_GRACEFUL_TIMEOUT,
+        "post_fork": post_fork,
+    }
+
+
+if __name__ == "__main__":
+    ProductionServer(get_server_options()).run()
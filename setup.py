@@ -65,7 +65,8 @@ setup(
                         'python-multipart',
                         'bcrypt',
                         'greenlet',
-                        'numpy',],
+                        'numpy',
+                        'gunicorn',],
 
     python_requires='>=3',
 
@@ -10,9 +10,17 @@ import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from starlette.testclient import TestClient
 
 import settings
+from api.middlewares.rate_limit import RateLimitMiddleware
+from api.services.area_stats import area_stats
+from api.services.job_queue import job_queue
+from api.services.leaderboard import completion_ranks
+from api.services.name_index import dog_name_index
+from api.services.notifications import notification_hub
+from api.services.spatial_index import dog_spatial_index
 from db.models import PortalRole
 from db.session import get_db
 from main import app
@@ -21,6 +29,8 @@ from security import create_access_token
 CLEAN_TABLES = [
     "users",
     "dogs",
+    "tasks",
+    "notifications",
 ]
 
 @pytest.fixture(scope="session")
@@ -51,6 +61,20 @@ async def clean_tables(async_session_test):
         async with session.begin():
             for table_for_cleaning in CLEAN_TABLES:
                 await session.execute(f"""TRUNCATE TABLE {table_for_cleaning};""")
+    dog_spatial_index.clear()
+    notification_hub.clear()
+    area_stats.clear()
+    completion_ranks.clear()
+    dog_name_index.clear()
+    _reset_rate_limits()
+
+
+def _reset_rate_limits():
+    middleware = app.middleware_stack
+    while middleware is not None:
+        if isinstance(middleware, RateLimitMiddleware):
+            middleware.reset()
+        middleware = getattr(middleware, "app", None)
 
 
 async def _get_test_db():
@@ -77,6 +101,14 @@ async def client() -> Generator[TestClient, Any, None]:
     """
 
     app.dependency_overrides[get_db] = _get_test_db
+    # background jobs run on the app loop, so they get unpooled connections to the test DB
+    job_queue.session_factory = sessionmaker(
+        create_async_engine(settings.TEST_DATABASE_URL, future=True, poolclass=NullPool),
+        expire_on_commit=False,
+        class_=AsyncSession,
+    )
+    area_stats.session_factory = job_queue.session_factory
+    notification_hub.session_factory = job_queue.session_factory
     with TestClient(app) as client:
         yield client
 
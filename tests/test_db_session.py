@@ -0,0 +1,216 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import db.session
+from db.session import ReplicaHealth
+from db.session import get_db
+from db.session import replica_health
+
+
+class _FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    async def execute(self, statement):
+        return statement
+
+    async def close(self):
+        self.closed = True
+
+
+class _SessionFactory:
+    def __init__(self):
+        self.sessions = []
+
+    def __call__(self):
+        session = _FakeSession()
+        self.sessions.append(session)
+        return session
+
+
+class _FakeConnection:
+    def __init__(self, lag):
+        self.lag = lag
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement):
+        return SimpleNamespace(scalar=lambda: self.lag)
+
+
+class _FakeReadEngine:
+    def __init__(self, lag=0.0, error=None):
+        self.lag = lag
+        self.error = error
+        self.connects = 0
+
+    def connect(self):
+        self.connects += 1
+        if self.error is not None:
+            raise self.error
+        return _FakeConnection(self.lag)
+
+
+@pytest.fixture
+def stub_engines(monkeypatch):
+    engines = SimpleNamespace(
+        primary=_SessionFactory(),
+        replica=_SessionFactory(),
+        read_engine=_FakeReadEngine(),
+    )
+    # a non-None primary engine keeps init_engines from creating real ones
+    monkeypatch.setattr(db.session, "engine", object())
+    monkeypatch.setattr(db.session, "async_session", engines.primary)
+    monkeypatch.setattr(db.session, "read_engine", engines.read_engine)
+    monkeypatch.setattr(db.session, "async_read_session", engines.replica)
+    monkeypatch.setattr(replica_health, "_usable", False)
+    monkeypatch.setattr(replica_health, "_checked_at", None)
+    monkeypatch.setattr(replica_health, "_refresh", None)
+    return engines
+
+
+def _replica_state(monkeypatch, usable: bool):
+    monkeypatch.setattr(replica_health, "_usable", usable)
+    monkeypatch.setattr(replica_health, "_checked_at", time.monotonic())
+
+
+def _request(method: str = "GET"):
+    return SimpleNamespace(method=method, url=SimpleNamespace(path="/dog/"), state=SimpleNamespace())
+
+
+async def _use_db(request):
+    dependency = get_db(request)
+    session = await dependency.__anext__()
+    await session.execute("SELECT 1")
+    await dependency.aclose()
+
+
+async def test_replica_is_usable_within_max_lag(stub_engines):
+    stub_engines.read_engine.lag = 2.0
+    health = ReplicaHealth(check_interval=60, check_timeout=1, max_lag=5)
+    assert await health.is_usable() is True
+
+
+async def test_replica_over_max_lag_is_not_usable(stub_engines):
+    stub_engines.read_engine.lag = 10.0
+    health = ReplicaHealth(check_interval=60, check_timeout=1, max_lag=5)
+    assert await health.is_usable() is False
+
+
+async def test_unreachable_replica_is_not_usable(stub_engines):
+    stub_engines.read_engine.error = OSError("connection refused")
+    health = ReplicaHealth(check_interval=60, check_timeout=1, max_lag=5)
+    assert await health.is_usable() is False
+
+
+async def test_replica_check_timeout_is_not_usable(stub_engines, monkeypatch):
+    health = ReplicaHealth(check_interval=60, check_timeout=0.01, max_lag=5)
+
+    async def hanging_check():
+        await asyncio.sleep(1)
+        return True
+
+    monkeypatch.setattr(health, "_check", hanging_check)
+    assert await health.is_usable() is False
+
+
+async def test_replica_check_is_cached_for_check_interval(stub_engines):
+    health = ReplicaHealth(check_interval=60, check_timeout=1, max_lag=5)
+    assert await health.is_usable() is True
+    stub_engines.read_engine.error = OSError("connection refused")
+    assert await health.is_usable() is True
+    assert stub_engines.read_engine.connects == 1
+    health.check_interval = 0
+    assert await health.is_usable() is False
+    assert stub_engines.read_engine.connects == 2
+
+
+async def test_marked_down_replica_is_not_checked_until_interval_passes(stub_engines):
+    health = ReplicaHealth(check_interval=60, check_timeout=1, max_lag=5)
+    assert await health.is_usable() is True
+    health.mark_down()
+    assert await health.is_usable() is False
+    assert stub_engines.read_engine.connects == 1
+
+
+async def test_get_uses_healthy_replica(stub_engines, monkeypatch):
+    _replica_state(monkeypatch, usable=True)
+    await _use_db(_request("GET"))
+    assert len(stub_engines.replica.sessions) == 1
+    assert stub_engines.primary.sessions == []
+
+
+async def test_get_falls_back_to_primary_when_replica_is_down(stub_engines, monkeypatch):
+    _replica_state(monkeypatch, usable=False)
+    await _use_db(_request("GET"))
+    assert len(stub_engines.primary.sessions) == 1
+    assert stub_engines.replica.sessions == []
+
+
+async def test_get_uses_primary_without_replica(stub_engines, monkeypatch):
+    monkeypatch.setattr(db.session, "read_engine", None)
+    monkeypatch.setattr(db.session, "async_read_session", None)
+    await _use_db(_request("GET"))
+    assert len(stub_engines.primary.sessions) == 1
+
+
+@pytest.mark.parametrize("method", ["POST", "PATCH", "PUT", "DELETE"])
+async def test_writes_always_use_primary(stub_engines, monkeypatch, method):
+    _replica_state(monkeypatch, usable=True)
+    await _use_db(_request(method))
+    assert len(stub_engines.primary.sessions) == 1
+    assert stub_engines.replica.sessions == []
+
+
+async def test_connection_error_on_replica_marks_it_down(stub_engines, monkeypatch):
+    _replica_state(monkeypatch, usable=True)
+    dependency = get_db(_request("GET"))
+    session = await dependency.__anext__()
+    await session.execute("SELECT 1")
+    with pytest.raises(OSError):
+        await dependency.athrow(OSError("connection reset"))
+    assert await replica_health.is_usable() is False
+    assert stub_engines.replica.sessions[0].closed
+
+
+async def test_untouched_session_is_never_created(stub_engines):
+    request = _request("GET")
+    dependency = get_db(request)
+    await dependency.__anext__()
+    await dependency.aclose()
+    assert request.state.db_session_used is False
+    assert stub_engines.primary.sessions == []
+    assert stub_engines.replica.sessions == []
+    # the replica health check waits for the first use as well
+    assert stub_engines.read_engine.connects == 0
+
+
+async def test_session_is_created_once_on_first_use_and_closed(stub_engines):
+    request = _request("POST")
+    dependency = get_db(request)
+    session = await dependency.__anext__()
+    assert request.state.db_session_used is False
+    await session.execute("SELECT 1")
+    await session.execute("SELECT 2")
+    assert request.state.db_session_used is True
+    assert len(stub_engines.primary.sessions) == 1
+    assert not stub_engines.primary.sessions[0].closed
+    await dependency.aclose()
+    assert stub_engines.primary.sessions[0].closed
+
+
+async def test_stale_replica_state_is_refreshed_in_background(stub_engines):
+    await _use_db(_request("GET"))
+    # the first read never waits for the check and goes to the primary
+    assert len(stub_engines.primary.sessions) == 1
+    await replica_health._refresh
+    assert stub_engines.read_engine.connects == 1
+    await _use_db(_request("GET"))
+    assert len(stub_engines.replica.sessions) == 1
@@ -0,0 +1,84 @@
+from uuid import uuid4
+
+from conftest import create_test_auth_headers_for_user
+from db.models import PortalRole
+
+
+async def test_area_stats_follow_dogs_and_tasks(client, create_user_in_database):
+    superadmin_data = {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_SUPERADMIN],
+    }
+    await create_user_in_database(**superadmin_data)
+    headers = create_test_auth_headers_for_user(superadmin_data["email"])
+    resp = client.post("/dog/create_dog/", json={"name": "Buddy", "gender": "male"}, headers=headers)
+    assert resp.status_code == 200
+    dog_id = resp.json()["dog_id"]
+
+    resp = client.get("/dog/area_stats/", headers=headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["reconciled_at"] is not None
+    assert data["active_dogs"] == 1
+    assert data["unlocated_dogs"] == 1
+    assert data["cells"] == []
+
+    resp = client.patch(f"/dog/update_dog_location/?dog_id={dog_id}&latitude=55.7520&longitude=37.6210", headers=headers)
+    assert resp.status_code == 200
+    resp = client.post("/task/create_task/", json={"description": "Feed", "created_for": str(dog_id)}, headers=headers)
+    assert resp.status_code == 200
+    task_id = resp.json()["task_id"]
+
+    data = client.get("/dog/area_stats/", headers=headers).json()
+    assert data["unlocated_dogs"] == 0
+    assert data["open_tasks"] == 1
+    assert len(data["cells"]) == 1
+    cell = data["cells"][0]
+    assert cell["min_latitude"] <= 55.7520 < cell["max_latitude"]
+    assert cell["min_longitude"] <= 37.6210 < cell["max_longitude"]
+    assert (cell["active_dogs"], cell["open_tasks"]) == (1, 1)
+
+    admin_data = {
+        "user_id": uuid4(),
+        "name": "Ivan",
+        "surname": "Petrov",
+        "email": "admin@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_ADMIN],
+    }
+    await create_user_in_database(**admin_data)
+    resp = client.delete(
+        f"/task/close_task/?task_id={task_id}", headers=create_test_auth_headers_for_user(admin_data["email"])
+    )
+    assert resp.status_code == 200
+    data = client.get("/dog/area_stats/", headers=headers).json()
+    assert data["open_tasks"] == 0
+    assert data["cells"][0]["open_tasks"] == 0
+
+    resp = client.delete(f"/dog/delete_dog/?dog_id={dog_id}", headers=headers)
+    assert resp.status_code == 200
+    data = client.get("/dog/area_stats/", headers=headers).json()
+    assert data["active_dogs"] == 0
+    assert data["cells"] == []
+
+
+async def test_area_stats_forbidden_for_common_user(client, create_user_in_database):
+    user_data = {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_USER],
+    }
+    await create_user_in_database(**user_data)
+    resp = client.get("/dog/area_stats/", headers=create_test_auth_headers_for_user(user_data["email"]))
+    assert resp.status_code == 403
+    assert resp.json() == {"detail": "Forbidden."}
@@ -0,0 +1,24 @@
+import settings
+
+
+async def test_large_response_is_gzipped(client):
+    resp = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert int(resp.headers["Content-Length"]) < len(resp.content)
+    assert resp.json()["info"]["title"] == "MobileDogs_K_and_S"
+
+
+async def test_response_without_accepted_encoding_is_not_compressed(client):
+    resp = client.get("/openapi.json", headers={"Accept-Encoding": "identity"})
+    assert resp.status_code == 200
+    assert "Content-Encoding" not in resp.headers
+    assert len(resp.content) >= settings.COMPRESSION_MINIMUM_SIZE
+
+
+async def test_brotli_only_client_gets_uncompressed_response(client):
+    resp = client.get("/openapi.json", headers={"Accept-Encoding": "br"})
+    assert resp.status_code == 200
+    assert "Content-Encoding" not in resp.headers
+    assert resp.json()["info"]["title"] == "MobileDogs_K_and_S"
@@ -62,6 +62,23 @@ async def test_create_user_duplicate_email_error(client, get_user_from_database)
     )
 
 
+async def test_create_user_duplicate_email_in_other_case_error(client):
+    user_data = {
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "password": "SamplePass1!",
+    }
+    resp = client.post("/user/create_user", data=json.dumps(user_data))
+    assert resp.status_code == 200
+    resp = client.post("/user/create_user", data=json.dumps({**user_data, "email": "Lol@Kek.com"}))
+    assert resp.status_code == 503
+    assert (
+        'duplicate key value violates unique constraint "ix_users_lower_email"'
+        in resp.json()["detail"]
+    )
+
+
 @pytest.mark.parametrize(
     "user_data_for_creation, expected_status_code, expected_detail",
     [
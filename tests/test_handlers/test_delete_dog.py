@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from uuid import uuid4
 
@@ -310,3 +312,45 @@ async def test_delete_another_dog(
     )
     assert resp.status_code == expected_status_code
 
+
+async def test_delete_dog_closes_its_tasks(
+    client, create_dog_in_database, create_user_in_database, create_task_in_database, asyncpg_pool
+):
+    user_data = {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_ADMIN],
+    }
+    await create_user_in_database(**user_data)
+    dog_id = uuid4()
+    await create_dog_in_database(
+        dog_id=dog_id, name="Buddy", gender="Male", created_by=user_data["user_id"], is_active=True
+    )
+    task_ids = [uuid4(), uuid4()]
+    for task_id in task_ids:
+        await create_task_in_database(
+            task_id=task_id,
+            description="Feed",
+            created_for=dog_id,
+            created_by=user_data["user_id"],
+            is_active=True,
+        )
+    resp = client.delete(
+        f"/dog/delete_dog/?dog_id={dog_id}",
+        headers=create_test_auth_headers_for_user(user_data["email"]),
+    )
+    assert resp.status_code == 200
+    # tasks are closed by a background job
+    for _ in range(50):
+        async with asyncpg_pool.acquire() as connection:
+            tasks = await connection.fetch("SELECT is_active, closed_by FROM tasks WHERE created_for = $1", dog_id)
+        if not any(task["is_active"] for task in tasks):
+            break
+        await asyncio.sleep(0.1)
+    assert len(tasks) == 2
+    assert all(task["is_active"] is False for task in tasks)
+    assert all(task["closed_by"] == user_data["user_id"] for task in tasks)
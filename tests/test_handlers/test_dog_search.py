@@ -0,0 +1,62 @@
+from uuid import uuid4
+
+from conftest import create_test_auth_headers_for_user
+from db.models import PortalRole
+
+
+async def test_search_dogs_by_name(client, create_user_in_database, create_dog_in_database):
+    user_data = {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_ADMIN],
+    }
+    await create_user_in_database(**user_data)
+    headers = create_test_auth_headers_for_user(user_data["email"])
+    dog_ids = {}
+    for name in ("Шарик", "Шарико", "Бобик", "Мухтар"):
+        dog_ids[name] = uuid4()
+        await create_dog_in_database(
+            dog_id=dog_ids[name], name=name, gender="male", created_by=user_data["user_id"], is_active=True
+        )
+    await create_dog_in_database(
+        dog_id=uuid4(), name="Шарлотта", gender="female", created_by=user_data["user_id"], is_active=False
+    )
+
+    resp = client.get("/dog/search?q=шарик", headers=headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [(dog["name"], dog["match"]) for dog in data] == [("Шарик", "exact"), ("Шарико", "prefix")]
+    assert data[0]["score"] == 1.0
+
+    resp = client.get("/dog/search?q=ШАР&limit=1", headers=headers)
+    assert [dog["name"] for dog in resp.json()] == ["Шарик"]
+
+    resp = client.get("/dog/search?q=мухтр", headers=headers)
+    data = resp.json()
+    assert [(dog["dog_id"], dog["match"]) for dog in data] == [(str(dog_ids["Мухтар"]), "fuzzy")]
+
+    resp = client.patch(
+        f"/dog/update_dog_by_id/?dog_id={dog_ids['Бобик']}", json={"name": "Тузик"}, headers=headers
+    )
+    assert resp.status_code == 200
+    assert client.get("/dog/search?q=бобик", headers=headers).json() == []
+    assert [dog["name"] for dog in client.get("/dog/search?q=туз", headers=headers).json()] == ["Тузик"]
+
+
+async def test_search_dogs_requires_query(client, create_user_in_database):
+    user_data = {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_USER],
+    }
+    await create_user_in_database(**user_data)
+    resp = client.get("/dog/search?q=", headers=create_test_auth_headers_for_user(user_data["email"]))
+    assert resp.status_code == 422
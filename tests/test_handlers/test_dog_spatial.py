@@ -0,0 +1,116 @@
+from uuid import uuid4
+
+from api.services.spatial_index import DogSpatialIndex
+from conftest import create_test_auth_headers_for_user
+from db.models import PortalRole
+from geo import get_distance_between_points
+
+
+async def _create_located_dogs(client, create_user_in_database, create_dog_in_database):
+    user_data = {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_SUPERADMIN],
+    }
+    await create_user_in_database(**user_data)
+    headers = create_test_auth_headers_for_user(user_data["email"])
+    dogs = [
+        {"dog_id": uuid4(), "name": "Buddy", "latitude": 55.7500, "longitude": 37.6200},
+        {"dog_id": uuid4(), "name": "Rex", "latitude": 55.7550, "longitude": 37.6200},
+        {"dog_id": uuid4(), "name": "Sharik", "latitude": 55.9000, "longitude": 37.9000},
+    ]
+    for dog in dogs:
+        await create_dog_in_database(
+            dog_id=dog["dog_id"],
+            name=dog["name"],
+            gender="male",
+            created_by=user_data["user_id"],
+            is_active=True,
+        )
+        resp = client.patch(
+            f"/dog/update_dog_location/?dog_id={dog['dog_id']}"
+            f"&latitude={dog['latitude']}&longitude={dog['longitude']}",
+            headers=headers,
+        )
+        assert resp.status_code == 200
+    return dogs, headers
+
+
+async def test_dogs_within_radius(client, create_user_in_database, create_dog_in_database):
+    dogs, headers = await _create_located_dogs(client, create_user_in_database, create_dog_in_database)
+    resp = client.get(
+        "/dog/dogs_within_radius/?latitude=55.7501&longitude=37.6200&radius_km=1",
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [dog["name"] for dog in data] == ["Buddy", "Rex"]
+    assert data[0]["dog_id"] == str(dogs[0]["dog_id"])
+    assert data[0]["distance"] < data[1]["distance"] <= 1
+
+
+async def test_dogs_in_bbox_after_delete(client, create_user_in_database, create_dog_in_database):
+    dogs, headers = await _create_located_dogs(client, create_user_in_database, create_dog_in_database)
+    resp = client.delete(f"/dog/delete_dog/?dog_id={dogs[1]['dog_id']}", headers=headers)
+    assert resp.status_code == 200
+    resp = client.get(
+        "/dog/dogs_in_bbox/?min_latitude=55.7&min_longitude=37.6&max_latitude=55.8&max_longitude=37.7",
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    assert [dog["name"] for dog in resp.json()] == ["Buddy"]
+
+
+async def test_nearest_dogs_with_open_tasks(
+    client, create_user_in_database, create_dog_in_database, create_task_in_database
+):
+    dogs, headers = await _create_located_dogs(client, create_user_in_database, create_dog_in_database)
+    resp = client.patch("/user/update_user_location?latitude=55.7501&longitude=37.6200", headers=headers)
+    assert resp.status_code == 200
+    for dog, open_tasks in zip(dogs, (0, 2, 1)):
+        for _ in range(open_tasks):
+            await create_task_in_database(
+                task_id=uuid4(),
+                description="Feed",
+                created_for=dog["dog_id"],
+                created_by=uuid4(),
+                is_active=True,
+            )
+    resp = client.get("/dog/nearest?k=5", headers=headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [dog["name"] for dog in data] == ["Rex", "Sharik"]
+    assert [dog["open_tasks"] for dog in data] == [2, 1]
+    assert data[0]["distance"] < data[1]["distance"]
+
+
+async def test_nearest_dogs_without_user_location(client, create_user_in_database, create_dog_in_database):
+    _, headers = await _create_located_dogs(client, create_user_in_database, create_dog_in_database)
+    resp = client.get("/dog/nearest?k=5", headers=headers)
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "User location is not set."}
+
+
+def test_nearest_far_from_every_dog():
+    index = DogSpatialIndex(cell_size=0.01, reload_interval=60)
+    positions = {uuid4(): (55.5 + number // 20 * 0.01, 37.5 + number % 20 * 0.01) for number in range(400)}
+    for dog_id, (latitude, longitude) in positions.items():
+        # a 20x20 cluster around Moscow, one cell per dog
+        index.upsert(dog_id, "Buddy", latitude, longitude)
+
+    def expected(allowed):
+        distances = {
+            dog_id: float(get_distance_between_points(-33.87, 151.21, latitude, longitude))
+            for dog_id, (latitude, longitude) in positions.items()
+            if dog_id in allowed
+        }
+        return sorted(distances, key=distances.get)[:3]
+
+    # Sydney is far from the cluster, the search falls back to a scan of all dogs
+    assert [dog["dog_id"] for dog in index.nearest(-33.87, 151.21, 3)] == expected(positions)
+    allowed = set(list(positions)[:2])
+    assert [dog["dog_id"] for dog in index.nearest(-33.87, 151.21, 3, allowed=allowed)] == expected(allowed)
@@ -0,0 +1,71 @@
+from uuid import uuid4
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from api.middlewares.idempotency import IdempotencyMiddleware
+from conftest import create_test_auth_headers_for_user
+from db.models import PortalRole
+
+
+async def test_create_dog_retry_is_replayed(client, create_user_in_database, asyncpg_pool):
+    user_data = {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_USER],
+    }
+    await create_user_in_database(**user_data)
+    headers = create_test_auth_headers_for_user(user_data["email"])
+    headers["Idempotency-Key"] = str(uuid4())
+    dog_data = {"name": "Jack", "gender": "male", "created_by": str(user_data["user_id"])}
+
+    resp = client.post("/dog/create_dog/", json=dog_data, headers=headers)
+    assert resp.status_code == 200
+    assert "Idempotent-Replayed" not in resp.headers
+    retry = client.post("/dog/create_dog/", json=dog_data, headers=headers)
+    assert retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == resp.json()
+    async with asyncpg_pool.acquire() as connection:
+        dogs_count = await connection.fetchval("SELECT count(*) FROM dogs WHERE name = $1", "Jack")
+    assert dogs_count == 1
+
+    resp = client.post("/dog/create_dog/", json={**dog_data, "name": "Rex"}, headers=headers)
+    assert resp.status_code == 422
+
+
+def _idempotent_client(status_codes: list) -> TestClient:
+    async def create(request):
+        return JSONResponse({"attempt": len(status_codes)}, status_code=status_codes.pop(0))
+
+    app = Starlette(routes=[Route("/create", create, methods=["POST"])])
+    app.add_middleware(IdempotencyMiddleware, routes=[("POST", "/create")])
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("status_code", [401, 403, 404, 409, 429, 500, 503])
+def test_retryable_failure_runs_again(status_code):
+    client = _idempotent_client([status_code, 201])
+    headers = {"Idempotency-Key": str(uuid4())}
+    assert client.post("/create", json={}, headers=headers).status_code == status_code
+    retry = client.post("/create", json={}, headers=headers)
+    assert retry.status_code == 201
+    assert "Idempotent-Replayed" not in retry.headers
+
+
+@pytest.mark.parametrize("status_code", [200, 201, 400, 422])
+def test_success_and_deterministic_failure_are_replayed(status_code):
+    client = _idempotent_client([status_code, 201])
+    headers = {"Idempotency-Key": str(uuid4())}
+    resp = client.post("/create", json={}, headers=headers)
+    retry = client.post("/create", json={}, headers=headers)
+    assert retry.status_code == status_code
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == resp.json()
@@ -0,0 +1,126 @@
+from uuid import uuid4
+
+import settings
+from conftest import create_test_auth_headers_for_user
+from db.models import PortalRole
+
+
+async def test_import_users_csv(client, create_user_in_database, get_user_from_database):
+    admin_data = {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_ADMIN],
+    }
+    await create_user_in_database(**admin_data)
+    content = (
+        "name,surname,email,password\n"
+        "Ivan,Petrov,ivan@kek.com,SamplePass1\n"
+        "Nikolai,Sviridov,lol@kek.com,SamplePass2\n"
+        "Ivan1,Petrov,bad@kek.com,SamplePass3\n"
+        "Ivan,Petrov,ivan@kek.com,SamplePass4\n"
+    )
+    resp = client.post(
+        "/user/import_users/?format=csv",
+        files={"file": ("users.csv", content, "text/csv")},
+        headers=create_test_auth_headers_for_user(admin_data["email"]),
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["imported"] == 1
+    assert sorted(data["duplicates"]) == ["ivan@kek.com", "lol@kek.com"]
+    assert data["errors"] == [
+        {"row": 3, "email": "bad@kek.com", "error": "Name should contains only letters"}
+    ]
+
+
+
+async def test_import_users_duplicates_ignore_email_case(client, create_user_in_database):
+    admin_data = {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_ADMIN],
+    }
+    await create_user_in_database(**admin_data)
+    content = (
+        "name,surname,email,password\n"
+        "Ivan,Petrov,ivan@kek.com,SamplePass1\n"
+        "Nikolai,Sviridov,LOL@kek.com,SamplePass2\n"
+        "Ivan,Petrov,Ivan@Kek.com,SamplePass3\n"
+    )
+    resp = client.post(
+        "/user/import_users/?format=csv",
+        files={"file": ("users.csv", content, "text/csv")},
+        headers=create_test_auth_headers_for_user(admin_data["email"]),
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["imported"] == 1
+    assert sorted(data["duplicates"]) == ["Ivan@kek.com", "LOL@kek.com"]
+
+
+async def test_import_users_ndjson_forbidden_for_user(client, create_user_in_database):
+    user_data = {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_USER],
+    }
+    await create_user_in_database(**user_data)
+    content = '{"name": "Ivan", "surname": "Petrov", "email": "ivan@kek.com", "password": "SamplePass"}\n'
+    resp = client.post(
+        "/user/import_users/?format=ndjson",
+        files={"file": ("users.ndjson", content, "application/x-ndjson")},
+        headers=create_test_auth_headers_for_user(user_data["email"]),
+    )
+    assert resp.status_code == 403
+    assert resp.json() == {"detail": "Forbidden."}
+
+
+async def test_import_users_csv_rows_with_extra_fields_and_row_limit(client, create_user_in_database, monkeypatch):
+    admin_data = {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_ADMIN],
+    }
+    await create_user_in_database(**admin_data)
+    headers = create_test_auth_headers_for_user(admin_data["email"])
+    content = (
+        "name,surname,email,password\n"
+        "Ivan,Petrov,ivan@kek.com,SamplePass1,extra\n"
+        "Petr,Ivanov,petr@kek.com,SamplePass2\n"
+    )
+    resp = client.post(
+        "/user/import_users/?format=csv",
+        files={"file": ("users.csv", content, "text/csv")},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["imported"] == 1
+    assert data["errors"] == [
+        {"row": 1, "email": "ivan@kek.com", "error": "Row has more fields than the header"}
+    ]
+
+    monkeypatch.setattr(settings, "USER_IMPORT_MAX_ROWS", 1)
+    resp = client.post(
+        "/user/import_users/?format=csv",
+        files={"file": ("users.csv", content, "text/csv")},
+        headers=headers,
+    )
+    assert resp.status_code == 422
+    assert resp.json() == {"detail": "Too many rows, max 1 per import"}
@@ -0,0 +1,74 @@
+import time
+from uuid import uuid4
+
+from api.services.positions import encode_position_records
+from conftest import create_test_auth_headers_for_user
+from db.models import PortalRole
+
+
+async def _create_superadmin_with_dog(create_user_in_database, create_dog_in_database):
+    user_data = {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_SUPERADMIN],
+    }
+    await create_user_in_database(**user_data)
+    dog_id = uuid4()
+    await create_dog_in_database(
+        dog_id=dog_id, name="Buddy", gender="male", created_by=user_data["user_id"], is_active=True
+    )
+    return dog_id, create_test_auth_headers_for_user(user_data["email"])
+
+
+async def test_ingest_positions(client, create_user_in_database, create_dog_in_database):
+    dog_id, headers = await _create_superadmin_with_dog(create_user_in_database, create_dog_in_database)
+    now = int(time.time())
+    payload = encode_position_records(
+        [
+            (dog_id, now - 20, 55.7000, 37.6000, 80, -90),
+            (dog_id, now - 10, 55.7100, 37.6100, 80, -90),
+            (dog_id, now - 5, 95.0000, 37.6200, 80, -90),
+            (uuid4(), now - 5, 55.7200, 37.6200, 80, -90),
+        ]
+    )
+    resp = client.post(
+        "/dog/ingest_positions/",
+        data=payload,
+        headers={**headers, "Content-Type": "application/octet-stream"},
+    )
+    assert resp.status_code == 200
+    assert resp.json() == {"received": 4, "rejected": 1, "duplicates": 1, "updated": 1}
+
+    resp = client.get(f"/dog/get_dog_location/?dog_id={dog_id}", headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["latitude"] == 55.7100
+    assert resp.json()["longitude"] == 37.6100
+
+    # a fix older than the stored one is ignored
+    payload = encode_position_records([(dog_id, now - 15, 55.7000, 37.6000, 80, -90)])
+    resp = client.post("/dog/ingest_positions/", data=payload, headers=headers)
+    assert resp.json()["updated"] == 0
+
+
+async def test_ingest_positions_truncated_payload(client, create_user_in_database, create_dog_in_database):
+    dog_id, headers = await _create_superadmin_with_dog(create_user_in_database, create_dog_in_database)
+    payload = encode_position_records([(dog_id, int(time.time()), 55.7, 37.6, 80, -90)])
+    resp = client.post("/dog/ingest_positions/", data=payload[:-1], headers=headers)
+    assert resp.status_code == 400
+
+
+async def test_collar_fix_older_than_manual_location_is_ignored(client, create_user_in_database, create_dog_in_database):
+    dog_id, headers = await _create_superadmin_with_dog(create_user_in_database, create_dog_in_database)
+    resp = client.patch(f"/dog/update_dog_location/?dog_id={dog_id}&latitude=55.7500&longitude=37.6200", headers=headers)
+    assert resp.status_code == 200
+
+    payload = encode_position_records([(dog_id, int(time.time()) - 60, 55.7000, 37.6000, 80, -90)])
+    resp = client.post("/dog/ingest_positions/", data=payload, headers=headers)
+    assert resp.json()["updated"] == 0
+    resp = client.get(f"/dog/get_dog_location/?dog_id={dog_id}", headers=headers)
+    assert resp.json()["latitude"] == 55.7500
+    assert resp.json()["longitude"] == 37.6200
@@ -0,0 +1,102 @@
+from uuid import uuid4
+
+from conftest import create_test_auth_headers_for_user
+from db.dals import TaskDAL
+from db.models import PortalRole
+from db.models import User
+
+
+def _admin_data(email: str) -> dict:
+    return {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": email,
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_ADMIN],
+    }
+
+
+async def test_leaderboard_ranks_by_completed_tasks(
+    client, create_user_in_database, create_dog_in_database, create_task_in_database, get_user_from_database
+):
+    first_data = _admin_data("first@kek.com")
+    second_data = _admin_data("second@kek.com")
+    idle_data = _admin_data("idle@kek.com")
+    for user_data in (first_data, second_data, idle_data):
+        await create_user_in_database(**user_data)
+    dog_id = uuid4()
+    await create_dog_in_database(
+        dog_id=dog_id, name="Buddy", gender="male", created_by=first_data["user_id"], is_active=True
+    )
+    task_ids = [uuid4() for _ in range(3)]
+    for task_id in task_ids:
+        await create_task_in_database(
+            task_id=task_id, description="Feed", created_for=dog_id, created_by=idle_data["user_id"], is_active=True
+        )
+    first_headers = create_test_auth_headers_for_user(first_data["email"])
+    second_headers = create_test_auth_headers_for_user(second_data["email"])
+
+    for task_id, headers in zip(task_ids, (first_headers, first_headers, second_headers)):
+        resp = client.delete(f"/task/close_task/?task_id={task_id}", headers=headers)
+        assert resp.status_code == 200
+    users_from_db = await get_user_from_database(first_data["user_id"])
+    assert users_from_db[0]["completed_tasks_count"] == 2
+
+    resp = client.get("/task/leaderboard/?limit=5", headers=second_headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [(entry["user_id"], entry["rank"], entry["completed_tasks"]) for entry in data["top"]] == [
+        (str(first_data["user_id"]), 1, 2),
+        (str(second_data["user_id"]), 2, 1),
+    ]
+    assert data["my_rank"] == 2
+    assert data["my_completed_tasks"] == 1
+    assert data["ranked_users"] == 2
+
+    resp = client.get("/task/leaderboard/", headers=create_test_auth_headers_for_user(idle_data["email"]))
+    assert resp.json()["my_rank"] is None
+    assert resp.json()["my_completed_tasks"] == 0
+
+
+async def test_leaderboard_limit_is_bounded(client, create_user_in_database):
+    user_data = _admin_data("lol@kek.com")
+    await create_user_in_database(**user_data)
+    resp = client.get("/task/leaderboard/?limit=1000", headers=create_test_auth_headers_for_user(user_data["email"]))
+    assert resp.status_code == 422
+
+
+async def test_task_closed_twice_is_counted_once(
+    client,
+    async_session_test,
+    create_user_in_database,
+    create_dog_in_database,
+    create_task_in_database,
+    get_user_from_database,
+):
+    user_data = _admin_data("lol@kek.com")
+    await create_user_in_database(**user_data)
+    dog_id = uuid4()
+    await create_dog_in_database(
+        dog_id=dog_id, name="Buddy", gender="male", created_by=user_data["user_id"], is_active=True
+    )
+    task_id = uuid4()
+    await create_task_in_database(
+        task_id=task_id, description="Feed", created_for=dog_id, created_by=user_data["user_id"], is_active=True
+    )
+    # two closes that both passed the lookup, as concurrent requests do
+    closed_task_ids = []
+    for _ in range(2):
+        async with async_session_test() as session:
+            async with session.begin():
+                current_user = await session.get(User, user_data["user_id"])
+                closed_task_ids.append(await TaskDAL(session).close_task(task_id, current_user))
+    assert closed_task_ids == [task_id, None]
+    users_from_db = await get_user_from_database(user_data["user_id"])
+    assert users_from_db[0]["completed_tasks_count"] == 1
+
+    resp = client.delete(f"/task/close_task/?task_id={task_id}", headers=create_test_auth_headers_for_user(user_data["email"]))
+    assert resp.status_code == 404
+    users_from_db = await get_user_from_database(user_data["user_id"])
+    assert users_from_db[0]["completed_tasks_count"] == 1
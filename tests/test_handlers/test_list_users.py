@@ -0,0 +1,64 @@
+from uuid import uuid4
+
+from conftest import create_test_auth_headers_for_user
+from db.models import PortalRole
+
+
+def _user_data(email: str, name: str, roles: list, is_active: bool = True) -> dict:
+    return {
+        "user_id": uuid4(),
+        "name": name,
+        "surname": "Sviridov",
+        "email": email,
+        "is_active": is_active,
+        "hashed_password": "SampleHashedPass",
+        "roles": roles,
+    }
+
+
+async def test_list_users_filters_and_pages(client, create_user_in_database):
+    admin_data = _user_data("Admin@Kek.com", "Nikolai", [PortalRole.ROLE_PORTAL_USER, PortalRole.ROLE_PORTAL_ADMIN])
+    users = [
+        admin_data,
+        _user_data("anna@kek.com", "Anna", [PortalRole.ROLE_PORTAL_USER]),
+        _user_data("Alex@kek.com", "Alexey", [PortalRole.ROLE_PORTAL_USER]),
+        _user_data("boris@kek.com", "Boris", [PortalRole.ROLE_PORTAL_USER], is_active=False),
+        _user_data("a_b@kek.com", "Ivan", [PortalRole.ROLE_PORTAL_USER]),
+    ]
+    for user_data in users:
+        await create_user_in_database(**user_data)
+    # logins are case-insensitive
+    headers = create_test_auth_headers_for_user("admin@kek.com")
+
+    resp = client.get("/user/list_users/?limit=2", headers=headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    emails = [user["email"] for user in data["users"]]
+    while data["next_cursor"] is not None:
+        data = client.get(f"/user/list_users/?limit=2&cursor={data['next_cursor']}", headers=headers).json()
+        emails += [user["email"] for user in data["users"]]
+    assert emails == ["a_b@kek.com", "Admin@Kek.com", "Alex@kek.com", "anna@kek.com", "boris@kek.com"]
+
+    resp = client.get("/user/list_users/?email_prefix=AL", headers=headers)
+    assert [user["email"] for user in resp.json()["users"]] == ["Alex@kek.com"]
+    resp = client.get("/user/list_users/?email_prefix=a_", headers=headers)
+    assert [user["email"] for user in resp.json()["users"]] == ["a_b@kek.com"]
+    resp = client.get("/user/list_users/?name_prefix=an", headers=headers)
+    assert [user["email"] for user in resp.json()["users"]] == ["anna@kek.com"]
+    resp = client.get(f"/user/list_users/?role={PortalRole.ROLE_PORTAL_ADMIN.value}", headers=headers)
+    data = resp.json()
+    assert [user["user_id"] for user in data["users"]] == [str(admin_data["user_id"])]
+    assert PortalRole.ROLE_PORTAL_ADMIN in data["users"][0]["roles"]
+    resp = client.get("/user/list_users/?is_active=false", headers=headers)
+    assert [user["email"] for user in resp.json()["users"]] == ["boris@kek.com"]
+
+    resp = client.get("/user/list_users/?cursor=broken", headers=headers)
+    assert resp.status_code == 422
+
+
+async def test_list_users_forbidden_for_common_user(client, create_user_in_database):
+    user_data = _user_data("lol@kek.com", "Nikolai", [PortalRole.ROLE_PORTAL_USER])
+    await create_user_in_database(**user_data)
+    resp = client.get("/user/list_users/", headers=create_test_auth_headers_for_user(user_data["email"]))
+    assert resp.status_code == 403
+    assert resp.json() == {"detail": "Forbidden."}
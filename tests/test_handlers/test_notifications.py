@@ -0,0 +1,100 @@
+import asyncio
+from uuid import uuid4
+
+from api.services.notifications import NotificationHub
+from conftest import create_test_auth_headers_for_user
+from db.models import PortalRole
+
+
+async def _create_user_at(client, create_user_in_database, email: str, roles: list, latitude: float, longitude: float):
+    user_data = {
+        "user_id": uuid4(),
+        "name": "Ivan",
+        "surname": "Petrov",
+        "email": email,
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": roles,
+    }
+    await create_user_in_database(**user_data)
+    headers = create_test_auth_headers_for_user(email)
+    resp = client.patch(f"/user/update_user_location?latitude={latitude}&longitude={longitude}", headers=headers)
+    assert resp.status_code == 200
+    return user_data, headers
+
+
+async def test_new_task_notifies_nearby_volunteers(client, create_user_in_database, create_dog_in_database):
+    admin_data, admin_headers = await _create_user_at(
+        client, create_user_in_database, "lol@kek.com", [PortalRole.ROLE_PORTAL_SUPERADMIN], 55.7500, 37.6200
+    )
+    _, near_headers = await _create_user_at(
+        client, create_user_in_database, "near@kek.com", [PortalRole.ROLE_PORTAL_USER], 55.7600, 37.6200
+    )
+    _, far_headers = await _create_user_at(
+        client, create_user_in_database, "far@kek.com", [PortalRole.ROLE_PORTAL_USER], 59.9300, 30.3300
+    )
+    dog_id = uuid4()
+    await create_dog_in_database(
+        dog_id=dog_id, name="Buddy", gender="male", created_by=admin_data["user_id"], is_active=True
+    )
+    resp = client.patch(
+        f"/dog/update_dog_location/?dog_id={dog_id}&latitude=55.7500&longitude=37.6200", headers=admin_headers
+    )
+    assert resp.status_code == 200
+
+    resp = client.post("/task/create_task/", json={"description": "Feed", "created_for": str(dog_id)}, headers=admin_headers)
+    assert resp.status_code == 200
+    task_id = resp.json()["task_id"]
+
+    resp = client.get("/user/notifications?timeout=5", headers=near_headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert len(data["notifications"]) == 1
+    notification = data["notifications"][0]
+    assert notification["task_id"] == task_id
+    assert notification["dog_name"] == "Buddy"
+    assert round(notification["distance"], 1) == 1.1
+    assert data["last_notification_id"] == notification["notification_id"]
+
+    resp = client.get(f"/user/notifications?after={data['last_notification_id']}", headers=near_headers)
+    assert resp.json()["notifications"] == []
+    resp = client.get("/user/notifications", headers=far_headers)
+    assert resp.json()["notifications"] == []
+    # the creator of the task is not notified
+    resp = client.get("/user/notifications", headers=admin_headers)
+    assert resp.json()["notifications"] == []
+
+
+async def test_notification_published_by_one_hub_is_read_through_another(async_session_test):
+    # two hubs stand for two worker processes sharing the database
+    publisher, reader = (
+        NotificationHub(page_size=50, poll_interval=0.05, ttl=60, purge_interval=60) for _ in range(2)
+    )
+    reader.session_factory = async_session_test
+    user_id, task_id, dog_id = uuid4(), uuid4(), uuid4()
+
+    async def read_notifications():
+        async with async_session_test() as session:
+            async with session.begin():
+                return await reader.read(session, user_id, 0)
+
+    await reader.start()
+    try:
+        waiting = asyncio.create_task(reader.wait(user_id, read_notifications, timeout=5))
+        await asyncio.sleep(0.2)
+        assert not waiting.done()
+        async with async_session_test() as session:
+            async with session.begin():
+                await publisher.publish(
+                    session,
+                    {"task_id": task_id, "dog_id": dog_id, "dog_name": "Buddy", "description": "Feed"},
+                    [user_id, uuid4()],
+                    [1.5, 2.5],
+                )
+        notifications = await asyncio.wait_for(waiting, timeout=2)
+    finally:
+        await reader.stop()
+    assert len(notifications) == 1
+    assert notifications[0]["task_id"] == task_id
+    assert notifications[0]["dog_name"] == "Buddy"
+    assert notifications[0]["distance"] == 1.5
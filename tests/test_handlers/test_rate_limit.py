@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import settings
+from api.middlewares.rate_limit import RateLimitMiddleware
+from security import create_access_token
+
+
+def _bearer_headers(subject: str) -> dict:
+    token = create_access_token(data={"sub": subject}, expires_delta=timedelta(minutes=5))
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _limited_client() -> TestClient:
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/limited", ok), Route("/other", ok), Route("/another", ok)])
+    # budgets barely refill during a test
+    app.add_middleware(
+        RateLimitMiddleware,
+        default_budget=(2, 0.001),
+        route_budgets={"/limited": (1, 0.001)},
+    )
+    return TestClient(app)
+
+
+async def test_login_rate_limit(client):
+    login_capacity, _ = settings.RATE_LIMIT_ROUTES["/login/token"]
+    form_data = {"username": "nobody@kek.com", "password": "SamplePass"}
+    for _ in range(login_capacity):
+        resp = client.post("/login/token", data=form_data)
+        assert resp.status_code == 401
+    resp = client.post("/login/token", data=form_data)
+    assert resp.status_code == 429
+    assert resp.json() == {"detail": "Too many requests"}
+    assert int(resp.headers["Retry-After"]) >= 1
+
+
+def test_token_subject_and_ip_have_separate_buckets():
+    client = _limited_client()
+    assert client.get("/limited").status_code == 200
+    assert client.get("/limited").status_code == 429
+    # same IP, but an authenticated subject gets its own bucket
+    assert client.get("/limited", headers=_bearer_headers("lol@kek.com")).status_code == 200
+    assert client.get("/limited", headers=_bearer_headers("lol@kek.com")).status_code == 429
+    assert client.get("/limited", headers=_bearer_headers("kek@lol.com")).status_code == 200
+    # an invalid token counts against the IP
+    assert client.get("/limited", headers={"Authorization": "Bearer broken"}).status_code == 429
+
+
+def test_default_budget_applies_per_unlisted_route():
+    client = _limited_client()
+    for _ in range(2):
+        assert client.get("/other").status_code == 200
+    resp = client.get("/other")
+    assert resp.status_code == 429
+    assert resp.json() == {"detail": "Too many requests"}
+    assert client.get("/another").status_code == 200
+
+
+def test_reset_refills_buckets():
+    client = _limited_client()
+    assert client.get("/limited").status_code == 200
+    assert client.get("/limited").status_code == 429
+    client.app.middleware_stack.app.reset()
+    assert client.get("/limited").status_code == 200
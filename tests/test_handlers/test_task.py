@@ -277,3 +277,44 @@ async def test_get_completed_tasks_by_user(client: AsyncClient, create_user_in_d
     assert len(data) > 0
     for t in data:
         assert t["closed_by"] == str(user_data['user_id'])
+
+@pytest.mark.asyncio
+async def test_create_tasks_bulk(client: AsyncClient, create_user_in_database, create_dog_in_database):
+    user_data = {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_ADMIN],
+    }
+    await create_user_in_database(**user_data)
+    dog_data = {
+        "dog_id": uuid4(),
+        "name": "Buddy",
+        "gender": "Male",
+        "created_by": user_data["user_id"],
+        "is_active": True,
+    }
+    await create_dog_in_database(**dog_data)
+    missing_dog_id = uuid4()
+    tasks_data = {
+        "tasks": [
+            {"description": "Feed", "created_for": str(dog_data["dog_id"])},
+            {"description": "Vet check", "created_for": str(missing_dog_id)},
+            {"description": "Vet check", "created_for": str(dog_data["dog_id"])},
+        ]
+    }
+    response = client.post("/task/create_tasks/", json=tasks_data, headers=create_test_auth_headers_for_user(user_data["email"]))
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["created"] == 2
+    assert data["failed"] == 1
+    assert [r["index"] for r in data["results"]] == [0, 1, 2]
+    assert data["results"][0]["task"]["description"] == "Feed"
+    assert data["results"][0]["task"]["created_for"] == str(dog_data["dog_id"])
+    assert data["results"][0]["task"]["created_by"] == str(user_data["user_id"])
+    assert data["results"][1]["task"] is None
+    assert data["results"][1]["error"] == f"Dog with id {missing_dog_id} not found."
+    assert data["results"][2]["task"]["description"] == "Vet check"
@@ -0,0 +1,124 @@
+from uuid import uuid4
+
+import settings
+from conftest import create_test_auth_headers_for_user
+from db.models import PortalRole
+
+
+async def _create_dogs_with_tasks(client, create_user_in_database, create_dog_in_database, create_task_in_database):
+    superadmin_data = {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_SUPERADMIN],
+    }
+    await create_user_in_database(**superadmin_data)
+    headers = create_test_auth_headers_for_user(superadmin_data["email"])
+    dogs = [
+        {"dog_id": uuid4(), "name": "Buddy", "latitude": 55.7600, "longitude": 37.6200},
+        {"dog_id": uuid4(), "name": "Rex", "latitude": 55.7500, "longitude": 37.6200},
+        {"dog_id": uuid4(), "name": "Sharik", "latitude": 55.7700, "longitude": 37.6200},
+    ]
+    tasks = []
+    for dog in dogs:
+        await create_dog_in_database(
+            dog_id=dog["dog_id"],
+            name=dog["name"],
+            gender="male",
+            created_by=superadmin_data["user_id"],
+            is_active=True,
+        )
+        resp = client.patch(
+            f"/dog/update_dog_location/?dog_id={dog['dog_id']}"
+            f"&latitude={dog['latitude']}&longitude={dog['longitude']}",
+            headers=headers,
+        )
+        assert resp.status_code == 200
+        task_id = uuid4()
+        await create_task_in_database(
+            task_id=task_id,
+            description="Feed",
+            created_for=dog["dog_id"],
+            created_by=superadmin_data["user_id"],
+            is_active=True,
+        )
+        tasks.append(task_id)
+    return dogs, tasks, headers
+
+
+async def test_proposed_assignments(
+    client, create_user_in_database, create_dog_in_database, create_task_in_database
+):
+    _, tasks, headers = await _create_dogs_with_tasks(
+        client, create_user_in_database, create_dog_in_database, create_task_in_database
+    )
+    volunteer_data = {
+        "user_id": uuid4(),
+        "name": "Ivan",
+        "surname": "Petrov",
+        "email": "ivan@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_USER],
+    }
+    await create_user_in_database(**volunteer_data)
+    volunteer_headers = create_test_auth_headers_for_user(volunteer_data["email"])
+    resp = client.patch("/user/update_user_location?latitude=55.7510&longitude=37.6200", headers=volunteer_headers)
+    assert resp.status_code == 200
+
+    resp = client.get("/task/proposed_assignments/?capacity=2&method=hungarian", headers=headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["method"] == "hungarian"
+    assert {a["task_id"] for a in data["assignments"]} == {str(tasks[0]), str(tasks[1])}
+    assert all(a["user_id"] == str(volunteer_data["user_id"]) for a in data["assignments"])
+    assert str(tasks[2]) in data["unassigned_task_ids"]
+
+    resp = client.get("/task/proposed_assignments/", headers=volunteer_headers)
+    assert resp.status_code == 403
+
+
+async def test_route_plan(
+    client, create_user_in_database, create_dog_in_database, create_task_in_database
+):
+    dogs, tasks, headers = await _create_dogs_with_tasks(
+        client, create_user_in_database, create_dog_in_database, create_task_in_database
+    )
+    unknown_task_id = uuid4()
+    body = {
+        "task_ids": [str(task_id) for task_id in tasks] + [str(unknown_task_id)],
+        "latitude": 55.7450,
+        "longitude": 37.6200,
+    }
+    resp = client.post("/task/route_plan/", json=body, headers=headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [stop["task_id"] for stop in data["stops"]] == [str(tasks[1]), str(tasks[0]), str(tasks[2])]
+    assert data["stops"][0]["dog_id"] == str(dogs[1]["dog_id"])
+    assert data["unresolved_task_ids"] == [str(unknown_task_id)]
+    assert abs(data["total_distance"] - sum(stop["distance_from_previous"] for stop in data["stops"])) < 1e-3
+
+
+async def test_proposed_assignments_method_limits(
+    client, create_user_in_database, create_dog_in_database, create_task_in_database, monkeypatch
+):
+    _, _, headers = await _create_dogs_with_tasks(
+        client, create_user_in_database, create_dog_in_database, create_task_in_database
+    )
+    # no located volunteers: nothing to solve, auto still reports the method it resolved to
+    resp = client.get("/task/proposed_assignments/", headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["method"] == "hungarian"
+    assert resp.json()["assignments"] == []
+
+    resp = client.patch("/user/update_user_location?latitude=55.7510&longitude=37.6200", headers=headers)
+    assert resp.status_code == 200
+    monkeypatch.setattr(settings, "ASSIGNMENT_HUNGARIAN_MAX_CELLS", 2)
+    resp = client.get("/task/proposed_assignments/", headers=headers)
+    assert resp.json()["method"] == "greedy"
+    resp = client.get("/task/proposed_assignments/?method=hungarian", headers=headers)
+    assert resp.status_code == 422
+    assert resp.json() == {"detail": "Too many volunteer-task pairs for the hungarian method, max 2"}
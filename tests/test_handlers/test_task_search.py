@@ -0,0 +1,65 @@
+from uuid import uuid4
+
+from conftest import create_test_auth_headers_for_user
+from db.models import PortalRole
+
+
+async def test_search_tasks_by_description(client, create_user_in_database, create_task_in_database):
+    user_data = {
+        "user_id": uuid4(),
+        "name": "Nikolai",
+        "surname": "Sviridov",
+        "email": "lol@kek.com",
+        "is_active": True,
+        "hashed_password": "SampleHashedPass",
+        "roles": [PortalRole.ROLE_PORTAL_USER],
+    }
+    await create_user_in_database(**user_data)
+    headers = create_test_auth_headers_for_user(user_data["email"])
+    dog_id = uuid4()
+    tasks = [
+        ("Vaccination against rabies", True),
+        ("The dog needs vaccinations and a collar", True),
+        ("Покормить собаку", True),
+        ("Вакцинация от бешенства", True),
+        ("Vaccinate the puppy", False),
+    ]
+    task_ids = {}
+    for description, is_active in tasks:
+        task_ids[description] = uuid4()
+        await create_task_in_database(
+            task_id=task_ids[description],
+            description=description,
+            created_for=dog_id,
+            created_by=user_data["user_id"],
+            is_active=is_active,
+        )
+
+    resp = client.get("/task/search/?q=vaccination&limit=1", headers=headers)
+    assert resp.status_code == 200
+    first_page = resp.json()
+    assert len(first_page["results"]) == 1
+    assert first_page["next_cursor"] is not None
+    resp = client.get(f"/task/search/?q=vaccination&limit=1&cursor={first_page['next_cursor']}", headers=headers)
+    second_page = resp.json()
+    assert len(second_page["results"]) == 1
+    assert second_page["next_cursor"] is None
+    found = {task["task_id"] for task in first_page["results"] + second_page["results"]}
+    assert found == {
+        str(task_ids["Vaccination against rabies"]),
+        str(task_ids["The dog needs vaccinations and a collar"]),
+    }
+    assert first_page["results"][0]["rank"] >= second_page["results"][0]["rank"]
+
+    resp = client.get("/task/search/?q=вакцинации", headers=headers)
+    assert [task["task_id"] for task in resp.json()["results"]] == [str(task_ids["Вакцинация от бешенства"])]
+
+    resp = client.get("/task/search/?q=vaccinate&status=closed", headers=headers)
+    results = resp.json()["results"]
+    assert [task["task_id"] for task in results] == [str(task_ids["Vaccinate the puppy"])]
+    assert results[0]["is_active"] is False
+
+    for cursor in ["broken", "WzAuNSwgMTIzXQ", "WyIwLjUiLCAiMTIzIl0"]:
+        resp = client.get(f"/task/search/?q=vaccination&cursor={cursor}", headers=headers)
+        assert resp.status_code == 422
+        assert resp.json() == {"detail": "Invalid cursor."}
@@ -0,0 +1,69 @@
+import asyncio
+import base64
+import json
+import socket
+import time
+from uuid import uuid4
+
+import settings
+from api.services.positions import PositionBatcher
+from api.services.positions import encode_position_records
+from lora_listener import PUSH_ACK
+from lora_listener import start_listener
+
+
+def _push_data(token: bytes, payload: bytes) -> bytes:
+    uplink = {"rxpk": [{"data": base64.b64encode(payload).decode(), "rssi": -90}]}
+    return b"\x02" + token + b"\x00" + bytes(8) + json.dumps(uplink).encode()
+
+
+async def test_lora_listener_updates_dog_location(
+    async_session_test, create_user_in_database, create_dog_in_database, get_dog_from_database
+):
+    user_id = uuid4()
+    await create_user_in_database(
+        user_id=user_id,
+        name="Nikolai",
+        surname="Sviridov",
+        email="lol@kek.com",
+        is_active=True,
+        hashed_password="SampleHashedPass",
+        roles=["ROLE_PORTAL_SUPERADMIN"],
+    )
+    dog_id = uuid4()
+    await create_dog_in_database(dog_id=dog_id, name="Buddy", gender="male", created_by=user_id, is_active=True)
+
+    batcher = PositionBatcher(
+        session_factory=async_session_test,
+        batch_size=100,
+        max_delay=0.05,
+        max_pending_records=1000,
+        max_clock_skew=settings.POSITION_MAX_CLOCK_SKEW,
+    )
+    transport, protocol = await start_listener(batcher, "127.0.0.1", 0)
+    port = transport.get_extra_info("sockname")[1]
+    writer = asyncio.create_task(batcher.run())
+    gateway = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    gateway.setblocking(False)
+    try:
+        now = int(time.time())
+        payload = encode_position_records([(dog_id, now, 55.7500, 37.6200, 90, -90)])
+        gateway.sendto(_push_data(b"\x12\x34", payload), ("127.0.0.1", port))
+        gateway.sendto(b"\x02\x00\x01\x00not json", ("127.0.0.1", port))
+        ack = await asyncio.wait_for(asyncio.get_running_loop().sock_recv(gateway, 4), timeout=1)
+        assert ack == b"\x02\x12\x34" + bytes([PUSH_ACK])
+        for _ in range(50):
+            if batcher.counters["updated_dogs"]:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        gateway.close()
+        transport.close()
+        writer.cancel()
+
+    assert protocol.counters["uplinks"] == 1
+    assert protocol.counters["malformed_datagrams"] == 1
+    assert batcher.counters["updated_dogs"] == 1
+    dog_from_db = dict((await get_dog_from_database(dog_id))[0])
+    assert dog_from_db["latitude"] == 55.7500
+    assert dog_from_db["longitude"] == 37.6200